@@ -0,0 +1,278 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import numpy as np
+
+# Queue classes, served in this order
+PRIORITIES = ("interactive", "batch")
+
+
+class AdmissionError(Exception):
+    """A request was turned away: queue full (503), too many queued from one client (429),
+    or its deadline passed while it waited (504)."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Caller:
+    """Who is asking and how long they will wait: `deadline` is a time.monotonic() instant.
+
+    `client` is the key fairness and the per-client queue cap apply to (the
+    connection address); `client_id` is the caller's self-declared identity,
+    which only orders requests sharing that key.
+    """
+
+    __slots__ = ("client", "priority", "deadline", "client_id")
+
+    def __init__(
+        self, client: str, priority: str = "interactive", deadline: Optional[float] = None, client_id: str = ""
+    ):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+        self.client = client
+        self.priority = priority
+        self.deadline = deadline
+        self.client_id = client_id
+
+    def remaining(self) -> Optional[float]:
+        # Seconds until the caller gives up; None without a deadline
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+
+class Ticket:
+    """An admitted request. `degraded` is set when the queue was under pressure at admission."""
+
+    __slots__ = ("caller", "degraded", "waited")
+
+    def __init__(self, caller: Caller, degraded: bool, waited: float):
+        self.caller = caller
+        self.degraded = degraded
+        self.waited = waited
+
+
+class _Waiter:
+    __slots__ = ("caller", "future", "enqueued")
+
+    def __init__(self, caller: Caller, future: asyncio.Future, enqueued: float):
+        self.caller = caller
+        self.future = future
+        self.enqueued = enqueued
+
+
+class AdmissionController:
+    """Bounded, prioritized admission in front of the recommendation pipeline.
+
+    At most `max_active` requests run at once; batch requests hold at most
+    `max_batch_active` of those slots, so an interactive request never waits
+    for a full set of slow batch chunks. Everyone else queues: interactive
+    before batch, and round-robin across clients within a class, so one
+    chatty client cannot starve the others; requests of one client are taken
+    round-robin across its client ids. The queue holds `max_queue`
+    requests, at most `max_queue_per_client` from one client; when it is full
+    an interactive arrival displaces the newest queued batch request, and
+    other arrivals are rejected. Requests whose deadline passes while they
+    wait are dropped without running. Tickets handed out while at least
+    `degrade_queue` requests are queued are marked degraded, telling the
+    caller to take cheaper paths (no LLM call, looser cache matching).
+
+    Not thread-safe: use from one event loop.
+    """
+
+    def __init__(
+        self,
+        max_active: int = 8,
+        max_batch_active: Optional[int] = None,
+        max_queue: int = 64,
+        max_queue_per_client: int = 16,
+        degrade_queue: int = 16,
+        retry_after: float = 1.0,
+        wait_window: int = 1024,
+    ):
+        self.max_active = max(1, max_active)
+        self.max_batch_active = max(1, min(
+            self.max_active, max_batch_active if max_batch_active is not None else self.max_active // 2
+        ))
+        self.max_queue = max(0, max_queue)
+        self.max_queue_per_client = max(1, max_queue_per_client)
+        self.degrade_queue = degrade_queue
+        self.retry_after = retry_after
+        self.active = {priority: 0 for priority in PRIORITIES}
+        # priority -> client -> client id -> its waiters in arrival order; a client (and a
+        # client id within it) moves to the back once served
+        self._queues: Dict[str, "OrderedDict[str, OrderedDict[str, deque]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self.queued = {priority: 0 for priority in PRIORITIES}
+        self._queued_by_client: Dict[str, int] = {}
+
+        # Metrics
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.degraded = 0
+        self.rejected = {"queue_full": 0, "client_limit": 0}
+        self.shed = 0
+        self.expired = 0
+        self._waits = {priority: deque(maxlen=wait_window) for priority in PRIORITIES}
+
+    def queue_length(self) -> int:
+        return sum(self.queued.values())
+
+    def _has_slot(self, priority: str) -> bool:
+        if sum(self.active.values()) >= self.max_active:
+            return False
+        return priority != "batch" or self.active["batch"] < self.max_batch_active
+
+    def _ticket(self, caller: Caller, waited: float) -> Ticket:
+        self.active[caller.priority] += 1
+        self.admitted[caller.priority] += 1
+        self._waits[caller.priority].append(waited)
+        degraded = 0 < self.degrade_queue <= self.queue_length()
+        if degraded:
+            self.degraded += 1
+        return Ticket(caller, degraded, waited)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        caller = waiter.caller
+        ids = self._queues[caller.priority].setdefault(caller.client, OrderedDict())
+        ids.setdefault(caller.client_id, deque()).append(waiter)
+        self.queued[caller.priority] += 1
+        self._queued_by_client[caller.client] = self._queued_by_client.get(caller.client, 0) + 1
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        caller = waiter.caller
+        queue = self._queues[caller.priority]
+        ids = queue.get(caller.client)
+        waiters = ids.get(caller.client_id) if ids is not None else None
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del ids[caller.client_id]
+            if not ids:
+                del queue[caller.client]
+        self.queued[caller.priority] -= 1
+        remaining = self._queued_by_client[caller.client] - 1
+        if remaining:
+            self._queued_by_client[caller.client] = remaining
+        else:
+            del self._queued_by_client[caller.client]
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            if queue and self._has_slot(priority):
+                client, ids = next(iter(queue.items()))
+                client_id, waiters = next(iter(ids.items()))
+                waiter = waiters[0]
+                self._dequeue(waiter)
+                if client_id in ids:
+                    ids.move_to_end(client_id)
+                if client in queue:
+                    queue.move_to_end(client)
+                return waiter
+        return None
+
+    def _shed_batch(self) -> bool:
+        # Make room for an interactive request by dropping the most recently queued batch request
+        newest = None
+        for ids in self._queues["batch"].values():
+            for waiters in ids.values():
+                if newest is None or waiters[-1].enqueued > newest.enqueued:
+                    newest = waiters[-1]
+        if newest is None:
+            return False
+        self._dequeue(newest)
+        self.shed += 1
+        newest.future.set_exception(AdmissionError(
+            "Shed under load in favour of interactive requests", retry_after=self.retry_after
+        ))
+        return True
+
+    def _grant(self) -> None:
+        now = time.monotonic()
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            deadline = waiter.caller.deadline
+            if deadline is not None and deadline <= now:
+                # Its deadline timer has not fired yet; the caller is gone either way
+                self.expired += 1
+                waiter.future.set_exception(AdmissionError("Deadline passed while queued", status_code=504))
+                continue
+            waiter.future.set_result(self._ticket(waiter.caller, now - waiter.enqueued))
+
+    async def acquire(self, caller: Caller) -> Ticket:
+        now = time.monotonic()
+        if caller.deadline is not None and caller.deadline <= now:
+            self.expired += 1
+            raise AdmissionError("Deadline passed before the request was admitted", status_code=504)
+        if self._has_slot(caller.priority) and not self.queued[caller.priority]:
+            return self._ticket(caller, 0.0)
+        if self._queued_by_client.get(caller.client, 0) >= self.max_queue_per_client:
+            self.rejected["client_limit"] += 1
+            raise AdmissionError("Too many queued requests from this client", 429, self.retry_after)
+        if self.queue_length() >= self.max_queue and not (caller.priority == "interactive" and self._shed_batch()):
+            self.rejected["queue_full"] += 1
+            raise AdmissionError("Server is overloaded", 503, self.retry_after)
+
+        waiter = _Waiter(caller, asyncio.get_running_loop().create_future(), now)
+        self._enqueue(waiter)
+        timeout = None if caller.deadline is None else caller.deadline - now
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.expired += 1
+            raise AdmissionError("Deadline passed while queued", status_code=504)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        # The waiter stopped waiting; give its slot back if it was granted in the meantime
+        self._dequeue(waiter)
+        if not waiter.future.done():
+            waiter.future.cancel()
+        elif not waiter.future.cancelled() and waiter.future.exception() is None:
+            self.release(waiter.future.result())
+
+    def release(self, ticket: Ticket) -> None:
+        self.active[ticket.caller.priority] -= 1
+        self._grant()
+
+    @asynccontextmanager
+    async def admit(self, caller: Caller) -> AsyncIterator[Ticket]:
+        ticket = await self.acquire(caller)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        waits = {}
+        for priority, recent in self._waits.items():
+            waits_ms = np.asarray(recent, dtype=np.float64) * 1000.0
+            p50, p99 = np.percentile(waits_ms, [50, 99]) if waits_ms.size else (0.0, 0.0)
+            waits[priority] = {"p50": float(p50), "p99": float(p99)}
+        return {
+            "max_active": self.max_active,
+            "max_batch_active": self.max_batch_active,
+            "max_queue": self.max_queue,
+            "max_queue_per_client": self.max_queue_per_client,
+            "degrade_queue": self.degrade_queue,
+            "active": dict(self.active),
+            "queued": dict(self.queued),
+            "queued_clients": len(self._queued_by_client),
+            "admitted": dict(self.admitted),
+            "degraded": self.degraded,
+            "rejected": dict(self.rejected),
+            "shed": self.shed,
+            "expired": self.expired,
+            "queue_wait_ms": waits,
+        }
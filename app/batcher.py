@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-query encodes into one forward pass.
+
+    Queries that arrive within `max_wait_ms` of the first pending query (or
+    until `max_batch_size` are pending) are encoded together on `executor`,
+    and each caller gets back its own row.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        executor: Executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        delay_window: int = 1024,
+    ):
+        self.encode_batch = encode
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending = []
+        self._timer = None
+
+        # Metrics
+        self.batches = 0
+        self.queries = 0
+        self.max_observed_batch = 0
+        self.batch_size_counts: Dict[int, int] = {}
+        self._delays = deque(maxlen=delay_window)
+
+    async def encode(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch) -> None:
+        started = time.perf_counter()
+        self.batches += 1
+        self.queries += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+        self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+        self._delays.extend(started - enqueued for _, _, enqueued in batch)
+
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(
+                self.executor, self.encode_batch, [text for text, _, _ in batch]
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for row, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result(embeddings[row])
+
+    def stats(self) -> dict:
+        delays_ms = np.asarray(self._delays, dtype=np.float64) * 1000.0
+        if delays_ms.size:
+            p50, p99 = np.percentile(delays_ms, [50, 99])
+            max_delay = delays_ms.max()
+        else:
+            p50 = p99 = max_delay = 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "max_observed_batch_size": self.max_observed_batch,
+            "batch_size_counts": {str(k): v for k, v in sorted(self.batch_size_counts.items())},
+            "queue_delay_ms": {"p50": float(p50), "p99": float(p99), "max": float(max_delay)},
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,363 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    # all-MiniLM-L6-v2 is uncased, so case and whitespace do not change the embedding
+    return " ".join(query.lower().split())
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RedisCache:
+    """Shared cache tier backed by any Redis-compatible server.
+
+    Failures are treated as misses so a slow or unavailable Redis never fails
+    a request; the short socket timeout bounds how long a lookup can block.
+    """
+
+    def __init__(self, url: str, prefix: str, ttl: float, socket_timeout: float = 0.05):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout
+        )
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception:
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class DirectoryCache:
+    """Shared cache tier for processes on one host: one file per key in `path`.
+
+    Same interface as RedisCache, for pre-forked workers without a Redis.
+    Files are written to a temporary name and renamed, so readers never see
+    a partial value; entries expire `ttl` seconds after they were written,
+    and expired files are swept every `sweep_every` writes.
+    """
+
+    def __init__(self, path: str, ttl: float, sweep_every: int = 256):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            if os.stat(path).st_mtime + self.ttl < time.time():
+                os.unlink(path)
+                value = None
+            else:
+                with open(path, "rb") as f:
+                    value = f.read()
+        except FileNotFoundError:
+            value = None
+        except OSError:
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            fd, temporary = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(temporary, self._file(key))
+        except OSError:
+            self.errors += 1
+            return
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.sweep()
+
+    def sweep(self) -> None:
+        expired = time.time() - self.ttl
+        for entry in os.scandir(self.path):
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class TieredCache:
+    """Local TTL/LRU cache with an optional shared Redis tier behind it.
+
+    Keys must be strings. Values are stored as-is locally and converted with
+    `dumps`/`loads` for the shared tier. `namespace` is prepended to every
+    key, so changing it (e.g. when the catalog changes) invalidates every
+    replica's entries at once. Without Redis, `share_directory` gives
+    processes on one host a DirectoryCache as the shared tier instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        redis_url: Optional[str] = None,
+        namespace: str = "",
+    ):
+        self.name = name
+        self.local = TTLCache(maxsize, ttl)
+        self.dumps = dumps
+        self.loads = loads
+        self.namespace = namespace
+        self.remote = None
+        if redis_url:
+            try:
+                self.remote = RedisCache(redis_url, f"shl:{name}:", ttl)
+            except ImportError:
+                print(f"REDIS_URL is set but the redis package is not installed; {name} cache is local only")
+
+    def share_directory(self, path: str) -> None:
+        if self.remote is None:
+            self.remote = DirectoryCache(os.path.join(path, self.name), self.local.ttl)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def get(self, key: str) -> Optional[Any]:
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None or self.remote is None:
+            return value
+        raw = self.remote.get(key)
+        if raw is None:
+            return None
+        value = self.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    def get_local(self, key: str) -> Optional[Any]:
+        # Local tier only: never waits on the network
+        return self.local.get(self._key(key))
+
+    def set(self, key: str, value: Any) -> None:
+        key = self._key(key)
+        self.local.set(key, value)
+        if self.remote is not None:
+            self.remote.set(key, self.dumps(value))
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        if namespace is not None:
+            self.namespace = namespace
+        self.local.clear()
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        stats["namespace"] = self.namespace
+        if self.remote is not None:
+            stats["redis"] = self.remote.stats()
+        return stats
+
+
+class SemanticCache:
+    """Size-bounded LRU cache looked up by query embedding instead of exact key.
+
+    `get` returns the value stored for the most similar cached embedding when
+    their cosine similarity is at least `threshold`, so paraphrases of a query
+    share one entry. Embeddings (L2-normalized) sit in one preallocated
+    (maxsize x dim) matrix and a lookup is a single matrix-vector product.
+    Entries only match within the same `scope`, e.g. the same result count
+    and filters, and expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.92, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix = None  # allocated by the first `set`, once the dimension is known
+        self._clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_similarity = 0.0
+
+    def _clear(self) -> None:
+        self._filled = 0
+        self._scope_of = np.full(self.maxsize, -1, dtype=np.int32)
+        self._expires = np.zeros(self.maxsize, dtype=np.float64)
+        self._last_used = np.zeros(self.maxsize, dtype=np.int64)
+        self._values = [None] * self.maxsize
+        self._scope_ids = {}
+        self._clock = 0
+
+    def _best(self, embedding: np.ndarray, scope_id: int, now: float):
+        # Most similar live entry of the scope: (slot, similarity), or (None, -inf)
+        n = self._filled
+        if self._matrix is None or n == 0:
+            return None, -np.inf
+        similarities = self._matrix[:n] @ embedding
+        live = (self._scope_of[:n] == scope_id) & (self._expires[:n] > now)
+        similarities = np.where(live, similarities, -np.inf)
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def get(self, embedding: np.ndarray, scope: str, threshold: Optional[float] = None) -> Optional[Any]:
+        # `threshold` overrides self.threshold for this lookup
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            slot, similarity = (None, -np.inf) if scope_id is None else self._best(embedding, scope_id, time.monotonic())
+            if slot is None or similarity < threshold:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            self._hit_similarity += similarity
+            return self._values[slot]
+
+    def set(self, embedding: np.ndarray, scope: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.maxsize, len(embedding)), dtype=np.float32)
+            if scope not in self._scope_ids and len(self._scope_ids) >= 4 * self.maxsize:
+                # Scope ids are never reused; start over rather than grow without bound
+                self._clear()
+            scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            slot, similarity = self._best(embedding, scope_id, now)
+            if slot is None or similarity < 0.9999:
+                # A new entry: a free slot, else an expired one, else the least recently used
+                if self._filled < self.maxsize:
+                    slot = self._filled
+                    self._filled += 1
+                else:
+                    expired = np.flatnonzero(self._expires <= now)
+                    if len(expired):
+                        slot = int(expired[0])
+                    else:
+                        slot = int(np.argmin(self._last_used))
+                        self.evictions += 1
+            self._clock += 1
+            self._matrix[slot] = embedding
+            self._scope_of[slot] = scope_id
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = self._clock
+            self._values[slot] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires[:self._filled] > time.monotonic()))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_hit_similarity": self._hit_similarity / self.hits if self.hits else 0.0,
+        }
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_MINUTES = re.compile(r"(\d+)")
+
+
+def parse_duration_minutes(duration: str) -> int:
+    # "24 minutes" -> 24; unknown or missing durations become -1
+    match = _MINUTES.search(duration or "")
+    return int(match.group(1)) if match else -1
+
+
+def split_test_types(test_type: str) -> List[str]:
+    return [t.strip() for t in (test_type or "").split(",") if t.strip()]
+
+
+class CatalogColumns:
+    """Structured assessment attributes compiled into columnar arrays.
+
+    Durations become integer minutes, comma-joined `test_type` values become a
+    bitmask per row, and the boolean flags become boolean arrays, so filters
+    are evaluated as vectorized masks instead of per-row Python checks.
+    """
+
+    def __init__(self, assessments: List[dict]):
+        self.size = len(assessments)
+        self.test_type_names = sorted({t for a in assessments for t in split_test_types(a.get("test_type"))})
+        if len(self.test_type_names) > 64:
+            raise ValueError("At most 64 distinct test types are supported")
+        self._type_bits = {name.lower(): 1 << i for i, name in enumerate(self.test_type_names)}
+
+        self.duration_minutes = np.array(
+            [parse_duration_minutes(a.get("duration")) for a in assessments], dtype=np.int32
+        )
+        self.test_type_bits = np.array(
+            [self.type_mask(split_test_types(a.get("test_type"))) for a in assessments], dtype=np.uint64
+        )
+        self.remote_testing = np.array([bool(a.get("remote_testing")) for a in assessments], dtype=bool)
+        self.adaptive_irt = np.array([bool(a.get("adaptive_irt")) for a in assessments], dtype=bool)
+
+    def type_mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            bit = self._type_bits.get(name.strip().lower())
+            if bit is None:
+                raise ValueError(f"Unknown test type {name!r}; expected one of {self.test_type_names}")
+            mask |= bit
+        return mask
+
+    def select(
+        self,
+        test_types: Optional[List[str]] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        adaptive: Optional[bool] = None,
+        remote: Optional[bool] = None,
+    ) -> Optional[np.ndarray]:
+        """Row indices that satisfy every given constraint, or None when nothing is constrained.
+
+        `test_types` matches rows having any of the listed types. Rows with an
+        unknown duration never satisfy a duration bound.
+        """
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if test_types:
+            narrow((self.test_type_bits & np.uint64(self.type_mask(test_types))) != 0)
+        if min_duration is not None:
+            narrow(self.duration_minutes >= min_duration)
+        if max_duration is not None:
+            narrow((self.duration_minutes >= 0) & (self.duration_minutes <= max_duration))
+        if adaptive is not None:
+            narrow(self.adaptive_irt == adaptive)
+        if remote is not None:
+            narrow(self.remote_testing == remote)
+        return None if mask is None else np.flatnonzero(mask)
+
+
+CATALOG_FIELDS = ("name", "url", "remote_testing", "adaptive_irt", "duration", "test_type", "description")
+
+
+class Catalog:
+    """Assessment catalog stored column-wise, with lookups by name and URL.
+
+    `version` is a digest of every field, so any edit (not only ones that
+    change the embedded text) yields a new version.
+    """
+
+    def __init__(self, rows: List[dict]):
+        for position, row in enumerate(rows):
+            missing = [field for field in CATALOG_FIELDS if field not in row]
+            if missing:
+                raise ValueError(f"Catalog row {position} is missing {missing}")
+        self.size = len(rows)
+        self.columns = {field: [row[field] for row in rows] for field in CATALOG_FIELDS}
+        self.by_name = self._unique_index("name")
+        self.by_url = self._unique_index("url")
+        self.attributes = CatalogColumns(rows)
+        digest = hashlib.sha1(json.dumps(self.columns, sort_keys=True).encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+    def _unique_index(self, field: str) -> Dict[str, int]:
+        index = {}
+        for position, value in enumerate(self.columns[field]):
+            if value in index:
+                raise ValueError(f"Duplicate catalog {field}: {value!r}")
+            index[value] = position
+        return index
+
+    def row(self, position: int) -> dict:
+        return {field: self.columns[field][position] for field in CATALOG_FIELDS}
+
+    def find(self, name_or_url: str) -> Optional[int]:
+        position = self.by_name.get(name_or_url)
+        return position if position is not None else self.by_url.get(name_or_url)
+
+    def embedding_texts(self) -> List[str]:
+        return [
+            f"{name} {description} {test_type}"
+            for name, description, test_type in zip(
+                self.columns["name"], self.columns["description"], self.columns["test_type"]
+            )
+        ]
+
+
+def load_catalog(path: str) -> Catalog:
+    """Load a catalog from a JSONL file (one assessment per line) or a SQLite database.
+
+    SQLite files need an `assessments` table with one column per field in
+    `CATALOG_FIELDS`; rows are read in rowid order.
+    """
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            cursor = connection.execute(f"SELECT {', '.join(CATALOG_FIELDS)} FROM assessments ORDER BY rowid")
+            rows = [dict(zip(CATALOG_FIELDS, values)) for values in cursor]
+        finally:
+            connection.close()
+        for row in rows:
+            row["remote_testing"] = bool(row["remote_testing"])
+            row["adaptive_irt"] = bool(row["adaptive_irt"])
+        return Catalog(rows)
+
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: {e}")
+    return Catalog(rows)
@@ -0,0 +1,48 @@
+from typing import List, Tuple
+
+import numpy as np
+
+POOLING_MODES = ("max", "mean")
+
+
+def split_into_windows(text: str, window_words: int = 128, overlap_words: int = 32, max_windows: int = 64) -> List[str]:
+    """Split text into overlapping windows of at most `window_words` words.
+
+    all-MiniLM-L6-v2 silently truncates inputs at 256 word pieces, so anything
+    past roughly 150-200 words never reaches the model in a single pass. Text
+    that fits in one window is returned unchanged.
+    """
+    words = text.split()
+    if len(words) <= window_words:
+        return [text]
+    stride = max(1, window_words - overlap_words)
+    windows = []
+    for start in range(0, len(words), stride):
+        windows.append(" ".join(words[start:start + window_words]))
+        if start + window_words >= len(words) or len(windows) >= max_windows:
+            break
+    return windows
+
+
+def split_documents(texts: List[str], window_words: int = 128, overlap_words: int = 32, max_windows: int = 64) -> Tuple[List[str], np.ndarray]:
+    """Window every text; returns the flat window list and each text's start offset into it."""
+    windows = []
+    offsets = np.empty(len(texts), dtype=np.int64)
+    for position, text in enumerate(texts):
+        offsets[position] = len(windows)
+        windows.extend(split_into_windows(text, window_words, overlap_words, max_windows))
+    return windows, offsets
+
+
+def pool_scores(window_scores: np.ndarray, offsets: np.ndarray, pooling: str = "max") -> np.ndarray:
+    """Pool a (windows x catalog) score matrix into (documents x catalog).
+
+    `offsets` are the first window of each document, as returned by
+    `split_documents`. Each pooling mode is a single reduceat over all rows.
+    """
+    if pooling == "max":
+        return np.maximum.reduceat(window_scores, offsets, axis=0)
+    if pooling == "mean":
+        counts = np.diff(np.append(offsets, len(window_scores)))
+        return np.add.reduceat(window_scores, offsets, axis=0) / counts[:, np.newaxis]
+    raise ValueError(f"Unknown pooling {pooling!r}; expected one of {POOLING_MODES}")
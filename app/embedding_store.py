@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Callable, List
+
+import numpy as np
+
+# Bump when the on-disk layout changes so stale stores are rebuilt
+STORE_VERSION = 1
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def rows_digest(hashes: List[str]) -> str:
+    return hashlib.sha1("".join(hashes).encode("ascii")).hexdigest()[:16]
+
+
+class EmbeddingStore:
+    """Versioned on-disk store of L2-normalized catalog embeddings.
+
+    Rows are keyed by a hash of the text that produced them, so only new or
+    edited catalog entries are re-encoded. The matrix is kept as a `.npy` file
+    and opened with `mmap_mode="r"`, which means a warm start reads no more
+    than the pages that are actually touched.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.manifest_path = os.path.join(directory, f"{slug}.json")
+        self.last_encoded = 0
+        # Identifies the exact set and order of rows last returned by load()
+        self.fingerprint = None
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != STORE_VERSION or manifest.get("model") != self.model_name:
+            return None
+        return manifest
+
+    def _open_matrix(self, manifest):
+        path = os.path.join(self.directory, manifest["file"])
+        try:
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if matrix.ndim != 2 or matrix.shape[0] != len(manifest["hashes"]):
+            return None
+        return matrix
+
+    def _atomic_write(self, path: str, write: Callable) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _save(self, hashes: List[str], matrix: np.ndarray, previous=None) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        digest = rows_digest(hashes)
+        manifest = {
+            "version": STORE_VERSION,
+            "model": self.model_name,
+            "dim": int(matrix.shape[1]),
+            "file": f"{os.path.basename(self.manifest_path)[:-5]}-{digest}.npy",
+            "hashes": hashes,
+        }
+        self._atomic_write(os.path.join(self.directory, manifest["file"]), lambda f: np.save(f, matrix))
+        # The manifest is the commit point: readers only ever see a matrix it points to
+        self._atomic_write(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        if previous and previous["file"] != manifest["file"]:
+            try:
+                os.unlink(os.path.join(self.directory, previous["file"]))
+            except OSError:
+                pass
+        return manifest
+
+    def load(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return normalized embeddings for `texts`, encoding only rows missing from the store."""
+        hashes = [text_hash(t) for t in texts]
+        self.fingerprint = rows_digest(hashes)
+        manifest = self._read_manifest()
+        stored = self._open_matrix(manifest) if manifest else None
+
+        if not texts:
+            # An empty catalog: nothing to encode, and the stored rows are kept for when it fills up again.
+            # Without a store, one probe encoding gives the dimension
+            self.last_encoded = 0
+            dim = stored.shape[1] if stored is not None else normalize_rows(encode([""])).shape[1]
+            return np.zeros((0, dim), dtype=np.float32)
+
+        if stored is not None and manifest["hashes"] == hashes:
+            self.last_encoded = 0
+            return stored
+
+        stored_rows = {h: i for i, h in enumerate(manifest["hashes"])} if stored is not None else {}
+        missing = [i for i, h in enumerate(hashes) if h not in stored_rows]
+
+        encoded = normalize_rows(encode([texts[i] for i in missing])) if missing else None
+        dim = encoded.shape[1] if encoded is not None else stored.shape[1]
+        matrix = np.empty((len(texts), dim), dtype=np.float32)
+        if encoded is not None:
+            matrix[missing] = encoded
+        reused = [i for i, h in enumerate(hashes) if h in stored_rows]
+        if reused:
+            matrix[reused] = stored[[stored_rows[hashes[i]] for i in reused]]
+        self.last_encoded = len(missing)
+
+        try:
+            manifest = self._save(hashes, matrix, previous=manifest)
+        except OSError:
+            # A read-only filesystem should not prevent serving
+            return matrix
+        reopened = self._open_matrix(manifest)
+        return reopened if reopened is not None else matrix
@@ -0,0 +1,100 @@
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+class OnnxEncoder:
+    """Sentence encoder running an ONNX export of the model on onnxruntime.
+
+    Needs the optional `optimum[onnxruntime]` package. The export (and the
+    dynamically quantized int8 variant) is written to `cache_dir` once and
+    reused. Mean pooling matches the sentence-transformers MiniLM models.
+    `threads` caps the session's intra-op thread pool (onnxruntime default:
+    one per core).
+    """
+
+    def __init__(
+        self, model_name: str, cache_dir: str, quantize: bool = False, max_length: int = 256, threads: Optional[int] = None
+    ):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        export_dir = os.path.join(cache_dir, "onnx-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        file_name = "model_quantized.onnx" if quantize else "model.onnx"
+
+        if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+            model = ORTModelForFeatureExtraction.from_pretrained(repo, export=True)
+            model.save_pretrained(export_dir)
+            AutoTokenizer.from_pretrained(repo).save_pretrained(export_dir)
+        if quantize and not os.path.exists(os.path.join(export_dir, file_name)):
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+            quantizer.quantize(
+                save_dir=export_dir,
+                quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            )
+
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            export_dir, file_name=file_name, session_options=session_options
+        )
+        self.max_length = max_length
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, batch_size: int = 32) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts], convert_to_numpy, batch_size)[0]
+        outputs = []
+        # Sorting by length keeps padding (and wasted compute) per batch small
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+            hidden = self.model(**tokens).last_hidden_state
+            mask = tokens["attention_mask"][..., np.newaxis].astype(np.float32)
+            outputs.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        embeddings = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(outputs)
+        return embeddings
+
+
+def set_torch_threads(threads: int) -> None:
+    # torch's intra-op thread count is process-wide, not per model
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+
+
+def load_encoder(model_name: str, backend: str = "torch", cache_dir: str = ".", threads: Optional[int] = None):
+    """Return an object with a sentence-transformers style `encode(texts, convert_to_numpy=True)`.
+
+    torch: full-precision SentenceTransformer (default).
+    torch-int8: the same model with its Linear layers dynamically quantized to int8.
+    onnx / onnx-int8: onnxruntime on an ONNX export, optionally int8-quantized.
+
+    `threads` caps intra-op parallelism; leave it unset to use every core.
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
+    if backend.startswith("onnx"):
+        return OnnxEncoder(model_name, cache_dir, quantize=backend == "onnx-int8", threads=threads)
+
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        set_torch_threads(threads)
+
+    encoder = SentenceTransformer(model_name, device="cpu")
+    if backend == "torch-int8":
+        import torch
+
+        torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return encoder
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from cache import normalize_query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS explanations (
+    id INTEGER PRIMARY KEY,
+    set_key TEXT NOT NULL,
+    names TEXT NOT NULL,
+    query TEXT NOT NULL,
+    centroid BLOB NOT NULL,
+    model TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    support INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS explanations_set_key ON explanations (set_key);
+"""
+
+
+def set_key(names: List[str]) -> str:
+    # Identifies a recommendation set regardless of its order
+    return hashlib.sha1("\x1f".join(sorted(names)).encode("utf-8")).hexdigest()[:16]
+
+
+def rows_digest(rows: List[dict]) -> str:
+    # Changes whenever any field of any assessment in the set changes
+    ordered = sorted(rows, key=lambda row: row["name"])
+    return hashlib.sha1(json.dumps(ordered, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class RequestLog:
+    """Append-only JSONL log of the recommendation sets that needed an explanation.
+
+    One line per explanation: {"time", "query", "names"}. This is what
+    precompute_explanations.py mines for frequent sets. Lines are small and
+    written with O_APPEND, so pre-forked workers can share one file. `record`
+    is called on the event loop, so the writes are queued to a writer thread.
+    """
+
+    def __init__(self, path: str, max_query_chars: int = 2000):
+        self.path = path
+        self.max_query_chars = max_query_chars
+        self._file = None
+        # One thread: writes keep their order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="request-log")
+        self._closed = False
+        self.records = 0
+        self.errors = 0
+
+    def record(self, query: str, names: List[str]) -> None:
+        if self._closed:
+            return
+        line = json.dumps({"time": round(time.time(), 3), "query": query[:self.max_query_chars], "names": names})
+        self._writer.submit(self._write, line + "\n")
+        self.records += 1
+
+    def _write(self, line: str) -> None:
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+        except OSError as e:
+            self.errors += 1
+            if self.errors == 1:
+                print(f"Cannot write the explanation log {self.path}: {e}")
+
+    def close(self) -> None:
+        # Flushes the queued lines first
+        self._closed = True
+        self._writer.shutdown(wait=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_log(path: str, since: float = 0.0) -> Iterator[Tuple[str, List[str]]]:
+    # (query, names) of the records logged at or after `since` (a Unix time)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            if record.get("time", 0.0) >= since and record.get("names"):
+                yield record["query"], record["names"]
+
+
+def mine_frequent_sets(
+    records: Iterator[Tuple[str, List[str]]],
+    encode: Callable[[List[str]], np.ndarray],
+    min_support: int = 5,
+    threshold: float = 0.8,
+    max_sets: int = 500,
+) -> List[dict]:
+    """Frequent (query cluster, recommendation set) pairs, most frequent first.
+
+    Records are grouped by recommendation set. The distinct queries of each
+    set seen at least `min_support` times are embedded with `encode` (which
+    must return L2-normalized rows) and clustered greedily, most frequent
+    first: a query joins the first cluster whose centroid it matches with
+    cosine similarity `threshold`, or starts a new one. Clusters with
+    `min_support` requests become candidates, each with its most frequent
+    query as the representative.
+    """
+    queries_by_set: Dict[str, Counter] = defaultdict(Counter)
+    names_by_set: Dict[str, List[str]] = {}
+    texts: Dict[Tuple[str, str], str] = {}
+    for query, names in records:
+        key = set_key(names)
+        normalized = normalize_query(query)
+        queries_by_set[key][normalized] += 1
+        names_by_set[key] = names
+        texts.setdefault((key, normalized), query)
+
+    frequent = {key: queries for key, queries in queries_by_set.items() if sum(queries.values()) >= min_support}
+    distinct = sorted({normalized for queries in frequent.values() for normalized in queries})
+    if not distinct:
+        return []
+    embeddings = dict(zip(distinct, np.asarray(encode(distinct), dtype=np.float32)))
+
+    candidates = []
+    for key, queries in frequent.items():
+        clusters = []  # [summed embeddings, support, representative]
+        for normalized, count in queries.most_common():
+            embedding = embeddings[normalized]
+            for cluster in clusters:
+                centroid = cluster[0] / np.linalg.norm(cluster[0])
+                if float(centroid @ embedding) >= threshold:
+                    cluster[0] = cluster[0] + count * embedding
+                    cluster[1] += count
+                    break
+            else:
+                clusters.append([count * embedding, count, texts[(key, normalized)]])
+        for total, support, representative in clusters:
+            if support >= min_support:
+                candidates.append({
+                    "names": names_by_set[key],
+                    "query": representative,
+                    "centroid": (total / np.linalg.norm(total)).astype(np.float32),
+                    "support": support,
+                })
+    candidates.sort(key=lambda candidate: -candidate["support"])
+    return candidates[:max_sets]
+
+
+class ExplanationStore:
+    """Persistent explanations for frequent (query cluster, recommendation set) pairs.
+
+    Entries live in a SQLite file written by precompute_explanations.py and
+    are held in memory by the server, grouped by recommendation set, so a
+    lookup is a dict probe plus, for known sets, a dot product against the
+    set's cluster centroids. A hit needs the query embedding to match a
+    centroid with cosine similarity `threshold` and the set's assessments to
+    be unchanged since the explanation was written (`rows_digest`); entries
+    for an edited catalog are skipped until they are regenerated. Centroids
+    from another encoder model are ignored. The file is checked for changes
+    at most every `check_interval` seconds, and reloaded on a background
+    thread while lookups go on answering from the entries already loaded.
+    The server only reads the file (`load` opens it read-only); writing is
+    the precompute job's.
+    """
+
+    def __init__(self, path: str, model_name: str, threshold: float = 0.8, check_interval: float = 30.0):
+        self.path = path
+        self.model_name = model_name
+        self.threshold = threshold
+        self.check_interval = check_interval
+        # set_key -> (centroids matrix, [(digest, explanation)])
+        self._entries: Dict[str, Tuple[np.ndarray, List[Tuple[str, str]]]] = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._reloader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explanation-store")
+        self._reloading: Optional[Future] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.loads = 0
+
+    @contextmanager
+    def connect(self, read_only: bool = False) -> Iterator[sqlite3.Connection]:
+        # Commits on success, rolls back on error, and always closes. Read-only
+        # connections need no write access to the file and create nothing
+        if read_only:
+            uri = "file:" + quote(os.path.abspath(self.path)) + "?mode=ro"
+            connection = sqlite3.connect(uri, uri=True, timeout=10.0)
+        else:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            if not read_only:
+                connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def rows(self) -> List[dict]:
+        # Every entry, for the precompute job
+        if not os.path.exists(self.path):
+            return []
+        with self.connect() as connection:
+            cursor = connection.execute(
+                "SELECT id, set_key, names, query, centroid, model, digest, support FROM explanations"
+            )
+            return [
+                {
+                    "id": entry_id, "set_key": key, "names": json.loads(names), "query": query,
+                    "centroid": np.frombuffer(centroid, dtype=np.float32), "model": model,
+                    "digest": digest, "support": support,
+                }
+                for entry_id, key, names, query, centroid, model, digest, support in cursor
+            ]
+
+    def put(
+        self,
+        names: List[str],
+        query: str,
+        centroid: np.ndarray,
+        digest: str,
+        explanation: str,
+        support: int,
+        entry_id: Optional[int] = None,
+    ) -> None:
+        values = (
+            set_key(names), json.dumps(names), query, np.asarray(centroid, dtype=np.float32).tobytes(),
+            self.model_name, digest, explanation, support, time.time(),
+        )
+        with self.connect() as connection:
+            if entry_id is None:
+                connection.execute(
+                    "INSERT INTO explanations (set_key, names, query, centroid, model, digest, explanation, support, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values
+                )
+            else:
+                connection.execute(
+                    "UPDATE explanations SET set_key = ?, names = ?, query = ?, centroid = ?, model = ?, digest = ?,"
+                    " explanation = ?, support = ?, updated = ? WHERE id = ?", values + (entry_id,)
+                )
+
+    def delete(self, entry_ids: List[int]) -> None:
+        with self.connect() as connection:
+            connection.executemany("DELETE FROM explanations WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def load(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._entries, self._mtime = {}, None
+            return
+        grouped = defaultdict(list)
+        with self.connect(read_only=True) as connection:
+            has_table = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'explanations'"
+            ).fetchone()
+            # An empty file (e.g. created by the job before its first write) has no table yet
+            cursor = connection.execute(
+                "SELECT set_key, centroid, digest, explanation FROM explanations WHERE model = ?", (self.model_name,)
+            ) if has_table else []
+            for key, centroid, digest, explanation in cursor:
+                grouped[key].append((np.frombuffer(centroid, dtype=np.float32), digest, explanation))
+        self._entries = {
+            key: (np.stack([centroid for centroid, _, _ in entries]), [(digest, text) for _, digest, text in entries])
+            for key, entries in grouped.items()
+        }
+        self._mtime = mtime
+        self.loads += 1
+
+    def _maybe_reload(self) -> None:
+        # Called on the event loop: the stat and any reload run on the reloader thread
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        if self._reloading is None or self._reloading.done():
+            self._reloading = self._reloader.submit(self._reload_if_changed)
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        try:
+            with self._lock:
+                self.load()
+        except sqlite3.Error as e:
+            # Keep answering from the entries already loaded
+            print(f"Cannot reload the explanation store {self.path}: {e}")
+
+    def lookup(self, rows: List[dict], query_embedding: np.ndarray) -> Optional[str]:
+        """Precomputed explanation for these recommended catalog rows and query, or None."""
+        self._maybe_reload()
+        entries = self._entries.get(set_key([row["name"] for row in rows]))
+        if entries is None:
+            self.misses += 1
+            return None
+        centroids, explanations = entries
+        similarities = centroids @ query_embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+        digest, explanation = explanations[best]
+        if digest != rows_digest(rows):
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return explanation
+
+    def __len__(self) -> int:
+        return sum(len(explanations) for _, explanations in self._entries.values())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "sets": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "loads": self.loads,
+        }
@@ -0,0 +1,268 @@
+import asyncio
+import ipaddress
+import json
+import re
+import socket
+import time
+from concurrent.futures import Executor
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+
+from cache import TTLCache
+
+# Elements that never hold the job description itself
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"]
+_WHITESPACE = re.compile(r"\s+")
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class FetchError(Exception):
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class NonPublicAddressError(OSError):
+    pass
+
+
+def is_public_address(host: str) -> bool:
+    return ipaddress.ip_address(host.split("%")[0]).is_global
+
+
+class PublicAddressResolver:
+    """aiohttp resolver that drops loopback, private and link-local addresses.
+
+    Filtering the addresses aiohttp actually connects to, rather than those
+    of a separate lookup made beforehand, leaves no window for DNS rebinding
+    (a name resolving to a public address for the check, then to 127.0.0.1
+    for the connection). Wraps aiohttp's default resolver; registered as an
+    `aiohttp.abc.AbstractResolver` when the session is created.
+    """
+
+    def __init__(self, resolver=None):
+        self.resolver = resolver
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> list:
+        if self.resolver is None:
+            from aiohttp.resolver import DefaultResolver
+
+            self.resolver = DefaultResolver()
+        hosts = await self.resolver.resolve(host, port, family)
+        public = [entry for entry in hosts if is_public_address(entry["host"])]
+        if not public:
+            addresses = ", ".join(entry["host"] for entry in hosts)
+            raise NonPublicAddressError(f"Refusing to fetch non-public address {addresses} of {host}")
+        return public
+
+    async def close(self) -> None:
+        if self.resolver is not None:
+            await self.resolver.close()
+
+
+def _job_posting_description(soup) -> Optional[str]:
+    # Most job boards embed schema.org JobPosting JSON-LD, which is the cleanest source
+    from bs4 import BeautifulSoup
+
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if isinstance(item, dict) and item.get("@type") == "JobPosting" and item.get("description"):
+                title = item.get("title", "")
+                description = BeautifulSoup(item["description"], "html.parser").get_text(" ")
+                return f"{title} {description}".strip()
+    return None
+
+
+def extract_main_text(html: str) -> str:
+    """Return the main job-description text of an HTML page, whitespace-collapsed.
+
+    CPU-bound; run it on a worker pool rather than the event loop.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    text = _job_posting_description(soup)
+    if not text:
+        for tag in soup(_BOILERPLATE_TAGS):
+            tag.decompose()
+        candidates = soup.select("article, main, [role=main]")
+        if candidates:
+            root = max(candidates, key=lambda node: len(node.get_text(" ", strip=True)))
+        else:
+            root = soup.body or soup
+        text = root.get_text(" ", strip=True)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class JobPageFetcher:
+    """Fetches job-description pages through one pooled aiohttp session.
+
+    Connections are capped in total and per host, every request has a
+    deadline, and extracted text is cached per URL. Cached entries are served
+    as-is for `fresh_for` seconds, then revalidated with ETag/Last-Modified so
+    unchanged pages are not downloaded or parsed again. Concurrent requests
+    for the same URL share one fetch. Unless `allow_private_hosts` is set,
+    loopback, private and link-local addresses are refused (server-side
+    request forgery), including after a redirect.
+    """
+
+    def __init__(
+        self,
+        parser_executor: Executor,
+        max_connections: int = 100,
+        max_per_host: int = 4,
+        timeout: float = 10.0,
+        max_bytes: int = 2 * 1024 * 1024,
+        cache_size: int = 1024,
+        cache_ttl: float = 86400.0,
+        fresh_for: float = 300.0,
+        allow_private_hosts: bool = False,
+        max_redirects: int = 5,
+    ):
+        self.parser_executor = parser_executor
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.allow_private_hosts = allow_private_hosts
+        self.max_redirects = max_redirects
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._session = None
+        self._inflight = {}
+
+        self.fetches = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def _get_session(self):
+        import aiohttp
+        from aiohttp.abc import AbstractResolver
+
+        if self._session is None or self._session.closed:
+            AbstractResolver.register(PublicAddressResolver)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, limit_per_host=self.max_per_host, ttl_dns_cache=300,
+                    resolver=None if self.allow_private_hosts else PublicAddressResolver()
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": "SHL-Assessment-Recommender/1.0", "Accept": "text/html,application/xhtml+xml"},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    def _check_host(self, url: str) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(f"Unsupported URL: {url}", status_code=400)
+        # aiohttp connects to IP literals without asking the resolver, so they are checked here
+        if self.allow_private_hosts:
+            return
+        try:
+            public = is_public_address(parts.hostname)
+        except ValueError:
+            return
+        if not public:
+            raise FetchError(f"Refusing to fetch non-public address {parts.hostname}", status_code=400)
+
+    async def fetch_text(self, url: str) -> str:
+        entry = self.cache.get(url)
+        if entry is not None and time.monotonic() - entry["checked_at"] < self.fresh_for:
+            return entry["text"]
+
+        inflight = self._inflight.get(url)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._fetch(url, entry))
+            self._inflight[url] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(inflight)
+
+    async def _fetch(self, url: str, entry: Optional[dict]) -> str:
+        import aiohttp
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.fetches += 1
+        session = self._get_session()
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                self._check_host(current)
+                async with session.get(current, headers=headers, allow_redirects=False) as response:
+                    if response.status in _REDIRECT_STATUSES and "Location" in response.headers:
+                        current = urljoin(current, response.headers["Location"])
+                        continue
+                    if response.status == 304 and entry is not None:
+                        self.not_modified += 1
+                        entry = dict(entry, checked_at=time.monotonic())
+                        self.cache.set(url, entry)
+                        return entry["text"]
+                    if response.status >= 400:
+                        raise FetchError(f"{url} returned HTTP {response.status}")
+                    chunks = []
+                    received = 0
+                    # Pages larger than max_bytes are truncated rather than rejected
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        chunks.append(chunk)
+                        received += len(chunk)
+                        if received >= self.max_bytes:
+                            break
+                    body = b"".join(chunks)[:self.max_bytes]
+                    charset = response.charset or "utf-8"
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    break
+            else:
+                raise FetchError(f"Too many redirects fetching {url}")
+        except asyncio.TimeoutError:
+            self.errors += 1
+            raise FetchError(f"Timed out fetching {url}", status_code=504)
+        except aiohttp.ClientConnectorError as e:
+            self.errors += 1
+            if isinstance(e.os_error, NonPublicAddressError):
+                raise FetchError(str(e.os_error), status_code=400)
+            if isinstance(e.os_error, socket.gaierror):
+                raise FetchError(f"Cannot resolve {e.host}: {e.os_error}", status_code=400)
+            raise FetchError(f"Error fetching {url}: {e}")
+        except aiohttp.ClientError as e:
+            self.errors += 1
+            raise FetchError(f"Error fetching {url}: {e}")
+        except FetchError:
+            self.errors += 1
+            raise
+
+        try:
+            html = body.decode(charset, errors="replace")
+        except LookupError:
+            html = body.decode("utf-8", errors="replace")
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self.parser_executor, extract_main_text, html)
+        if not text:
+            raise FetchError(f"No job description text found at {url}", status_code=422)
+        self.cache.set(url, {
+            "text": text, "etag": etag, "last_modified": last_modified, "checked_at": time.monotonic()
+        })
+        return text
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+            "cache": self.cache.stats(),
+        }
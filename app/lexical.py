@@ -0,0 +1,147 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_index import top_k_rows
+
+# Keeps technology names intact: ".NET", "ADO.NET", "C#", "C++", "G+", "CSS3", "4.5"
+_TOKEN = re.compile(r"\.?[a-z0-9](?:[a-z0-9+#]|\.(?=[a-z0-9]))*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was were will with "
+    "we you your our who what which can into must should than then there these they those".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; dotted names also yield their parts ("ado.net" -> "ado.net", "ado", ".net")."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = token.lstrip(".").split(".")
+        if len(parts) > 1:
+            tokens.append(parts[0] if not token.startswith(".") else "." + parts[0])
+            tokens.extend("." + part for part in parts[1:])
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents, stored as CSR postings.
+
+    Each term's postings are a slice of `doc_ids` (int32) with the matching
+    precomputed BM25 weights (float32), so scoring a query is one
+    concatenation of its terms' slices and one `np.bincount`.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.2, b: float = 0.75):
+        self.size = len(documents)
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+
+        term_ids, doc_ids, counts = [], [], []
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            frequencies: Dict[int, int] = {}
+            for token in tokens:
+                term = self.vocabulary.setdefault(token, len(self.vocabulary))
+                frequencies[term] = frequencies.get(term, 0) + 1
+            term_ids.extend(frequencies)
+            doc_ids.extend([doc] * len(frequencies))
+            counts.extend(frequencies.values())
+
+        term_ids = np.array(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        self.doc_ids = np.array(doc_ids, dtype=np.int32)[order]
+        tf = np.array(counts, dtype=np.float32)[order]
+        document_frequency = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.indptr = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+
+        idf = np.log1p((self.size - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = max(float(lengths.mean()), 1.0) if self.size else 1.0
+        norm = k1 * (1 - b + b * lengths[self.doc_ids] / average_length)
+        self.weights = (np.repeat(idf, document_frequency) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def term_ids(self, text: str) -> np.ndarray:
+        ids = {self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary}
+        return np.fromiter(ids, dtype=np.int64, count=len(ids))
+
+    def score(self, text: str) -> np.ndarray:
+        # Query terms count once each: repeating a word in a long job description should not multiply it
+        terms = self.term_ids(text)
+        if len(terms) == 0:
+            return np.zeros(self.size, dtype=np.float32)
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        # Every posting position of every query term, without a Python loop
+        positions = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return np.bincount(self.doc_ids[positions], self.weights[positions], minlength=self.size).astype(np.float32)
+
+    def score_batch(self, texts: List[str], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(texts x documents) BM25 scores, or (texts x rows) when `rows` is given."""
+        scores = np.stack([self.score(text) for text in texts]) if texts else np.zeros((0, self.size), np.float32)
+        return scores if rows is None else scores[:, rows]
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.doc_ids.nbytes + self.weights.nbytes
+
+
+def reciprocal_rank_fusion(
+    dense_scores: np.ndarray,
+    dense_ids: np.ndarray,
+    lexical_scores: np.ndarray,
+    rows: Optional[np.ndarray],
+    size: int,
+    k: int,
+    similarity_threshold: float = 0.3,
+    rrf_k: float = 60.0,
+    lexical_candidates: int = 50,
+    lexical_min_ratio: float = 0.5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse a dense and a BM25 ranking for a batch of queries; returns `(scores, ids)`, (queries x up to k).
+
+    `dense_scores`/`dense_ids` are each query's sorted cosine candidates (id -1
+    is padding). `lexical_scores` are BM25 scores over all `size` documents,
+    or over `rows` only. A candidate is kept if its cosine score exceeds
+    `similarity_threshold` or its BM25 score is at least `lexical_min_ratio`
+    of the query's best; the rest score -inf and come back as padding, id -1.
+    Ties go to the document ranked higher by cosine.
+    """
+    n_queries = len(dense_ids)
+    queries = np.arange(n_queries)[:, np.newaxis]
+    # Column `size` is a sink for padding entries
+    fused = np.zeros((n_queries, size + 1), dtype=np.float32)
+    relevant = np.zeros((n_queries, size + 1), dtype=bool)
+
+    dense_ids = np.where(dense_ids >= 0, dense_ids, size)
+    fused[queries, dense_ids] += 1.0 / (rrf_k + np.arange(1, dense_ids.shape[1] + 1, dtype=np.float32))
+    relevant[queries, dense_ids] = dense_scores > similarity_threshold
+
+    lexical_positions = top_k_rows(lexical_scores, lexical_candidates)
+    lexical_top = np.take_along_axis(lexical_scores, lexical_positions, axis=1)
+    lexical_ids = lexical_positions if rows is None else rows[lexical_positions]
+    # Documents sharing no term with the query are not lexical candidates at all
+    lexical_ids = np.where(lexical_top > 0, lexical_ids, size)
+    fused[queries, lexical_ids] += 1.0 / (rrf_k + np.arange(1, lexical_ids.shape[1] + 1, dtype=np.float32))
+    relevant[queries, lexical_ids] |= lexical_top >= lexical_min_ratio * lexical_top[:, :1]
+
+    scores = np.where(relevant, fused, -np.inf)
+    scores[:, size] = -np.inf
+    # Only documents on either list can score, so just those are sorted: dense list first, then
+    # lexical, and a stable sort, so ties go to the better dense rank, then the better lexical rank
+    candidates = np.concatenate([dense_ids, lexical_ids], axis=1)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    # A document on both lists keeps its dense entry only
+    in_dense = np.zeros((n_queries, size + 1), dtype=bool)
+    in_dense[queries, dense_ids] = True
+    candidate_scores[:, dense_ids.shape[1]:][in_dense[queries, lexical_ids]] = -np.inf
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")[:, :k]
+    top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    top_ids = np.where(top_scores > -np.inf, np.take_along_axis(candidates, order, axis=1), -1)
+    return top_scores, top_ids
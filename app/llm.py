@@ -0,0 +1,345 @@
+import asyncio
+import random
+import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Callable, Optional
+
+import numpy as np
+
+# HTTP statuses (as google.api_core exceptions report them in `.code`) worth retrying
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The LLM call failed; callers fall back to a local explanation."""
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while.
+
+    Closed: calls pass and consecutive failures are counted. After
+    `failure_threshold` of them it opens and rejects every call for
+    `reset_timeout` seconds, then half-opens and lets a single trial call
+    through; its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_running:
+                return False
+            self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        # The call ended without telling us anything about the dependency (e.g. it was cancelled)
+        self._trial_running = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.opened,
+        }
+
+
+class LLMClient:
+    """Resilient async access to a Gemini-style model.
+
+    `model_factory()` returns an object with `generate_content_async(prompt,
+    stream=False)`. Calls share a concurrency cap, and each call has a total
+    `timeout` covering the wait for a slot, every attempt and the backoff
+    between them; single attempts are also capped at `attempt_timeout`.
+    Retryable failures (timeouts, 429 and 5xx) are retried with full-jitter
+    exponential backoff and feed the circuit breaker; while it is open calls
+    fail immediately with `CircuitOpenError`.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        attempt_timeout: float = 5.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None,
+        latency_window: int = 1024,
+    ):
+        self.model_factory = model_factory
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        # asyncio primitives belong to one event loop: one semaphore per loop calling in
+        # (the serving loop, and main's loop for synchronous callers), created lazily
+        self._semaphores = weakref.WeakKeyDictionary()
+
+        # Metrics
+        self.calls = 0
+        self.successes = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def _get_semaphore(self, loop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _admit(self, loop, timeout: Optional[float]) -> float:
+        self.calls += 1
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Circuit breaker is open")
+        return loop.time() + (self.timeout if timeout is None else min(self.timeout, timeout))
+
+    async def _acquire(self, loop, deadline: float) -> asyncio.Semaphore:
+        # Returns the semaphore acquired, which the caller must release
+        semaphore = self._get_semaphore(loop)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - loop.time()))
+            return semaphore
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            # We are saturated, which says nothing about the dependency's health
+            self.breaker.release()
+            raise LLMTimeoutError(f"No LLM slot free within {self.timeout:g}s")
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _failed(self, error: BaseException) -> None:
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+        else:
+            self.errors += 1
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # Bad requests and blocked responses are not outages
+            self.breaker.release()
+
+    async def _backoff(self, loop, attempt: int, deadline: float) -> bool:
+        # Full jitter; False when the remaining budget cannot fit another attempt
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if loop.time() + delay >= deadline:
+            return False
+        self.retries += 1
+        await asyncio.sleep(delay)
+        return True
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        # `timeout` shortens the total budget, e.g. to what is left of the caller's deadline
+        loop = asyncio.get_running_loop()
+        deadline = self._admit(loop, timeout)
+        started = loop.time()
+        semaphore = await self._acquire(loop, deadline)
+        self.in_flight += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                self.attempts += 1
+                remaining = min(self.attempt_timeout, deadline - loop.time())
+                try:
+                    response = await asyncio.wait_for(
+                        self.model_factory().generate_content_async(prompt), timeout=max(0.0, remaining)
+                    )
+                    text = response.text
+                except asyncio.CancelledError:
+                    self.breaker.release()
+                    raise
+                except Exception as e:
+                    self._failed(e)
+                    if not is_retryable(e) or attempt == self.max_retries or not self.breaker.allow():
+                        raise self._wrap(e)
+                    if not await self._backoff(loop, attempt, deadline):
+                        raise self._wrap(e)
+                    continue
+                self.breaker.record_success()
+                self.successes += 1
+                self._latencies.append(loop.time() - started)
+                return text
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        # Yields text chunks. Failures before the first chunk are retried like
+        # generate(); once text has been sent to the caller they are raised.
+        loop = asyncio.get_running_loop()
+        deadline = self._admit(loop, timeout)
+        started = loop.time()
+        semaphore = await self._acquire(loop, deadline)
+        self.in_flight += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                self.attempts += 1
+                sent = False
+                try:
+                    response = await asyncio.wait_for(
+                        self.model_factory().generate_content_async(prompt, stream=True),
+                        timeout=max(0.0, min(self.attempt_timeout, deadline - loop.time()))
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(
+                                chunks.__anext__(), timeout=max(0.0, deadline - loop.time())
+                            )
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            sent = True
+                            yield chunk.text
+                except (asyncio.CancelledError, GeneratorExit):
+                    self.breaker.release()
+                    raise
+                except Exception as e:
+                    self._failed(e)
+                    if sent or not is_retryable(e) or attempt == self.max_retries or not self.breaker.allow():
+                        raise self._wrap(e)
+                    if not await self._backoff(loop, attempt, deadline):
+                        raise self._wrap(e)
+                    continue
+                self.breaker.record_success()
+                self.successes += 1
+                self._latencies.append(loop.time() - started)
+                return
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    def _wrap(self, error: BaseException) -> LLMError:
+        self.failed += 1
+        if isinstance(error, asyncio.TimeoutError):
+            return LLMTimeoutError(f"LLM call timed out after {self.timeout:g}s")
+        return LLMError(str(error))
+
+    def stats(self) -> dict:
+        latencies = np.array(self._latencies) * 1000.0
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected_open_circuit": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            # Every call that did not return text ended in the caller's fallback
+            "fallbacks": self.failed + self.rejected + self.queue_timeouts,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            },
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeServiceError(Exception):
+    # Mirrors google.api_core.exceptions.ServiceUnavailable
+    code = 503
+
+
+class FakeGeminiModel:
+    """Local stand-in for `genai.GenerativeModel` with adjustable latency and failures.
+
+    Lets the service, benchmarks and load tests run without an API key or
+    network access (LLM_BACKEND=fake). The fields can be changed at runtime to
+    simulate a slowdown or an outage.
+    """
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, chunks: int = 4, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunks = max(1, chunks)
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            raise FakeServiceError("503 The model is overloaded. Please try again later.")
+        return f"These assessments were selected for their relevance to the request ({len(prompt)} characters of context)."
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        time.sleep(self.latency)
+        return FakeResponse(self._answer(prompt))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        await asyncio.sleep(self.latency if not stream else self.latency / self.chunks)
+        text = self._answer(prompt)
+        if not stream:
+            return FakeResponse(text)
+        return self._stream(text)
+
+    async def _stream(self, text: str) -> AsyncIterator[FakeResponse]:
+        step = -(-len(text) // self.chunks)
+        for start in range(0, len(text), step):
+            if start:
+                await asyncio.sleep(self.latency / self.chunks)
+            yield FakeResponse(text[start:start + step])
@@ -1,20 +1,59 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+import asyncio
+import hmac
 import json
+import multiprocessing
 import os
+import re
+import signal
+import sys
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
-import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
 import numpy as np
-import pandas as pd
+
+# Make sibling modules importable whether we run as `main` (render) or `app.main` (local)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from embedding_store import EmbeddingStore
+from batcher import EmbeddingBatcher
+from cache import SemanticCache, TieredCache, normalize_query
+from vector_index import load_or_build_index, top_k_rows
+from catalog import load_catalog, parse_duration_minutes, split_test_types
+from fetcher import FetchError, JobPageFetcher
+from chunking import POOLING_MODES, pool_scores, split_documents
+from encoders import load_encoder
+from llm import CircuitBreaker, FakeGeminiModel, LLMClient, LLMError
+from lexical import BM25Index, reciprocal_rank_fusion
+from rerank import RerankBudget, load_reranker
+from timing import stage
+from metrics import MetricsMiddleware, MetricsRegistry
+from profiler import SamplingProfiler
+from admission import AdmissionController, AdmissionError, Caller, Ticket
+from explanation_store import ExplanationStore, RequestLog
+from serialization import JSON_BACKEND, dumps, recommendation_json
+from multivector import FieldEmbeddings, field_texts, is_text_only, parse_field_weights, stack_fields, weight_vector
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The server binds right away; the model and catalog load in the background (see warm_up)
+    await start_background_tasks()
+    yield
+    await stop_background_tasks()
+
 # Initialize FastAPI app
-app = FastAPI(title="SHL Assessment Recommendation System")
+app = FastAPI(title="SHL Assessment Recommendation System", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -30,13 +69,39 @@ app.add_middleware(
     max_age=86400  # 24 hours
 )
 
-# Initialize Gemini
+# Initialize Gemini lazily; importing google.generativeai is slow.
+# LLM_BACKEND=fake swaps in a local stand-in (no API key or network) for load tests.
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+_gemini_model = None
+
+def gemini_model():
+    global _gemini_model
+    if _gemini_model is None and LLM_BACKEND == "fake":
+        _gemini_model = FakeGeminiModel(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.5")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+        )
+    if _gemini_model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+    return _gemini_model
 
-# Initialize sentence transformer with efficient settings
-encoder = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+def env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(APP_DIR, ".embedding_cache"))
+
+# Sentence transformer settings; the model itself is loaded by warm_up(). ENCODER_BACKEND
+# selects a faster CPU path: torch (default), torch-int8, onnx or onnx-int8.
+ENCODER_MODEL = os.getenv("ENCODER_MODEL", "all-MiniLM-L6-v2")
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# Intra-op threads for the encoder (unset: one per core)
+ENCODER_THREADS = env_int("ENCODER_THREADS")
+encoder = None
 
 # Load and prepare assessment data
 class Assessment(BaseModel):
@@ -48,641 +113,1483 @@ class Assessment(BaseModel):
     test_type: str
     description: str
 
-# Sample assessment data (in production, this would come from a database)
-ASSESSMENTS = [
-    {
-        "name": "SHL Verify G+ Cognitive Ability Test",
-        "url": "https://www.shl.com/solutions/products/verify-g-plus/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "24 minutes",
-        "test_type": "Cognitive",
-        "description": "Measures critical reasoning through numerical, verbal, and abstract tests"
-    },
-    {
-        "name": "SHL Coding Pro",
-        "url": "https://www.shl.com/solutions/products/coding-pro/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Technical",
-        "description": "Evaluates programming skills in multiple languages including Java, Python, JavaScript"
-    },
-    {
-        "name": "SHL Personality Assessment (OPQ)",
-        "url": "https://www.shl.com/solutions/products/opq/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "25 minutes",
-        "test_type": "Personality",
-        "description": "Measures workplace behavioral styles and preferences"
-    },
-    {
-        "name": "SHL SQL Pro",
-        "url": "https://www.shl.com/solutions/products/sql-pro/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Technical",
-        "description": "Tests SQL querying and database manipulation skills"
-    },
-    {
-        "name": "SHL Verify Interactive",
-        "url": "https://www.shl.com/solutions/products/verify-interactive/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "30 minutes",
-        "test_type": "Cognitive",
-        "description": "Interactive cognitive ability test with dynamic problem-solving scenarios"
-    },
-    {
-        "name": "SHL Mechanical Comprehension Test",
-        "url": "https://www.shl.com/solutions/products/mechanical-comprehension/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "20 minutes",
-        "test_type": "Technical",
-        "description": "Evaluates understanding of mechanical principles and concepts"
-    },
-    {
-        "name": "SHL Situational Judgment Test",
-        "url": "https://www.shl.com/solutions/products/situational-judgment/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "25 minutes",
-        "test_type": "Behavioral",
-        "description": "Assesses decision-making and problem-solving in workplace scenarios"
-    },
-    {
-        "name": "SHL Talent Assessment",
-        "url": "https://www.shl.com/solutions/products/talent-assessment/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "35 minutes",
-        "test_type": "Personality",
-        "description": "Comprehensive personality and behavioral assessment for talent development"
-    },
-    {
-        "name": "SHL Numerical Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/numerical-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "18 minutes",
-        "test_type": "Cognitive",
-        "description": "Measures ability to interpret and analyze numerical data"
-    },
-    {
-        "name": "SHL Verbal Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/verbal-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "19 minutes",
-        "test_type": "Cognitive",
-        "description": "Evaluates ability to understand and analyze written information"
-    },
-    {
-        "name": "SHL Abstract Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/abstract-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "20 minutes",
-        "test_type": "Cognitive",
-        "description": "Measures ability to identify patterns and solve abstract problems"
-    },
-    {
-        "name": "SHL Inductive Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/inductive-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "25 minutes",
-        "test_type": "Cognitive",
-        "description": "Evaluates ability to identify patterns and draw logical conclusions"
-    },
-    {
-        "name": "SHL Deductive Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/deductive-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "20 minutes",
-        "test_type": "Cognitive",
-        "description": "Measures ability to apply logical rules to reach conclusions"
-    },
-    {
-        "name": "SHL Spatial Reasoning Test",
-        "url": "https://www.shl.com/solutions/products/spatial-reasoning/",
-        "remote_testing": True,
-        "adaptive_irt": True,
-        "duration": "25 minutes",
-        "test_type": "Cognitive",
-        "description": "Evaluates ability to visualize and manipulate 2D and 3D objects"
-    },
-    {
-        "name": "SHL Error Checking Test",
-        "url": "https://www.shl.com/solutions/products/error-checking/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "15 minutes",
-        "test_type": "Cognitive",
-        "description": "Measures attention to detail and accuracy in identifying errors"
-    },
-    {
-        "name": "Account Manager Solution",
-        "url": "https://www.shl.com/solutions/products/account-manager/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Cognitive, Personality, Ability, Behavioral",
-        "description": "Comprehensive assessment for account management roles"
-    },
-    {
-        "name": "Administrative Professional - Short Form",
-        "url": "https://www.shl.com/solutions/products/administrative-professional/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Ability, Knowledge, Personality",
-        "description": "Assessment for administrative professional roles"
-    },
-    {
-        "name": "Agency Manager Solution",
-        "url": "https://www.shl.com/solutions/products/agency-manager/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Comprehensive assessment for agency management positions"
-    },
-    {
-        "name": "Apprentice + 8.0 Job Focused Assessment",
-        "url": "https://www.shl.com/solutions/products/apprentice-plus/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "40 minutes",
-        "test_type": "Behavioral, Personality",
-        "description": "Assessment focused on apprentice roles"
-    },
-    {
-        "name": "Bank Administrative Assistant - Short Form",
-        "url": "https://www.shl.com/solutions/products/bank-admin-assistant/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "50 minutes",
-        "test_type": "Ability, Behavioral, Knowledge, Personality",
-        "description": "Specialized assessment for bank administrative roles"
-    },
-    {
-        "name": "Bank Collections Agent - Short Form",
-        "url": "https://www.shl.com/solutions/products/bank-collections/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Ability, Behavioral, Personality",
-        "description": "Assessment for bank collections positions"
-    },
-    {
-        "name": "Bank Operations Supervisor - Short Form",
-        "url": "https://www.shl.com/solutions/products/bank-operations/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Assessment for bank operations supervision roles"
-    },
-    {
-        "name": "Bilingual Spanish Reservation Agent Solution",
-        "url": "https://www.shl.com/solutions/products/bilingual-reservation/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "50 minutes",
-        "test_type": "Behavioral, Personality, Situational Judgment, Ability",
-        "description": "Bilingual assessment for reservation agent positions"
-    },
-    {
-        "name": "Bookkeeping, Accounting, Auditing Clerk Short Form",
-        "url": "https://www.shl.com/solutions/products/bookkeeping-clerk/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Personality, Situational Judgment, Knowledge, Behavioral, Ability",
-        "description": "Comprehensive assessment for accounting roles"
-    },
-    {
-        "name": "Branch Manager - Short Form",
-        "url": "https://www.shl.com/solutions/products/branch-manager/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Personality",
-        "description": "Assessment for branch management positions"
-    },
-    {
-        "name": "Cashier Solution",
-        "url": "https://www.shl.com/solutions/products/cashier/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "40 minutes",
-        "test_type": "Behavioral, Ability, Personality",
-        "description": "Assessment for cashier positions"
-    },
-    {
-        "name": "Global Skills Development Report",
-        "url": "https://www.shl.com/solutions/products/global-skills/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "75 minutes",
-        "test_type": "Ability, Emotional Intelligence, Behavioral, Cognitive, Developmental, Personality",
-        "description": "Comprehensive development assessment for global skills"
-    },
-    {
-        "name": ".NET Framework 4.5",
-        "url": "https://www.shl.com/solutions/products/dotnet-framework/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET Framework 4.5"
-    },
-    {
-        "name": ".NET MVC",
-        "url": "https://www.shl.com/solutions/products/dotnet-mvc/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET MVC"
-    },
-    {
-        "name": ".NET MVVM",
-        "url": "https://www.shl.com/solutions/products/dotnet-mvvm/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET MVVM"
-    },
-    {
-        "name": ".NET WCF",
-        "url": "https://www.shl.com/solutions/products/dotnet-wcf/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET WCF"
-    },
-    {
-        "name": ".NET WPF",
-        "url": "https://www.shl.com/solutions/products/dotnet-wpf/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET WPF"
-    },
-    {
-        "name": ".NET XAML",
-        "url": "https://www.shl.com/solutions/products/dotnet-xaml/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for .NET XAML"
-    },
-    {
-        "name": "Accounts Payable",
-        "url": "https://www.shl.com/solutions/products/accounts-payable/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for accounts payable"
-    },
-    {
-        "name": "Accounts Payable Simulation",
-        "url": "https://www.shl.com/solutions/products/accounts-payable-simulation/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Situational Judgment",
-        "description": "Simulation assessment for accounts payable scenarios"
-    },
-    {
-        "name": "Accounts Receivable",
-        "url": "https://www.shl.com/solutions/products/accounts-receivable/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for accounts receivable"
-    },
-    {
-        "name": "Accounts Receivable Simulation",
-        "url": "https://www.shl.com/solutions/products/accounts-receivable-simulation/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Situational Judgment",
-        "description": "Simulation assessment for accounts receivable scenarios"
-    },
-    {
-        "name": "ADO.NET",
-        "url": "https://www.shl.com/solutions/products/ado-net/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for ADO.NET"
-    },
-    {
-        "name": "Industrial - Semi-skilled 7.1 (Americas)",
-        "url": "https://www.shl.com/solutions/products/industrial-semi-skilled-americas/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Behavioral",
-        "description": "Assessment for semi-skilled industrial roles in the Americas region"
-    },
-    {
-        "name": "Industrial - Semi-skilled 7.1 (International)",
-        "url": "https://www.shl.com/solutions/products/industrial-semi-skilled-international/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Behavioral",
-        "description": "Assessment for semi-skilled industrial roles in international markets"
-    },
-    {
-        "name": "Industrial Professional and Skilled 7.1 (Americas)",
-        "url": "https://www.shl.com/solutions/products/industrial-professional-americas/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral",
-        "description": "Comprehensive assessment for professional and skilled industrial roles in the Americas"
-    },
-    {
-        "name": "Industrial Professional and Skilled 7.1 Solution",
-        "url": "https://www.shl.com/solutions/products/industrial-professional-solution/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral",
-        "description": "Complete solution for assessing professional and skilled industrial roles"
-    },
-    {
-        "name": "Installation and Repair Technician Solution",
-        "url": "https://www.shl.com/solutions/products/installation-repair-technician/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Comprehensive assessment for installation and repair technician roles"
-    },
-    {
-        "name": "Insurance Account Manager Solution",
-        "url": "https://www.shl.com/solutions/products/insurance-account-manager/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Complete assessment solution for insurance account management roles"
-    },
-    {
-        "name": "Insurance Administrative Assistant Solution",
-        "url": "https://www.shl.com/solutions/products/insurance-admin-assistant/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Comprehensive assessment for insurance administrative assistant roles"
-    },
-    {
-        "name": "Insurance Agent Solution",
-        "url": "https://www.shl.com/solutions/products/insurance-agent/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "50 minutes",
-        "test_type": "Ability, Behavioral, Personality",
-        "description": "Complete assessment solution for insurance agent roles"
-    },
-    {
-        "name": "Insurance Director Solution",
-        "url": "https://www.shl.com/solutions/products/insurance-director/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral, Personality",
-        "description": "Comprehensive assessment for insurance director roles"
-    },
-    {
-        "name": "Insurance Sales Manager Solution",
-        "url": "https://www.shl.com/solutions/products/insurance-sales-manager/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral, Personality, Situational Judgment",
-        "description": "Complete assessment solution for insurance sales management roles"
-    },
-    {
-        "name": "Manager - Short Form",
-        "url": "https://www.shl.com/solutions/products/manager-short-form/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "55 minutes",
-        "test_type": "Ability, Behavioral, Knowledge, Personality, Situational Judgment",
-        "description": "Comprehensive assessment for management roles"
-    },
-    {
-        "name": "Manager + 7.0 Solution",
-        "url": "https://www.shl.com/solutions/products/manager-plus/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "60 minutes",
-        "test_type": "Ability, Behavioral, Cognitive",
-        "description": "Advanced assessment solution for management roles"
-    },
-    {
-        "name": "COBOL Programming",
-        "url": "https://www.shl.com/solutions/products/cobol-programming/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for COBOL programming skills"
-    },
-    {
-        "name": "Computer Science",
-        "url": "https://www.shl.com/solutions/products/computer-science/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for computer science knowledge"
-    },
-    {
-        "name": "Contact Center Call Simulation",
-        "url": "https://www.shl.com/solutions/products/contact-center-simulation/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Situational Judgment",
-        "description": "Simulation-based assessment for contact center roles"
-    },
-    {
-        "name": "Conversational Multichat Simulation",
-        "url": "https://www.shl.com/solutions/products/conversational-multichat/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Situational Judgment",
-        "description": "Simulation assessment for handling multiple chat conversations"
-    },
-    {
-        "name": "Core Java (Advanced Level)",
-        "url": "https://www.shl.com/solutions/products/core-java-advanced/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Advanced level technical assessment for Java programming"
-    },
-    {
-        "name": "Core Java (Entry Level)",
-        "url": "https://www.shl.com/solutions/products/core-java-entry/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Entry level technical assessment for Java programming"
-    },
-    {
-        "name": "Count Out The Money",
-        "url": "https://www.shl.com/solutions/products/count-out-money/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge, Situational Judgment",
-        "description": "Assessment for cash handling and money counting skills"
-    },
-    {
-        "name": "CSS3",
-        "url": "https://www.shl.com/solutions/products/css3/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for CSS3 skills"
-    },
-    {
-        "name": "Culinary Skills",
-        "url": "https://www.shl.com/solutions/products/culinary-skills/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Assessment for culinary skills and knowledge"
-    },
-    {
-        "name": "Customer Service Phone Simulation",
-        "url": "https://www.shl.com/solutions/products/customer-service-phone-simulation/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Behavioral, Situational Judgment",
-        "description": "Simulation-based assessment for phone customer service roles"
-    },
-    {
-        "name": "Customer Service Phone Solution",
-        "url": "https://www.shl.com/solutions/products/customer-service-phone/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "50 minutes",
-        "test_type": "Behavioral, Personality, Situational Judgment",
-        "description": "Complete assessment solution for phone customer service roles"
+# Assessment catalog: a JSONL file (or SQLite database), reloadable without a restart
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(APP_DIR, "data", "assessments.jsonl"))
+
+# Normalized assessment embeddings are kept in an on-disk store so only entries
+# whose text changed since the last run are encoded. The matrix is memory-mapped.
+# Quantized backends produce slightly different vectors, so they get their own store.
+embedding_store = EmbeddingStore(
+    EMBEDDING_CACHE_DIR,
+    ENCODER_MODEL if ENCODER_BACKEND == "torch" else f"{ENCODER_MODEL}@{ENCODER_BACKEND}"
+)
+
+# Vector index over the catalog: "bruteforce" (exact), "quantized" (int8/float16 scan with
+# full-precision rescoring), "ivf" (pure NumPy) or "hnsw" (needs hnswlib).
+# Approximate indexes are saved next to the embedding store and reused while the catalog is unchanged.
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "bruteforce")
+VECTOR_INDEX_PARAMS = {
+    "quantized": {
+        "precision": os.getenv("QUANTIZED_PRECISION", "int8"),
+        "rescore": int(os.getenv("QUANTIZED_RESCORE", "4"))
     },
-    {
-        "name": "Cyber Risk",
-        "url": "https://www.shl.com/solutions/products/cyber-risk/",
-        "remote_testing": True,
-        "adaptive_irt": False,
-        "duration": "45 minutes",
-        "test_type": "Knowledge",
-        "description": "Technical assessment for cyber risk knowledge and skills"
+    "ivf": {"n_lists": env_int("IVF_N_LISTS"), "n_probe": env_int("IVF_N_PROBE") or 8},
+    "hnsw": {
+        "m": env_int("HNSW_M") or 16,
+        "ef_construction": env_int("HNSW_EF_CONSTRUCTION") or 200,
+        "ef_search": env_int("HNSW_EF_SEARCH") or 64
     }
-]
+}
+
+# Multi-vector catalog (FIELD_EMBEDDINGS=true): name, description and test_type are also
+# embedded on their own, next to the combined text, into an (assessments x fields x dim)
+# array. Ranking then uses a weighted sum of per-field cosine similarities, with
+# FIELD_WEIGHTS or the request's own field_weights. Text-only weights (the default) rank
+# exactly as before, through the vector index; any other weights scan the catalog exactly,
+# against the fields folded into one matrix per weight vector (FIELD_WEIGHTS_CACHE of them
+# are kept, the FIELD_WEIGHTS one built at catalog load).
+FIELD_EMBEDDINGS = os.getenv("FIELD_EMBEDDINGS", "false").lower() in ("1", "true", "yes")
+DEFAULT_FIELD_WEIGHTS = weight_vector(parse_field_weights(os.getenv("FIELD_WEIGHTS", "text=1")))
+if not FIELD_EMBEDDINGS and not is_text_only(DEFAULT_FIELD_WEIGHTS):
+    raise ValueError("FIELD_WEIGHTS other than text=1 needs FIELD_EMBEDDINGS=true")
+FIELD_WEIGHTS_CACHE = int(os.getenv("FIELD_WEIGHTS_CACHE", "8"))
+# Per-field rows are kept in their own store so they never displace the combined-text rows
+field_embedding_store = EmbeddingStore(EMBEDDING_CACHE_DIR, f"{embedding_store.model_name}+fields")
 
-# Create embeddings for assessments once at startup
-# Use numpy arrays directly for better memory efficiency
-assessment_texts = [f"{a['name']} {a['description']} {a['test_type']}" for a in ASSESSMENTS]
-assessment_embeddings = np.asarray(encoder.encode(assessment_texts, convert_to_numpy=True), dtype=np.float32)
+def build_vector_index(embeddings: np.ndarray, fingerprint: str):
+    # The fingerprint covers the catalog texts only; the encoder model and backend
+    # (embedding_store.model_name) are part of the name and checked on load as well
+    source = embedding_store.model_name
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", source)
+    try:
+        return load_or_build_index(
+            VECTOR_INDEX,
+            embeddings,
+            os.path.join(EMBEDDING_CACHE_DIR, f"index-{VECTOR_INDEX}-{slug}-{fingerprint}"),
+            source,
+            **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX, {})
+        )
+    except ImportError as e:
+        print(f"Vector index {VECTOR_INDEX!r} unavailable ({e}); falling back to brute force")
+        return load_or_build_index("bruteforce", embeddings)
+
+class CatalogState:
+    # Everything derived from one catalog version. Requests read `catalog_state`
+    # once and use that snapshot throughout; a reload swaps the whole object.
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        self.catalog = load_catalog(path)
+        self.texts = self.catalog.embedding_texts()
+        self.embeddings = embedding_store.load(
+            self.texts,
+            lambda texts: encoder.encode(texts, convert_to_numpy=True)
+        )
+        self.encoded = embedding_store.last_encoded
+        self.index = build_vector_index(self.embeddings, embedding_store.fingerprint)
+        # (assessments x EMBEDDED_FIELDS x dim), or None without FIELD_EMBEDDINGS
+        self.field_embeddings = self._field_embeddings() if FIELD_EMBEDDINGS else None
+        self.lexical = BM25Index(self.texts)
+        # Response models are built once per catalog version instead of per request,
+        # and so is their JSON, which response bodies splice in as is. Keyed by id(): the
+        # list keeps every entry alive, so a matching id can only be that very object
+        self.assessments = [Assessment(**self.catalog.row(i)) for i in range(self.catalog.size)]
+        self.fragments = {id(assessment): dumps(assessment.model_dump()) for assessment in self.assessments}
+    
+    def _field_embeddings(self) -> FieldEmbeddings:
+        # Field values repeat (test types especially), so each distinct one is encoded once
+        texts = field_texts(self.catalog)
+        distinct = list(dict.fromkeys(texts))
+        embeddings = field_embedding_store.load(
+            distinct,
+            lambda texts: encoder.encode(texts, convert_to_numpy=True)
+        )
+        position = {text: i for i, text in enumerate(distinct)}
+        fields = FieldEmbeddings(
+            stack_fields(self.embeddings, embeddings[[position[text] for text in texts]]), FIELD_WEIGHTS_CACHE
+        )
+        if not is_text_only(DEFAULT_FIELD_WEIGHTS):
+            fields.folded(DEFAULT_FIELD_WEIGHTS)
+        return fields
+    
+    @property
+    def version(self) -> str:
+        return self.catalog.version
+    
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "assessments": self.catalog.size,
+            "encoded_on_load": self.encoded,
+            "vector_index": self.index.kind,
+            "field_embeddings": self.field_embeddings.stats() if self.field_embeddings is not None else None,
+            "lexical_terms": len(self.lexical.vocabulary)
+        }
 
-# Normalize embeddings once to avoid repeated normalization
-assessment_embeddings_normalized = assessment_embeddings / np.linalg.norm(assessment_embeddings, axis=1, keepdims=True)
+# Set by warm_up(); None until the service is ready
+catalog_state: Optional[CatalogState] = None
+catalog_reload_lock = threading.Lock()
 
 class RecommendationResponse(BaseModel):
     recommendations: List[Assessment]
     explanation: str
+    # Set when the explanation is generated in the background (explain="deferred")
+    explanation_id: Optional[str] = None
 
-def get_recommendations(query: str, max_results: int = 10) -> RecommendationResponse:
-    # Generate query embedding efficiently
-    query_embedding = np.asarray(encoder.encode([query], convert_to_numpy=True), dtype=np.float32)
-    query_embedding_normalized = query_embedding / np.linalg.norm(query_embedding)
-    
-    # Calculate cosine similarities using optimized dot product
-    similarities = np.dot(query_embedding_normalized, assessment_embeddings_normalized.T)[0]
-    
-    # Get top indices efficiently using partition
-    top_k = min(max_results, len(ASSESSMENTS))
-    top_indices = np.argpartition(-similarities, top_k)[:top_k]
-    top_indices = top_indices[np.argsort(-similarities[top_indices])]
-    
-    # Get recommendations above threshold
-    recommendations = [
-        Assessment(**ASSESSMENTS[i]) 
-        for i in top_indices 
-        if similarities[i] > 0.3
+def response_json(
+    response: RecommendationResponse,
+    index: Optional[int] = None,
+    state: Optional[CatalogState] = None
+) -> bytes:
+    # Assessments of an older catalog version (in a cached response) or decoded from the
+    # shared cache tier have no fragment in `state` and are encoded here
+    state = state or catalog_state
+    fragments = state.fragments if state is not None else {}
+    encoded = [
+        fragments.get(id(assessment)) or dumps(assessment.model_dump())
+        for assessment in response.recommendations
     ]
+    extra = {"index": index} if index is not None else None
+    return recommendation_json(encoded, response.explanation, response.explanation_id, extra)
+
+def json_response(response: RecommendationResponse) -> Response:
+    # Returning a Response skips FastAPI's response_model validation and encoding; the
+    # response_model on the route still documents the body
+    return Response(content=response_json(response), media_type="application/json")
+
+class AssessmentFilters(BaseModel):
+    # Structured constraints applied before similarity scoring
+    test_types: Optional[List[str]] = None
+    min_duration: Optional[int] = Field(None, ge=0)
+    max_duration: Optional[int] = Field(None, ge=0)
+    adaptive: Optional[bool] = None
+    remote: Optional[bool] = None
     
-    # Generate explanation using Gemini
-    if recommendations:
-        prompt = f"""Given the query: "{query}"
+    def cache_key(self) -> str:
+        values = self.model_dump()
+        if values["test_types"]:
+            values["test_types"] = sorted(t.strip().lower() for t in values["test_types"])
+        return json.dumps(values, sort_keys=True, separators=(",", ":"))
+
+NO_FILTERS = AssessmentFilters()
+
+# inline: wait for Gemini; deferred: return results now, fetch explanation later; none: skip it
+ExplainMode = Literal["inline", "deferred", "none"]
+
+def ranking_weights(field_weights: Optional[Dict[str, float]] = None) -> Optional[np.ndarray]:
+    # Normalized field weights for a request (FIELD_WEIGHTS unless it brings its own);
+    # None when they reduce to the combined text. Raises ValueError for invalid weights
+    weights = DEFAULT_FIELD_WEIGHTS if field_weights is None else weight_vector(field_weights)
+    if is_text_only(weights):
+        return None
+    if not FIELD_EMBEDDINGS:
+        raise ValueError("Per-field weights need FIELD_EMBEDDINGS=true")
+    return weights
+
+def encode_queries(queries: List[str]) -> np.ndarray:
+    # Encode and L2-normalize a batch of queries
+    query_embeddings = np.asarray(encoder.encode(queries, convert_to_numpy=True), dtype=np.float32)
+    return query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+
+# Minimum cosine similarity for an assessment to be recommended
+SIMILARITY_THRESHOLD = 0.3
+
+# Hybrid retrieval: BM25 over name/description/test_type is fused with the cosine ranking
+# by reciprocal rank fusion, so exact names ("COBOL", ".NET WPF") are neither outranked by
+# generic matches nor dropped by SIMILARITY_THRESHOLD. "off" ranks by cosine only.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "rrf")
+if HYBRID_RETRIEVAL not in ("rrf", "off"):
+    raise ValueError("HYBRID_RETRIEVAL must be 'rrf' or 'off'")
+RRF_K = float(os.getenv("RRF_K", "60"))
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+# A lexical match is relevant regardless of its cosine score when it scores at
+# least this fraction of the query's best BM25 score
+HYBRID_LEXICAL_MIN_RATIO = float(os.getenv("HYBRID_LEXICAL_MIN_RATIO", "0.5"))
+
+def candidate_count(max_results: int, texts: Optional[List[str]]) -> int:
+    if texts is None or HYBRID_RETRIEVAL == "off":
+        return max_results
+    return max(max_results, HYBRID_CANDIDATES)
+
+def select_rows(
+    state: CatalogState,
+    similarities: np.ndarray,
+    rows: Optional[np.ndarray],
+    max_results: int,
+    texts: Optional[List[str]] = None
+) -> List[np.ndarray]:
+    # Exact top-k over a dense (queries x rows) similarity matrix; `rows` maps columns back to catalog rows
+    top_positions = top_k_rows(similarities, candidate_count(max_results, texts))
+    top_scores = np.take_along_axis(similarities, top_positions, axis=1)
+    top_indices = top_positions if rows is None else rows[top_positions]
+    return finish_ranking(state, top_scores, top_indices, rows, max_results, texts)
+
+def finish_ranking(
+    state: CatalogState,
+    top_scores: np.ndarray,
+    top_indices: np.ndarray,
+    rows: Optional[np.ndarray],
+    max_results: int,
+    texts: Optional[List[str]]
+) -> List[np.ndarray]:
+    # `texts` (one per query) enables hybrid fusion; without them results are ranked by cosine only
+    if texts is None or HYBRID_RETRIEVAL == "off":
+        return above_threshold(top_indices, top_scores)
+    return fuse_rankings(state, top_scores, top_indices, state.lexical.score_batch(texts, rows), rows, max_results)
+
+def fuse_rankings(
+    state: CatalogState,
+    dense_scores: np.ndarray,
+    dense_ids: np.ndarray,
+    lexical_scores: np.ndarray,
+    rows: Optional[np.ndarray],
+    max_results: int
+) -> List[np.ndarray]:
+    top_scores, top_indices = reciprocal_rank_fusion(
+        dense_scores, dense_ids, lexical_scores, rows, state.catalog.size, max_results,
+        similarity_threshold=SIMILARITY_THRESHOLD,
+        rrf_k=RRF_K,
+        lexical_candidates=HYBRID_CANDIDATES,
+        lexical_min_ratio=HYBRID_LEXICAL_MIN_RATIO
+    )
+    return [row_indices[row_scores > -np.inf] for row_indices, row_scores in zip(top_indices, top_scores)]
+
+def above_threshold(top_indices: np.ndarray, top_scores: np.ndarray) -> List[np.ndarray]:
+    # Get recommendations above threshold
+    return [row_indices[row_scores > SIMILARITY_THRESHOLD] for row_indices, row_scores in zip(top_indices, top_scores)]
+
+def to_assessments(state: CatalogState, ranked_rows: List[np.ndarray]) -> List[List[Assessment]]:
+    return [[state.assessments[i] for i in rows] for rows in ranked_rows]
+
+def catalog_similarities(
+    state: CatalogState,
+    query_embeddings_normalized: np.ndarray,
+    rows: Optional[np.ndarray],
+    weights: Optional[np.ndarray]
+) -> np.ndarray:
+    # Exact (queries x rows) cosine scores, weighted over fields when `weights` is given
+    if weights is None:
+        catalog_embeddings = state.embeddings if rows is None else state.embeddings[rows]
+        return np.dot(query_embeddings_normalized, catalog_embeddings.T)
+    return state.field_embeddings.similarities(query_embeddings_normalized, weights, rows)
+
+def rank_rows_batch(
+    state: CatalogState,
+    query_embeddings_normalized: np.ndarray,
+    max_results: int,
+    filters: AssessmentFilters = NO_FILTERS,
+    texts: Optional[List[str]] = None,
+    weights: Optional[np.ndarray] = None
+) -> List[np.ndarray]:
+    # Ranked catalog rows per query; to_assessments() turns them into response models.
+    # `weights` (see ranking_weights) switches to per-field scoring
+    rows = state.catalog.attributes.select(**filters.model_dump())
+    if rows is None and weights is None:
+        # Cosine similarity search for every query at once (exact or approximate, see VECTOR_INDEX)
+        with stage("similarity"):
+            top_scores, top_indices = state.index.search(query_embeddings_normalized, candidate_count(max_results, texts))
+        with stage("top_k"):
+            return finish_ranking(state, top_scores, top_indices, rows, max_results, texts)
+    if rows is not None and len(rows) == 0:
+        return [rows for _ in range(len(query_embeddings_normalized))]
+    # Only score the rows that qualify, so filtering never eats into the top-k
+    with stage("similarity"):
+        similarities = catalog_similarities(state, query_embeddings_normalized, rows, weights)
+    with stage("top_k"):
+        return select_rows(state, similarities, rows, max_results, texts)
+
+# Long texts are split into overlapping word windows (the encoder truncates at
+# 256 word pieces), every window is scored, and scores are pooled per text
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", "128"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "32"))
+CHUNK_MAX_WINDOWS = int(os.getenv("CHUNK_MAX_WINDOWS", "64"))
+CHUNK_POOLING = os.getenv("CHUNK_POOLING", "max")
+if CHUNK_POOLING not in POOLING_MODES:
+    raise ValueError(f"CHUNK_POOLING must be one of {POOLING_MODES}")
+
+def split_texts(texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    return split_documents(texts, CHUNK_WORDS, CHUNK_OVERLAP_WORDS, CHUNK_MAX_WINDOWS)
+
+def rank_window_rows(
+    state: CatalogState,
+    window_embeddings_normalized: np.ndarray,
+    offsets: np.ndarray,
+    max_results: int,
+    filters: AssessmentFilters = NO_FILTERS,
+    texts: Optional[List[str]] = None,
+    weights: Optional[np.ndarray] = None
+) -> List[np.ndarray]:
+    # `offsets` gives each text's first row in `window_embeddings_normalized`;
+    # `texts` are the original texts, for hybrid lexical scoring
+    if len(offsets) == len(window_embeddings_normalized):
+        # One window per text: plain retrieval through the vector index
+        return rank_rows_batch(state, window_embeddings_normalized, max_results, filters, texts, weights)
+    rows = state.catalog.attributes.select(**filters.model_dump())
+    if rows is not None and len(rows) == 0:
+        return [rows for _ in range(len(offsets))]
+    # One (windows x catalog) matrix multiply, then a single pooled reduction per text
+    with stage("similarity"):
+        similarities = pool_scores(
+            catalog_similarities(state, window_embeddings_normalized, rows, weights), offsets, CHUNK_POOLING
+        )
+    with stage("top_k"):
+        return select_rows(state, similarities, rows, max_results, texts)
+
+# Optional second stage: the first stage returns RERANK_CANDIDATES rows, which are
+# re-scored and cut to max_results. "features" is a linear model over cosine, BM25,
+# first-stage rank, test type and duration fit (weights from RERANKER_WEIGHTS, see
+# benchmarks/train_reranker.py); "cross-encoder" scores every (query, assessment) pair.
+# Under load (RERANK_MAX_IN_FLIGHT, RERANK_BUDGET_MS) the first-stage order is served.
+RERANKER = os.getenv("RERANKER", "off")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+# Set by warm_up(); the cross-encoder is a second model load
+reranker = None
+rerank_budget = RerankBudget(
+    budget_ms=float(os.getenv("RERANK_BUDGET_MS", "50")),
+    max_in_flight=int(os.getenv("RERANK_MAX_IN_FLIGHT", "4"))
+)
+
+def first_stage_depth(max_results: int) -> int:
+    return max(max_results, RERANK_CANDIDATES) if reranker is not None else max_results
+
+def build_explanation_prompt(query: str, recommendations: List[Assessment]) -> str:
+    return f"""Given the query: "{query}"
         I recommended these assessments: {[rec.name for rec in recommendations]}
         Please provide a brief explanation (2-3 sentences) of why these assessments are relevant."""
-        
+
+NO_RESULTS_EXPLANATION = "No relevant assessments found matching your criteria."
+
+def template_explanation(recommendations: List[Assessment]) -> str:
+    # Local fallback when Gemini is unavailable, built from catalog fields only
+    top = recommendations[:3]
+    names = [rec.name for rec in top]
+    listed = names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+    test_types = sorted({t for rec in top for t in split_test_types(rec.test_type)})
+    durations = [m for m in (parse_duration_minutes(rec.duration) for rec in top) if m >= 0]
+    explanation = f"The closest matches to your request in the SHL catalog are {listed}."
+    if test_types:
+        explanation += f" Together they cover {', '.join(test_types)}."
+    if durations:
+        low, high = min(durations), max(durations)
+        explanation += f" Each takes {low} minutes." if low == high else f" Each takes between {low} and {high} minutes."
+    return explanation
+
+# Synchronous callers share one long-lived event loop on a daemon thread. A fresh loop
+# per call would give the LLM client a new concurrency semaphore every time, and would
+# not work inside a running loop (notebooks, async callers) anyway.
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+def sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="sync-call", daemon=True).start()
+        return _sync_loop
+
+def run_coroutine_sync(coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, sync_loop()).result()
+
+def get_recommendations(
+    query: str,
+    max_results: int = 10,
+    filters: AssessmentFilters = NO_FILTERS,
+    field_weights: Optional[Dict[str, float]] = None
+) -> RecommendationResponse:
+    # Synchronous pipeline, kept for scripts and offline jobs
+    state = catalog_state
+    weights = ranking_weights(field_weights)
+    windows, offsets = split_texts([query])
+    with stage("encode"):
+        window_embeddings_normalized = encode_queries(windows)
+    ranked_rows = rank_window_rows(
+        state, window_embeddings_normalized, offsets, first_stage_depth(max_results), filters, [query], weights
+    )
+    if reranker is not None:
+        with stage("rerank"):
+            ranked_rows = reranker.rerank(
+                state, [query], window_embeddings_normalized, offsets, ranked_rows, max_results, weights
+            )
+    recommendations = to_assessments(state, ranked_rows)[0]
+    
+    # Generate explanation using Gemini, through the same resilient client as the API
+    explanation, _ = run_coroutine_sync(generate_explanation_async(query, recommendations))
+    
+    return RecommendationResponse(recommendations=recommendations, explanation=explanation)
+
+# Bounded pool for CPU-bound encoding so the event loop stays responsive
+ENCODER_WORKERS = int(os.getenv("ENCODER_WORKERS", "2"))
+encoder_executor = ThreadPoolExecutor(max_workers=ENCODER_WORKERS, thread_name_prefix="encoder")
+
+# Every Gemini call goes through llm_client: at most GEMINI_MAX_CONCURRENCY in flight,
+# GEMINI_TIMEOUT seconds in total (queueing, attempts and backoff), retries with jittered
+# backoff, and a circuit breaker that skips Gemini entirely while it keeps failing.
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "10"))
+llm_client = LLMClient(
+    gemini_model,
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+    timeout=GEMINI_TIMEOUT,
+    attempt_timeout=float(os.getenv("GEMINI_ATTEMPT_TIMEOUT", "5")),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+    )
+)
+
+# Coalesce concurrent single-query encodes into one forward pass
+query_batcher = EmbeddingBatcher(
+    encode_queries,
+    encoder_executor,
+    max_batch_size=int(os.getenv("EMBED_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+)
+
+async def encode_queries_async(queries: List[str]) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(encoder_executor, encode_queries, queries)
+
+async def rerank_rows(
+    state: CatalogState,
+    texts: List[str],
+    window_embeddings_normalized: np.ndarray,
+    offsets: np.ndarray,
+    candidates: List[np.ndarray],
+    max_results: int,
+    weights: Optional[np.ndarray] = None
+) -> Tuple[List[np.ndarray], bool]:
+    # Second stage over first_stage_depth() candidates, scored with the field `weights` the
+    # first stage used. Returns the ranked rows and whether they are final: False when
+    # re-ranking was skipped or timed out and the first-stage order was served, so callers
+    # do not cache it
+    if reranker is None:
+        return candidates, True
+    first_stage = [rows[:max_results] for rows in candidates]
+    if not rerank_budget.admit():
+        return first_stage, False
+    started = time.perf_counter()
+    timed_out = False
+    try:
+        with stage("rerank"):
+            if not reranker.blocking:
+                return reranker.rerank(
+                    state, texts, window_embeddings_normalized, offsets, candidates, max_results, weights
+                ), True
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(
+                loop.run_in_executor(
+                    encoder_executor, reranker.rerank,
+                    state, texts, window_embeddings_normalized, offsets, candidates, max_results, weights
+                ),
+                timeout=rerank_budget.budget
+            ), True
+    except asyncio.TimeoutError:
+        timed_out = True
+        return first_stage, False
+    finally:
+        rerank_budget.release(time.perf_counter() - started, timed_out)
+
+def precomputed_explanation(query: str, recommendations: List[Assessment]) -> Optional[str]:
+    # Logs the set for precompute_explanations.py, then answers from the explanation store.
+    # Only queries whose embedding is in the local cache are looked up (short ones, which
+    # embed_query has just encoded); long job descriptions rarely repeat anyway
+    if request_log is not None:
+        request_log.record(query, [assessment.name for assessment in recommendations])
+    if explanation_store is None:
+        return None
+    query_embedding_normalized = embedding_cache.get_local(normalize_query(query))
+    if query_embedding_normalized is None:
+        return None
+    return explanation_store.lookup(
+        [assessment.model_dump() for assessment in recommendations], query_embedding_normalized
+    )
+
+async def generate_explanation_async(
+    query: str,
+    recommendations: List[Assessment],
+    timeout: Optional[float] = None
+) -> Tuple[str, bool]:
+    # Returns the explanation and whether it is worth caching. `timeout` caps the LLM call
+    # below GEMINI_TIMEOUT (see explanation_budget); at 0 the template answers right away
+    if not recommendations:
+        return NO_RESULTS_EXPLANATION, True
+    precomputed = precomputed_explanation(query, recommendations)
+    if precomputed is not None:
+        return precomputed, True
+    if timeout is not None and timeout <= 0:
+        return template_explanation(recommendations), False
+    with stage("llm"):
         try:
-            response = model.generate_content(prompt)
-            explanation = response.text
-        except Exception as e:
-            explanation = f"Unable to generate explanation: {str(e)}"
+            return await llm_client.generate(build_explanation_prompt(query, recommendations), timeout), True
+        except LLMError:
+            # Not cached, so Gemini's explanation replaces it once Gemini recovers
+            return template_explanation(recommendations), False
+
+# Two-level cache: normalized query -> embedding, and (query, max_results) -> response.
+# Responses are namespaced by catalog version so a catalog change invalidates them.
+REDIS_URL = os.getenv("REDIS_URL")
+embedding_cache = TieredCache(
+    "embedding",
+    maxsize=int(os.getenv("QUERY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+    dumps=lambda v: np.asarray(v, dtype=np.float32).tobytes(),
+    loads=lambda b: np.frombuffer(b, dtype=np.float32),
+    redis_url=REDIS_URL,
+    namespace=embedding_store.model_name
+)
+response_cache = TieredCache(
+    "response",
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "600")),
+    dumps=response_json,
+    loads=RecommendationResponse.model_validate_json,
+    redis_url=REDIS_URL,
+    namespace=""
+)
+# Paraphrases ("Java dev", "hiring a Java engineer") miss the exact-text response cache;
+# this one returns the response of a cached query whose embedding has cosine similarity
+# of at least SEMANTIC_CACHE_THRESHOLD. Only queries of up to SEMANTIC_CACHE_MAX_WORDS
+# words take part: long job descriptions that differ in a detail can still embed closely.
+semantic_cache = SemanticCache(
+    maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "1024")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    ttl=response_cache.local.ttl
+)
+SEMANTIC_CACHE_MAX_WORDS = int(os.getenv("SEMANTIC_CACHE_MAX_WORDS", "32"))
+
+# Explanations pre-generated by precompute_explanations.py for frequent (query cluster,
+# recommendation set) pairs, answered before calling Gemini. EXPLANATION_LOG records every
+# set that needed an explanation; it is what the job mines. Both are off when unset.
+EXPLANATION_STORE = os.getenv("EXPLANATION_STORE")
+EXPLANATION_STORE_THRESHOLD = float(os.getenv("EXPLANATION_STORE_THRESHOLD", "0.8"))
+EXPLANATION_LOG = os.getenv("EXPLANATION_LOG")
+explanation_store = ExplanationStore(
+    EXPLANATION_STORE, embedding_store.model_name, threshold=EXPLANATION_STORE_THRESHOLD
+) if EXPLANATION_STORE else None
+request_log = RequestLog(EXPLANATION_LOG) if EXPLANATION_LOG else None
+
+def invalidate_caches() -> None:
+    # Call after the catalog or the embedding matrix changes
+    response_cache.invalidate(namespace=catalog_state.version)
+    semantic_cache.clear()
+
+def reload_catalog(path: Optional[str] = None) -> CatalogState:
+    # Builds the new state off to the side (re-encoding only changed entries),
+    # then swaps it in with a single assignment; in-flight requests keep their snapshot
+    global catalog_state
+    with catalog_reload_lock:
+        new_state = CatalogState(path or (catalog_state.path if catalog_state else CATALOG_PATH))
+        catalog_state = new_state
+        invalidate_caches()
+    return new_state
+
+async def embed_query(query: str) -> np.ndarray:
+    key = normalize_query(query)
+    query_embedding_normalized = embedding_cache.get(key)
+    if query_embedding_normalized is None:
+        with stage("encode"):
+            query_embedding_normalized = await query_batcher.encode(query)
+        embedding_cache.set(key, query_embedding_normalized)
+    return query_embedding_normalized
+
+async def retrieve(
+    query: str,
+    max_results: int,
+    filters: AssessmentFilters = NO_FILTERS,
+    weights: Optional[np.ndarray] = None
+) -> Tuple[List[Assessment], bool]:
+    # Returns the recommendations and whether they are worth caching (see rerank_rows)
+    state = catalog_state
+    windows, offsets = split_texts([query])
+    if len(windows) > 1:
+        # Long job descriptions: all windows go through the encoder as one batch
+        with stage("encode"):
+            window_embeddings_normalized = await encode_queries_async(windows)
     else:
-        explanation = "No relevant assessments found matching your criteria."
+        window_embeddings_normalized = (await embed_query(query)).reshape(1, -1)
+    candidates = rank_window_rows(
+        state, window_embeddings_normalized, offsets, first_stage_depth(max_results), filters, [query], weights
+    )
+    ranked_rows, final = await rerank_rows(
+        state, [query], window_embeddings_normalized, offsets, candidates, max_results, weights
+    )
+    return to_assessments(state, ranked_rows)[0], final
+
+def response_scope(max_results: int, filters: AssessmentFilters, weights: Optional[np.ndarray] = None) -> str:
+    # Responses are only interchangeable for the same result count, filters and field weights
+    scope = f"{max_results}:{filters.cache_key()}"
+    return scope if weights is None else scope + ":" + ",".join(f"{weight:.4g}" for weight in weights)
+
+def semantic_scope(
+    version: str,
+    max_results: int,
+    filters: AssessmentFilters,
+    weights: Optional[np.ndarray] = None
+) -> str:
+    # The semantic cache is cleared on reload; with the catalog version in the scope, an entry
+    # stored by a request racing the reload can never answer a request on the new catalog
+    return f"{version}:{response_scope(max_results, filters, weights)}"
+
+def response_cache_key(
+    query: str,
+    max_results: int,
+    filters: AssessmentFilters,
+    weights: Optional[np.ndarray] = None
+) -> str:
+    return f"{response_scope(max_results, filters, weights)}:{normalize_query(query)}"
+
+ResponseStore = Callable[[RecommendationResponse], None]
+
+def cached_response(
+    query: str,
+    max_results: int,
+    filters: AssessmentFilters,
+    weights: Optional[np.ndarray] = None
+) -> Tuple[Optional[RecommendationResponse], ResponseStore]:
+    # Exact match only, cheap enough to answer before admission. Also returns the
+    # function that caches this query's response
+    cache_key = response_cache_key(query, max_results, filters, weights)
+    version = catalog_state.version
+    scope = semantic_scope(version, max_results, filters, weights)
+    return response_cache.get(cache_key), partial(store_response, version, cache_key, scope, None)
+
+async def paraphrase_response(
+    query: str,
+    max_results: int,
+    filters: AssessmentFilters,
+    weights: Optional[np.ndarray] = None,
+    threshold: Optional[float] = None
+) -> Tuple[Optional[RecommendationResponse], ResponseStore]:
+    # A paraphrase through the semantic cache, once the exact match missed. The returned
+    # function caches this query's response under both its text and its embedding
+    cache_key = response_cache_key(query, max_results, filters, weights)
+    version = catalog_state.version
+    scope = semantic_scope(version, max_results, filters, weights)
+    if semantic_cache.maxsize <= 0 or len(query.split()) > SEMANTIC_CACHE_MAX_WORDS:
+        return None, partial(store_response, version, cache_key, scope, None)
+    # Retrieval needs the embedding anyway; embed_query caches it for retrieve()
+    query_embedding_normalized = await embed_query(query)
+    cached = semantic_cache.get(query_embedding_normalized, scope, threshold)
+    return cached, partial(store_response, version, cache_key, scope, query_embedding_normalized)
+
+def store_response(
+    version: str,
+    cache_key: str,
+    scope: str,
+    query_embedding_normalized: Optional[np.ndarray],
+    response: RecommendationResponse
+) -> None:
+    # `version` is the catalog the request started on. A response finishing after a reload
+    # would land in the new version's namespace and the freshly cleared semantic cache
+    # while naming the old catalog's assessments, so it is dropped instead
+    if catalog_state is None or catalog_state.version != version:
+        return
+    response_cache.set(cache_key, response)
+    if query_embedding_normalized is not None:
+        semantic_cache.set(query_embedding_normalized, scope, response)
+
+# Background explanations for explain="deferred", looked up by explanation_id. The ids
+# handed out and the finished explanations go to the cache tiers (Redis when REDIS_URL is
+# set), so the follow-up call can land on any worker or replica; the worker generating an
+# explanation holds its task in running_explanations until it finishes.
+PENDING_EXPLANATIONS_SIZE = int(os.getenv("PENDING_EXPLANATIONS_SIZE", "4096"))
+PENDING_EXPLANATIONS_TTL = float(os.getenv("PENDING_EXPLANATIONS_TTL", "300"))
+# Seconds between shared-tier lookups while /api/explanation/{id}?wait=true waits on another worker
+EXPLANATION_POLL_INTERVAL = 0.1
+deferred_ids = TieredCache(
+    "explanation_id",
+    maxsize=PENDING_EXPLANATIONS_SIZE,
+    ttl=PENDING_EXPLANATIONS_TTL,
+    dumps=lambda issued: b"1",
+    loads=lambda raw: True,
+    redis_url=REDIS_URL
+)
+deferred_explanations = TieredCache(
+    "explanation",
+    maxsize=PENDING_EXPLANATIONS_SIZE,
+    ttl=PENDING_EXPLANATIONS_TTL,
+    dumps=lambda explanation: explanation.encode("utf-8"),
+    loads=lambda raw: raw.decode("utf-8"),
+    redis_url=REDIS_URL
+)
+# The event loop only keeps weak references to tasks
+running_explanations: Dict[str, asyncio.Task] = {}
+
+async def complete_explanation(
+    explanation_id: str,
+    query: str,
+    recommendations: List[Assessment],
+    store: Optional[ResponseStore]
+) -> str:
+    # store is None when the recommendations themselves must not be cached
+    explanation, cacheable = await generate_explanation_async(query, recommendations)
+    deferred_explanations.set(explanation_id, explanation)
+    if cacheable and store is not None:
+        store(RecommendationResponse(recommendations=recommendations, explanation=explanation))
+    return explanation
+
+def defer_explanation(query: str, recommendations: List[Assessment], store: Optional[ResponseStore]) -> str:
+    explanation_id = uuid.uuid4().hex
+    deferred_ids.set(explanation_id, True)
+    task = asyncio.ensure_future(complete_explanation(explanation_id, query, recommendations, store))
+    running_explanations[explanation_id] = task
+    task.add_done_callback(lambda _: running_explanations.pop(explanation_id, None))
+    return explanation_id
+
+# Admission control for the recommendation endpoints (see AdmissionController): at most
+# ADMISSION_MAX_ACTIVE requests per process run retrieval at once, batch chunks in at most
+# ADMISSION_MAX_BATCH_ACTIVE of those slots (default half). The rest queue, interactive
+# before batch and round-robin across clients, up to ADMISSION_MAX_QUEUE requests and
+# ADMISSION_MAX_QUEUE_PER_CLIENT per client; beyond that callers get 503 (429 for one
+# client's excess) with Retry-After. Exact cache hits are answered without queueing.
+# While ADMISSION_DEGRADE_QUEUE or more requests are queued, requests are served degraded:
+# the template instead of a Gemini explanation, and semantic cache matches from
+# SEMANTIC_CACHE_DEGRADED_THRESHOLD.
+admission = AdmissionController(
+    max_active=int(os.getenv("ADMISSION_MAX_ACTIVE", "8")),
+    max_batch_active=env_int("ADMISSION_MAX_BATCH_ACTIVE"),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+    max_queue_per_client=int(os.getenv("ADMISSION_MAX_QUEUE_PER_CLIENT", "16")),
+    degrade_queue=int(os.getenv("ADMISSION_DEGRADE_QUEUE", "16"))
+)
+SEMANTIC_CACHE_DEGRADED_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_DEGRADED_THRESHOLD", "0.85"))
+# Seconds a caller waits unless it says otherwise with X-Request-Timeout (0: no deadline).
+# Requests still queued at their deadline are dropped (504), and the explanation gets
+# whatever time is left.
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+
+@asynccontextmanager
+async def admitted(caller: Optional[Caller]) -> AsyncIterator[Optional[Ticket]]:
+    # Callers outside the HTTP endpoints (caller None) are not admission-controlled
+    if caller is None:
+        yield None
+        return
+    async with admission.admit(caller) as ticket:
+        yield ticket
+
+def semantic_threshold(ticket: Optional[Ticket]) -> Optional[float]:
+    return SEMANTIC_CACHE_DEGRADED_THRESHOLD if ticket is not None and ticket.degraded else None
+
+def explanation_budget(ticket: Optional[Ticket]) -> Optional[float]:
+    # Seconds the LLM may take for this request: None for the full GEMINI_TIMEOUT,
+    # 0 to skip it (degraded, or the caller's deadline has passed)
+    if ticket is None:
+        return None
+    if ticket.degraded:
+        return 0.0
+    remaining = ticket.caller.remaining()
+    return None if remaining is None else max(0.0, remaining)
+
+async def get_recommendations_async(
+    query: str,
+    max_results: int = 10,
+    explain: ExplainMode = "inline",
+    filters: AssessmentFilters = NO_FILTERS,
+    caller: Optional[Caller] = None,
+    weights: Optional[np.ndarray] = None
+) -> RecommendationResponse:
+    cached, store = cached_response(query, max_results, filters, weights)
+    if cached is not None:
+        return cached
     
-    return RecommendationResponse(recommendations=recommendations, explanation=explanation)
+    async with admitted(caller) as ticket:
+        cached, store = await paraphrase_response(query, max_results, filters, weights, semantic_threshold(ticket))
+        if cached is not None:
+            return cached
+        recommendations, final = await retrieve(query, max_results, filters, weights)
+    
+    # Retrieval latency never waits on the LLM unless the caller asks for it
+    if explain == "none":
+        return RecommendationResponse(recommendations=recommendations, explanation="")
+    if explain == "deferred" and recommendations:
+        return RecommendationResponse(
+            recommendations=recommendations,
+            explanation="",
+            explanation_id=defer_explanation(query, recommendations, store if final else None)
+        )
+    
+    explanation, cacheable = await generate_explanation_async(query, recommendations, explanation_budget(ticket))
+    response = RecommendationResponse(recommendations=recommendations, explanation=explanation)
+    if cacheable and final:
+        store(response)
+    return response
+
+# Admin token for catalog reloads; the endpoint is disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Poll the catalog file every N seconds and reload it on change (0 disables)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+
+async def watch_catalog():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(CATALOG_WATCH_INTERVAL)
+        if catalog_state is None:
+            continue
+        try:
+            changed = os.stat(catalog_state.path).st_mtime_ns != catalog_state.mtime
+        except OSError:
+            continue
+        if changed:
+            try:
+                state = await loop.run_in_executor(None, reload_catalog)
+                print(f"Reloaded catalog {state.version} ({state.catalog.size} assessments, {state.encoded} encoded)")
+            except Exception as e:
+                print(f"Catalog reload failed, keeping version {catalog_state.version}: {e}")
+                # Do not retry the same broken file on every tick
+                catalog_state.mtime = os.stat(catalog_state.path).st_mtime_ns
+
+class WarmupStatus:
+    # Progress of the background model/catalog load, reported by /ready
+    STAGES = ("gemini client", "encoder", "reranker", "catalog")
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self.stage = "pending"
+        self.durations = {}
+        self.error = None
+    
+    @property
+    def ready(self) -> bool:
+        return catalog_state is not None
+    
+    @contextmanager
+    def step(self, stage: str):
+        self.stage = stage
+        started = time.perf_counter()
+        yield
+        self.durations[stage] = round(time.perf_counter() - started, 3)
+    
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else ("failed" if self.error else "warming"),
+            "stage": "done" if self.ready else self.stage,
+            "progress": len(self.durations) / len(self.STAGES),
+            "stage_seconds": self.durations,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "error": self.error
+        }
+
+warmup = WarmupStatus()
+
+def warm_up(gemini: bool = True) -> None:
+    # Blocking: loads the encoder and builds the catalog state. Runs in a worker
+    # thread at startup; scripts can call it directly before get_recommendations.
+    # serve.py passes gemini=False: the client's gRPC channel must not cross a fork
+    global encoder, reranker, catalog_state
+    if catalog_state is not None:
+        return
+    try:
+        with warmup.step("gemini client"):
+            try:
+                if gemini:
+                    gemini_model()
+            except ImportError as e:
+                print(f"Gemini client unavailable, explanations will fail: {e}")
+        with warmup.step("encoder"):
+            encoder = load_encoder(ENCODER_MODEL, ENCODER_BACKEND, EMBEDDING_CACHE_DIR, ENCODER_THREADS)
+            # First call initializes lazily-built kernels; keep it off the first request
+            encoder.encode(["warm up"], convert_to_numpy=True)
+        with warmup.step("reranker"):
+            reranker = load_reranker(RERANKER, os.getenv("RERANKER_WEIGHTS"), os.getenv("RERANKER_MODEL"), CHUNK_POOLING)
+        with warmup.step("catalog"):
+            with catalog_reload_lock:
+                catalog_state = CatalogState(CATALOG_PATH)
+                invalidate_caches()
+            if explanation_store is not None:
+                explanation_store.load()
+    except Exception as e:
+        warmup.error = repr(e)
+        print(f"Warm-up failed during {warmup.stage}: {e}")
+        raise
+
+def require_ready() -> None:
+    if catalog_state is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service is warming up ({warmup.stage})",
+            headers={"Retry-After": "5"}
+        )
+
+# lazy: answer health checks immediately and warm up in the background;
+# eager: finish warming up before the server starts accepting requests
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy")
+
+# Set by serve.py in pre-forked workers. Workers share the parent's catalog and
+# embeddings, so reloads are done by the parent, which then re-forks its workers.
+prefork_parent: Optional[int] = None
+# Set by serve.py in the worker that answers / and /ready while the parent warms up;
+# that worker never loads the model itself
+external_warmup = False
+
+@app.get("/")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token or "", ADMIN_TOKEN)
 
-@app.get("/api/recommend", response_model=RecommendationResponse)
+@app.post("/api/admin/reload-catalog", dependencies=[Depends(require_ready)])
+async def admin_reload_catalog(x_admin_token: Optional[str] = Header(None)):
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if prefork_parent is not None:
+        os.kill(prefork_parent, signal.SIGHUP)
+        return JSONResponse({"status": "reload scheduled", **catalog_state.stats()}, status_code=202)
+    loop = asyncio.get_running_loop()
+    try:
+        state = await loop.run_in_executor(None, reload_catalog)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Catalog reload failed: {e}")
+    return state.stats()
+
+@app.get("/api/stats")
+async def stats():
+    return {
+        "pid": os.getpid(),
+        "json_backend": JSON_BACKEND,
+        "warmup": warmup.report(),
+        "catalog": catalog_state.stats() if catalog_state else None,
+        "query_batcher": query_batcher.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "url_fetcher": url_fetcher.stats(),
+        "llm": llm_client.stats(),
+        "reranker": dict(rerank_budget.stats(), kind=RERANKER),
+        "admission": admission.stats(),
+        "explanation_store": explanation_store.stats() if explanation_store is not None else None
+    }
+
+# Prometheus metrics on /metrics: request and per-stage latency histograms, plus cache,
+# queue and Gemini gauges read at scrape time. Metrics are per process; with serve.py
+# every worker keeps its own. METRICS_ENABLED=false drops the middleware, leaving
+# stage() blocks at one context-variable lookup each.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# A request sent with "X-Profile: 1" and a valid X-Admin-Token has its stacks sampled
+# every PROFILE_INTERVAL_MS; fetch the result from /api/admin/profiles/{X-Profile-Id}
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+metrics = MetricsRegistry(prefix="shl_")
+request_seconds = metrics.histogram(
+    "request_duration_seconds", "HTTP request latency by endpoint and status", ["endpoint", "status"]
+)
+stage_seconds = metrics.histogram(
+    "stage_duration_seconds", "Time spent per request in each pipeline stage (encode, similarity, top_k, rerank, llm, fetch)",
+    ["stage"]
+)
+# Finished profiles, rendered, in the cache tiers so any worker can serve them
+profiles = TieredCache(
+    "profile",
+    maxsize=32,
+    ttl=600,
+    dumps=lambda profile: json.dumps(profile).encode("utf-8"),
+    loads=json.loads,
+    redis_url=REDIS_URL
+)
+
+def store_profile(profile_id: str, profiler: SamplingProfiler) -> None:
+    profiles.set(profile_id, {"summary": profiler.summary(), "collapsed": profiler.collapsed()})
+
+def share_request_state(directory: str) -> None:
+    # Called by serve.py before forking: without Redis, workers share deferred
+    # explanations and profiles through files under `directory`
+    for cache in (deferred_ids, deferred_explanations, profiles):
+        cache.share_directory(directory)
+
+def local_caches() -> List[Tuple[str, object]]:
+    return [
+        ("embedding", embedding_cache.local),
+        ("response", response_cache.local),
+        ("semantic", semantic_cache),
+        ("url", url_fetcher.cache),
+        ("deferred_explanations", deferred_explanations.local)
+    ]
+
+def cache_samples(field: str) -> List[Tuple[dict, float]]:
+    return [({"cache": name}, cache.stats()[field]) for name, cache in local_caches()]
+
+metrics.gauge_callback("ready", "1 once the encoder and catalog are loaded", lambda: float(catalog_state is not None))
+metrics.gauge_callback(
+    "catalog_assessments", "Assessments in the serving catalog", lambda: catalog_state.catalog.size if catalog_state else 0
+)
+metrics.gauge_callback("cache_entries", "Entries in each in-process cache", lambda: cache_samples("size"))
+metrics.counter_callback("cache_hits_total", "In-process cache hits", lambda: cache_samples("hits"))
+metrics.counter_callback("cache_misses_total", "In-process cache misses", lambda: cache_samples("misses"))
+metrics.counter_callback("cache_evictions_total", "In-process cache LRU evictions", lambda: cache_samples("evictions"))
+metrics.gauge_callback("query_batcher_pending", "Queries waiting to be batched", lambda: query_batcher.stats()["pending"])
+metrics.counter_callback("query_batcher_batches_total", "Encoder batches run by the query batcher", lambda: query_batcher.batches)
+metrics.counter_callback("query_batcher_queries_total", "Queries encoded through the query batcher", lambda: query_batcher.queries)
+metrics.gauge_callback(
+    "encoder_queue_depth", "Encode jobs waiting for an encoder thread", lambda: encoder_executor._work_queue.qsize()
+)
+metrics.gauge_callback("llm_in_flight", "Gemini calls in progress", lambda: llm_client.in_flight)
+metrics.gauge_callback("llm_waiting", "Gemini calls waiting for a concurrency slot", lambda: llm_client.waiting)
+metrics.gauge_callback("llm_circuit_state", "1 for the circuit breaker's current state", lambda: [
+    ({"state": state}, float(llm_client.breaker.state == state)) for state in ("closed", "open", "half_open")
+])
+metrics.counter_callback("llm_calls_total", "Explanation requests made to the LLM client", lambda: llm_client.calls)
+metrics.counter_callback("llm_retries_total", "Gemini attempts retried after a retryable failure", lambda: llm_client.retries)
+metrics.counter_callback(
+    "llm_fallbacks_total", "Explanations answered by the template fallback", lambda: llm_client.stats()["fallbacks"]
+)
+metrics.gauge_callback("url_fetches_in_flight", "Job pages being fetched", lambda: url_fetcher.stats()["inflight"])
+metrics.counter_callback("url_fetch_errors_total", "Job page fetches that failed", lambda: url_fetcher.errors)
+metrics.gauge_callback("admission_active", "Requests holding an admission slot", lambda: [
+    ({"priority": priority}, count) for priority, count in admission.active.items()
+])
+metrics.gauge_callback("admission_queued", "Requests waiting for an admission slot", lambda: [
+    ({"priority": priority}, count) for priority, count in admission.queued.items()
+])
+metrics.counter_callback("admission_admitted_total", "Requests admitted", lambda: [
+    ({"priority": priority}, count) for priority, count in admission.admitted.items()
+])
+metrics.counter_callback("admission_dropped_total", "Requests turned away by admission control", lambda: [
+    ({"reason": "queue_full"}, admission.rejected["queue_full"]),
+    ({"reason": "client_limit"}, admission.rejected["client_limit"]),
+    ({"reason": "shed"}, admission.shed),
+    ({"reason": "deadline"}, admission.expired)
+])
+metrics.counter_callback(
+    "explanation_store_hits_total", "Explanations answered from the precomputed store",
+    lambda: explanation_store.hits if explanation_store is not None else 0
+)
+metrics.counter_callback("admission_degraded_total", "Requests served in degraded mode", lambda: admission.degraded)
+
+def request_profiler(headers: dict) -> Optional[SamplingProfiler]:
+    if headers.get(b"x-profile") != b"1":
+        return None
+    if not admin_token_valid(headers.get(b"x-admin-token", b"").decode("latin-1")):
+        return None
+    return SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000.0)
+
+if METRICS_ENABLED:
+    app.add_middleware(
+        MetricsMiddleware,
+        request_seconds=request_seconds,
+        stage_seconds=stage_seconds,
+        profile=request_profiler,
+        profile_done=store_profile
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["summary", "collapsed"] = Query("summary", description="summary (JSON) or collapsed stacks for flame graphs"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile id")
+    if format == "collapsed":
+        return PlainTextResponse(profile["collapsed"])
+    return profile["summary"]
+
+def filter_params(
+    test_type: Optional[List[str]] = Query(None, description="Test types to include (repeat or comma-separate)"),
+    min_duration: Optional[int] = Query(None, ge=0, description="Minimum duration in minutes"),
+    max_duration: Optional[int] = Query(None, ge=0, description="Maximum duration in minutes"),
+    adaptive: Optional[bool] = Query(None, description="Only adaptive/IRT (true) or non-adaptive (false) tests"),
+    remote: Optional[bool] = Query(None, description="Only tests with (true) or without (false) remote testing")
+) -> AssessmentFilters:
+    test_types = [t for value in test_type or [] for t in value.split(",") if t.strip()]
+    return AssessmentFilters(
+        test_types=test_types or None,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        adaptive=adaptive,
+        remote=remote
+    )
+
+def caller_params(
+    request: Request,
+    x_client_id: Optional[str] = Header(None, description="Orders requests from one client address; fairness and queue caps are per address (see FORWARDED_ALLOW_IPS)"),
+    x_priority: Literal["interactive", "batch"] = Header("interactive", description="batch for bulk/ATS traffic, queued behind interactive users"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the caller will wait; queued work is dropped after that")
+) -> Caller:
+    timeouts = [timeout for timeout in (x_request_timeout, REQUEST_DEADLINE) if timeout]
+    deadline = time.monotonic() + min(timeouts) if timeouts else None
+    # Fairness is keyed on the address (after trusted-proxy handling), which callers cannot
+    # rotate the way they could a header
+    client = request.client.host if request.client else "unknown"
+    return Caller(client, x_priority, deadline, x_client_id or "")
+
+def resolve_field_weights(field_weights: Optional[Dict[str, float]]) -> Optional[np.ndarray]:
+    try:
+        return ranking_weights(field_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def field_weight_params(
+    field_weights: Optional[str] = Query(None, description="Per-field ranking weights, e.g. name=0.3,description=0.5,text=0.2 (needs FIELD_EMBEDDINGS)")
+) -> Optional[np.ndarray]:
+    if field_weights is None:
+        return resolve_field_weights(None)
+    try:
+        return resolve_field_weights(parse_field_weights(field_weights))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def admission_error(e: AdmissionError) -> HTTPException:
+    headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after else None
+    return HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+def validate_filters(filters: AssessmentFilters) -> None:
+    try:
+        catalog_state.catalog.attributes.type_mask(filters.test_types or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/recommend", response_model=RecommendationResponse, dependencies=[Depends(require_ready)])
 async def recommend(
     query: str = Query(..., description="Natural language query or job description"),
-    max_results: int = Query(10, ge=1, le=10)
+    max_results: int = Query(10, ge=1, le=10),
+    explain: ExplainMode = Query("inline", description="inline, deferred (fetch via /api/explanation/{id}) or none"),
+    filters: AssessmentFilters = Depends(filter_params),
+    caller: Caller = Depends(caller_params),
+    weights: Optional[np.ndarray] = Depends(field_weight_params)
 ):
+    validate_filters(filters)
     try:
-        return get_recommendations(query, max_results)
+        return json_response(await get_recommendations_async(query, max_results, explain, filters, caller, weights))
+    except AdmissionError as e:
+        raise admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 class TextRequest(BaseModel):
     text: str
     max_results: Optional[int] = 10
+    explain: ExplainMode = "inline"
+    filters: AssessmentFilters = NO_FILTERS
+    # Per-field ranking weights over text/name/description/test_type (needs FIELD_EMBEDDINGS)
+    field_weights: Optional[Dict[str, float]] = None
 
-@app.post("/api/recommend/text", response_model=RecommendationResponse)
-async def recommend_from_text(request: TextRequest):
+@app.post("/api/recommend/text", response_model=RecommendationResponse, dependencies=[Depends(require_ready)])
+async def recommend_from_text(request: TextRequest, caller: Caller = Depends(caller_params)):
+    validate_filters(request.filters)
+    weights = resolve_field_weights(request.field_weights)
     try:
-        return get_recommendations(request.text, request.max_results)
+        return json_response(await get_recommendations_async(
+            request.text, request.max_results, request.explain, request.filters, caller, weights
+        ))
+    except AdmissionError as e:
+        raise admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/recommend/url", response_model=RecommendationResponse)
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_recommendations(response: RecommendationResponse) -> str:
+    # The recommendations event, from the precomputed assessment JSON
+    return f"event: recommendations\ndata: {response_json(response).decode('utf-8')}\n\n"
+
+async def stream_explanation(
+    query: str,
+    recommendations: List[Assessment],
+    timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    # Yields explanation text chunks from Gemini's streaming API within GEMINI_TIMEOUT
+    async for delta in llm_client.stream(build_explanation_prompt(query, recommendations), timeout):
+        yield delta
+
+def cached_events(cached: RecommendationResponse) -> List[str]:
+    return [
+        sse_recommendations(cached.model_copy(update={"explanation": ""})),
+        sse_event("explanation", {"delta": cached.explanation}),
+        sse_event("done", {"explanation": cached.explanation})
+    ]
+
+async def recommendation_events(
+    query: str,
+    max_results: int,
+    filters: AssessmentFilters,
+    caller: Caller,
+    weights: Optional[np.ndarray] = None
+) -> AsyncIterator[str]:
+    cached, store = cached_response(query, max_results, filters, weights)
+    if cached is not None:
+        for event in cached_events(cached):
+            yield event
+        return
+    
+    try:
+        async with admission.admit(caller) as ticket:
+            cached, store = await paraphrase_response(query, max_results, filters, weights, semantic_threshold(ticket))
+            if cached is None:
+                recommendations, final = await retrieve(query, max_results, filters, weights)
+    except AdmissionError as e:
+        yield sse_event("error", {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
+    if cached is not None:
+        for event in cached_events(cached):
+            yield event
+        return
+    yield sse_recommendations(RecommendationResponse(recommendations=recommendations, explanation=""))
+    
+    if not recommendations:
+        yield sse_event("done", {"explanation": NO_RESULTS_EXPLANATION})
+        return
+    
+    precomputed = precomputed_explanation(query, recommendations)
+    if precomputed is not None:
+        if final:
+            store(RecommendationResponse(recommendations=recommendations, explanation=precomputed))
+        yield sse_event("explanation", {"delta": precomputed})
+        yield sse_event("done", {"explanation": precomputed})
+        return
+    
+    budget = explanation_budget(ticket)
+    if budget is not None and budget <= 0:
+        # Degraded, or the caller has given up: the template, not a Gemini call (not cached)
+        explanation = template_explanation(recommendations)
+        yield sse_event("explanation", {"delta": explanation})
+        yield sse_event("done", {"explanation": explanation})
+        return
+    
+    parts = []
+    try:
+        async for delta in stream_explanation(query, recommendations, budget):
+            parts.append(delta)
+            yield sse_event("explanation", {"delta": delta})
+    except LLMError as e:
+        if parts:
+            yield sse_event("error", {"detail": f"Unable to generate explanation: {str(e)}"})
+            return
+        # Nothing streamed yet: answer with the local template instead (not cached)
+        explanation = template_explanation(recommendations)
+        yield sse_event("explanation", {"delta": explanation})
+        yield sse_event("done", {"explanation": explanation})
+        return
+    
+    explanation = "".join(parts)
+    if final:
+        store(RecommendationResponse(recommendations=recommendations, explanation=explanation))
+    yield sse_event("done", {"explanation": explanation})
+
+@app.get("/api/recommend/stream", dependencies=[Depends(require_ready)])
+async def recommend_stream(
+    query: str = Query(..., description="Natural language query or job description"),
+    max_results: int = Query(10, ge=1, le=10),
+    filters: AssessmentFilters = Depends(filter_params),
+    caller: Caller = Depends(caller_params),
+    weights: Optional[np.ndarray] = Depends(field_weight_params)
+):
+    validate_filters(filters)
+    # Server-sent events: "recommendations" (RecommendationResponse with an empty
+    # explanation), then "explanation" deltas, then "done" or "error" (with "status"
+    # and "retry_after" when admission control turned the request away)
+    return StreamingResponse(
+        recommendation_events(query, max_results, filters, caller, weights),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Bulk scoring: texts encoded per chunk, and a cap on concurrent Gemini calls per batch
+BATCH_ENCODE_SIZE = int(os.getenv("BATCH_ENCODE_SIZE", "256"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", "10000"))
+
+class BatchRequest(BaseModel):
+    texts: List[str]
+    max_results: int = Field(10, ge=1, le=10)
+    explain: bool = False
+    filters: AssessmentFilters = NO_FILTERS
+    field_weights: Optional[Dict[str, float]] = None
+
+async def admit_batch_chunk(caller: Caller) -> Ticket:
+    # Batch chunks are never dropped: when shed or turned away they wait and try again,
+    # so a batch slows down under interactive load instead of failing part-way
+    while True:
+        try:
+            return await admission.acquire(caller)
+        except AdmissionError as e:
+            await asyncio.sleep(e.retry_after or 1.0)
+
+async def batch_lines(
+    request: BatchRequest,
+    caller: Caller,
+    weights: Optional[np.ndarray] = None
+) -> AsyncIterator[bytes]:
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    
+    async def explain_bounded(text: str, recommendations: List[Assessment], ticket: Ticket) -> str:
+        async with semaphore:
+            explanation, _ = await generate_explanation_async(text, recommendations, explanation_budget(ticket))
+            return explanation
+    
+    chunks = [
+        (start, request.texts[start:start + BATCH_ENCODE_SIZE])
+        for start in range(0, len(request.texts), BATCH_ENCODE_SIZE)
+    ]
+    
+    async def encode_chunk(texts: List[str]) -> Tuple[Ticket, np.ndarray, np.ndarray]:
+        # A chunk holds its batch admission slot until it is ranked and explained, so batch
+        # traffic never has more than ADMISSION_MAX_BATCH_ACTIVE chunks in the pipeline
+        # or calling Gemini
+        windows, offsets = split_texts(texts)
+        ticket = await admit_batch_chunk(caller)
+        try:
+            with stage("encode"):
+                return ticket, await encode_queries_async(windows), offsets
+        except BaseException:
+            admission.release(ticket)
+            raise
+    
+    # Encode the next chunk while the current one is ranked, explained and written out
+    next_chunk = asyncio.ensure_future(encode_chunk(chunks[0][1]))
+    try:
+        for position, (start, texts) in enumerate(chunks):
+            ticket, embeddings, offsets = await next_chunk
+            next_chunk = None
+            try:
+                if position + 1 < len(chunks):
+                    next_chunk = asyncio.ensure_future(encode_chunk(chunks[position + 1][1]))
+                
+                state = catalog_state
+                candidates = rank_window_rows(
+                    state, embeddings, offsets, first_stage_depth(request.max_results), request.filters, texts, weights
+                )
+                ranked_rows, _ = await rerank_rows(
+                    state, texts, embeddings, offsets, candidates, request.max_results, weights
+                )
+                ranked = to_assessments(state, ranked_rows)
+                if request.explain:
+                    explanations = await asyncio.gather(*[
+                        explain_bounded(text, recommendations, ticket) for text, recommendations in zip(texts, ranked)
+                    ])
+                else:
+                    explanations = [""] * len(texts)
+            finally:
+                admission.release(ticket)
+            
+            for offset, (recommendations, explanation) in enumerate(zip(ranked, explanations)):
+                response = RecommendationResponse(recommendations=recommendations, explanation=explanation)
+                yield response_json(response, index=start + offset, state=state) + b"\n"
+    finally:
+        # The client went away: drop the chunk being encoded, or give back its slot if it is done
+        if next_chunk is not None and not next_chunk.cancel():
+            if not next_chunk.cancelled() and next_chunk.exception() is None:
+                admission.release(next_chunk.result()[0])
+
+@app.post("/api/recommend/batch", dependencies=[Depends(require_ready)])
+async def recommend_batch(request: BatchRequest, caller: Caller = Depends(caller_params)):
+    # Streams one JSON object per input text (NDJSON), tagged with its index. Chunks are
+    # admitted as batch traffic whatever X-Priority says, and without a deadline
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="texts must not be empty")
+    if len(request.texts) > BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_TEXTS} texts per batch")
+    validate_filters(request.filters)
+    weights = resolve_field_weights(request.field_weights)
+    return StreamingResponse(
+        batch_lines(request, Caller(caller.client, "batch", client_id=caller.client_id), weights), media_type="application/x-ndjson"
+    )
+
+class ExplanationResponse(BaseModel):
+    explanation_id: str
+    status: Literal["pending", "ready"]
+    explanation: Optional[str] = None
+
+@app.get("/api/explanation/{explanation_id}", response_model=ExplanationResponse)
+async def get_explanation(
+    explanation_id: str,
+    wait: bool = Query(False, description="Block until the explanation is ready (bounded by GEMINI_TIMEOUT)")
+):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + GEMINI_TIMEOUT + 1
+    while True:
+        task = running_explanations.get(explanation_id)
+        if task is not None and wait:
+            # Generated here: shield so a disconnecting poller does not cancel the task
+            await asyncio.wait([asyncio.shield(task)], timeout=max(0.0, deadline - loop.time()))
+        explanation = deferred_explanations.get(explanation_id)
+        if explanation is not None:
+            return ExplanationResponse(explanation_id=explanation_id, status="ready", explanation=explanation)
+        if task is None and deferred_ids.get(explanation_id) is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired explanation_id")
+        if not wait or loop.time() >= deadline:
+            return ExplanationResponse(explanation_id=explanation_id, status="pending")
+        # Being generated by another worker or replica
+        await asyncio.sleep(EXPLANATION_POLL_INTERVAL)
+
+# HTML extraction runs off the event loop: threads by default, or separate
+# processes (URL_PARSER_PROCESSES > 0) so parsing never competes for the GIL
+URL_PARSER_PROCESSES = int(os.getenv("URL_PARSER_PROCESSES", "0"))
+if URL_PARSER_PROCESSES > 0:
+    parser_executor = ProcessPoolExecutor(
+        max_workers=URL_PARSER_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+else:
+    parser_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="html-parser")
+
+url_fetcher = JobPageFetcher(
+    parser_executor,
+    max_connections=int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "100")),
+    max_per_host=int(os.getenv("URL_FETCH_MAX_PER_HOST", "4")),
+    timeout=float(os.getenv("URL_FETCH_TIMEOUT", "10")),
+    cache_size=int(os.getenv("URL_CACHE_SIZE", "1024")),
+    fresh_for=float(os.getenv("URL_CACHE_FRESH_SECONDS", "300")),
+    allow_private_hosts=os.getenv("URL_ALLOW_PRIVATE_HOSTS", "").lower() in ("1", "true", "yes")
+)
+
+@app.get("/api/recommend/url", response_model=RecommendationResponse, dependencies=[Depends(require_ready)])
 async def recommend_from_url(
     url: str = Query(..., description="URL of the job description"),
-    max_results: int = Query(10, ge=1, le=10)
+    max_results: int = Query(10, ge=1, le=10),
+    explain: ExplainMode = Query("inline", description="inline, deferred (fetch via /api/explanation/{id}) or none"),
+    filters: AssessmentFilters = Depends(filter_params),
+    caller: Caller = Depends(caller_params),
+    weights: Optional[np.ndarray] = Depends(field_weight_params)
 ):
-    # In production, this would fetch and parse the URL content
-    raise HTTPException(status_code=501, detail="URL processing not implemented yet") 
\ No newline at end of file
+    validate_filters(filters)
+    try:
+        with stage("fetch"):
+            text = await url_fetcher.fetch_text(url)
+    except FetchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        return json_response(await get_recommendations_async(text, max_results, explain, filters, caller, weights))
+    except AdmissionError as e:
+        raise admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def start_background_tasks():
+    if external_warmup:
+        return
+    loop = asyncio.get_running_loop()
+    app.state.warmup = loop.run_in_executor(None, warm_up)
+    if STARTUP_MODE == "eager":
+        await app.state.warmup
+    if CATALOG_WATCH_INTERVAL > 0:
+        app.state.catalog_watcher = asyncio.ensure_future(watch_catalog())
+
+async def stop_background_tasks():
+    watcher = getattr(app.state, "catalog_watcher", None)
+    if watcher is not None:
+        watcher.cancel()
+    await url_fetcher.close()
+    if request_log is not None:
+        request_log.close()
+    encoder_executor.shutdown(wait=False)
+    parser_executor.shutdown(wait=False)
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from timing import record_stages
+
+# Seconds; fine enough at the low end for sub-millisecond stages such as similarity and top-k
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Callback results: one value, or (labels, value) pairs
+Samples = Union[float, Iterable[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, in the Prometheus layout."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = [(labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labelvalues, counts, total in series:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose samples are read from the application when scraped."""
+
+    def __init__(self, name: str, help: str, type: str, collect: Callable[[], Samples]):
+        self.name = name
+        self.help = help
+        self.type = type
+        self._collect = collect
+
+    def collect(self) -> List[str]:
+        samples = self._collect()
+        if isinstance(samples, (int, float)):
+            samples = [({}, samples)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this process in the Prometheus text exposition format (0.0.4).
+
+    Histograms are updated on the request path; callback metrics (cache
+    sizes, queue depths, ...) are read only when scraped, so they cost
+    nothing between scrapes.
+    """
+
+    # Starlette appends "; charset=utf-8" to text/* media types
+    CONTENT_TYPE = "text/plain; version=0.0.4"
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics = []
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(self.prefix + name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, collect: Callable[[], Samples]) -> None:
+        self._metrics.append(CallbackMetric(self.prefix + name, help, "gauge", collect))
+
+    def counter_callback(self, name: str, help: str, collect: Callable[[], Samples]) -> None:
+        self._metrics.append(CallbackMetric(self.prefix + name, help, "counter", collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                # One broken callback must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {_escape(repr(e))}")
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: Dict[str, float]) -> bytes:
+    # Server-Timing header value, durations in milliseconds
+    return ", ".join(f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in timings.items()).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request and the pipeline stages inside it.
+
+    Each request runs inside `timing.record_stages()`, so the `stage()` blocks
+    of the recommendation pipeline land in `stage_seconds`; the whole request
+    lands in `request_seconds` by endpoint and status. Responses carry the
+    stages measured so far in a `Server-Timing` header. When `profile` is
+    given and returns a profiler for a request's headers, the request is
+    sampled and the profiler is handed to `profile_done` with the id sent
+    back in `X-Profile-Id`; stopping it and `profile_done` run in the loop's
+    default executor.
+    """
+
+    def __init__(
+        self,
+        app,
+        request_seconds: Histogram,
+        stage_seconds: Histogram,
+        profile: Optional[Callable[[Dict[bytes, bytes]], Optional[object]]] = None,
+        profile_done: Optional[Callable[[str, object], None]] = None,
+    ):
+        self.app = app
+        self.request_seconds = request_seconds
+        self.stage_seconds = stage_seconds
+        self.profile = profile
+        self.profile_done = profile_done
+
+    def finish_profile(self, profile_id: str, profiler) -> None:
+        profiler.stop()
+        self.profile_done(profile_id, profiler)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        profiler, profile_id = None, None
+        if self.profile is not None:
+            profiler = self.profile(dict(scope["headers"]))
+            if profiler is not None:
+                profile_id = uuid.uuid4().hex
+                profiler.start()
+
+        with record_stages() as timings:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(
+                        dict(timings, total=time.perf_counter() - started)
+                    )))
+                    if profile_id is not None:
+                        headers.append((b"x-profile-id", profile_id.encode("ascii")))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if profiler is not None:
+                    # Joining the sampler thread and rendering its stacks both block
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.finish_profile, profile_id, profiler)
+                # The router stores the matched endpoint in the scope; raw paths would
+                # give every /api/explanation/{id} its own series
+                endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                self.request_seconds.observe(time.perf_counter() - started, endpoint, str(status))
+                for name, seconds in list(timings.items()):
+                    self.stage_seconds.observe(seconds, name)
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Field 0 is the combined "name description test_type" text behind the single-vector
+# index; the others are the catalog fields embedded on their own
+EMBEDDED_FIELDS = ("text", "name", "description", "test_type")
+
+
+def parse_field_weights(spec: str) -> Dict[str, float]:
+    """Parse "name=0.3,description=0.7" (":" works too), as in FIELD_WEIGHTS and the field_weights parameter."""
+    weights = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, separator, value = part.replace(":", "=").partition("=")
+        if not separator:
+            raise ValueError(f"Expected field=weight, got {part.strip()!r}")
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight for field {name.strip()!r}: {value.strip()!r}")
+    return weights
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    """Weights in EMBEDDED_FIELDS order, normalized to sum to 1 so scores stay on the cosine scale."""
+    unknown = set(weights) - set(EMBEDDED_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields {sorted(unknown)}; expected any of {EMBEDDED_FIELDS}")
+    vector = np.array([weights.get(field, 0.0) for field in EMBEDDED_FIELDS], dtype=np.float32)
+    if (vector < 0).any() or vector.sum() <= 0:
+        raise ValueError("Field weights must be non-negative and not all zero")
+    return vector / vector.sum()
+
+
+def is_text_only(weights: Optional[np.ndarray]) -> bool:
+    # Scores equal the single-vector cosine, so the vector index can answer
+    return weights is None or (weights[0] == 1.0 and not weights[1:].any())
+
+
+def field_texts(catalog) -> List[str]:
+    # (assessment, field) texts in row-major order, for every field but the combined one
+    columns = [catalog.columns[field] for field in EMBEDDED_FIELDS[1:]]
+    return [str(value) for values in zip(*columns) for value in values]
+
+
+def stack_fields(text_embeddings: np.ndarray, field_embeddings: np.ndarray) -> np.ndarray:
+    """(assessments x EMBEDDED_FIELDS x dim) from the combined-text rows and the row-major `field_texts` rows."""
+    n, dim = text_embeddings.shape
+    stacked = np.empty((n, len(EMBEDDED_FIELDS), dim), dtype=np.float32)
+    stacked[:, 0] = text_embeddings
+    stacked[:, 1:] = np.asarray(field_embeddings, dtype=np.float32).reshape(n, len(EMBEDDED_FIELDS) - 1, dim)
+    return stacked
+
+
+class FieldEmbeddings:
+    """Per-field catalog embeddings, scored as a weighted sum of per-field cosine similarities.
+
+    `stacked` is (assessments x EMBEDDED_FIELDS x dim), L2-normalized per
+    field. Since sum_f w_f (q . e_f) = q . (sum_f w_f e_f), the fields are
+    folded into one (assessments x dim) matrix per weight vector, with a
+    single einsum, and scoring is then one matrix multiply, as for the
+    single-vector catalog. Folded matrices are kept for the `cache_size`
+    most recently used weight vectors, so only the first request with new
+    weights pays for the fold.
+    """
+
+    def __init__(self, stacked: np.ndarray, cache_size: int = 8):
+        self.stacked = stacked
+        self.cache_size = max(1, cache_size)
+        self._folded: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.folds = 0
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.stacked.shape
+
+    def folded(self, weights: np.ndarray) -> np.ndarray:
+        """(assessments x dim) catalog matrix for these weights, as built by weight_vector."""
+        key = weights.tobytes()
+        with self._lock:
+            matrix = self._folded.get(key)
+            if matrix is not None:
+                self._folded.move_to_end(key)
+                return matrix
+        matrix = np.einsum("nfd,f->nd", self.stacked, weights.astype(np.float32))
+        with self._lock:
+            self.folds += 1
+            self._folded[key] = matrix
+            while len(self._folded) > self.cache_size:
+                self._folded.popitem(last=False)
+        return matrix
+
+    def similarities(
+        self,
+        query_embeddings: np.ndarray,
+        weights: np.ndarray,
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Weighted cosine similarity of every query to every assessment (or `rows`): (queries x assessments)."""
+        matrix = self.folded(weights)
+        if rows is not None:
+            matrix = matrix[rows]
+        return np.dot(query_embeddings, matrix.T)
+
+    def stats(self) -> dict:
+        return {
+            "shape": list(self.stacked.shape),
+            "fields": list(EMBEDDED_FIELDS),
+            "cached_weights": len(self._folded),
+            "cache_size": self.cache_size,
+            "folds": self.folds,
+        }
@@ -0,0 +1,138 @@
+"""Pre-generate Gemini explanations for frequent recommendation sets.
+
+Reads the request log written by the server (EXPLANATION_LOG), finds the
+(query cluster, recommendation set) pairs requested at least --min-support
+times, and stores a Gemini explanation for each in the explanation store
+(EXPLANATION_STORE), which the server answers from before calling Gemini.
+
+Each run also keeps the store fresh: entries whose assessments changed in
+the catalog are regenerated, entries naming assessments that no longer
+exist are deleted, and entries embedded with another encoder model are
+re-embedded and regenerated. Run it from cron, or keep it running with --interval; it
+reloads the catalog whenever the file changes.
+
+    cd app && EXPLANATION_LOG=requests.jsonl EXPLANATION_STORE=explanations.db \\
+        python precompute_explanations.py --min-support 5 --since-hours 168
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+import main
+from explanation_store import ExplanationStore, mine_frequent_sets, read_log, rows_digest, set_key
+from llm import LLMError
+
+
+async def explain(state, names: List[str], query: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+    assessments = [state.assessments[state.catalog.by_name[name]] for name in names]
+    async with semaphore:
+        try:
+            return await main.llm_client.generate(main.build_explanation_prompt(query, assessments))
+        except LLMError as e:
+            print(f"  skipped {query!r}: {e}")
+            return None
+
+
+def current_digest(state, names: List[str]) -> str:
+    return rows_digest([state.assessments[state.catalog.by_name[name]].model_dump() for name in names])
+
+
+async def refresh(store: ExplanationStore, candidates: List[dict], concurrency: int) -> Counter:
+    state = main.catalog_state
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = Counter()
+    # (entry id or None, names, query, centroid, support), explained concurrently below
+    jobs = []
+
+    existing = store.rows()
+    missing = [row["id"] for row in existing if any(name not in state.catalog.by_name for name in row["names"])]
+    if missing:
+        store.delete(missing)
+        counts["deleted"] = len(missing)
+    existing = [row for row in existing if row["id"] not in missing]
+
+    # Centroids from another encoder model cannot match this one's query embeddings
+    recentered = [row for row in existing if row["model"] != store.model_name]
+    if recentered:
+        centroids = main.encode_queries([row["query"] for row in recentered])
+        for row, centroid in zip(recentered, centroids):
+            row["centroid"] = centroid
+            row["digest"] = None
+        counts["recentered"] = len(recentered)
+    for row in existing:
+        if row["digest"] != current_digest(state, row["names"]):
+            jobs.append((row["id"], row["names"], row["query"], row["centroid"], row["support"]))
+
+    by_set = {}
+    for row in existing:
+        by_set.setdefault(row["set_key"], []).append(row)
+    for candidate in candidates:
+        if any(name not in state.catalog.by_name for name in candidate["names"]):
+            continue
+        matches = [
+            row for row in by_set.get(set_key(candidate["names"]), [])
+            if float(np.dot(row["centroid"], candidate["centroid"])) >= store.threshold
+        ]
+        if matches:
+            counts["known"] += 1
+            continue
+        jobs.append((None, candidate["names"], candidate["query"], candidate["centroid"], candidate["support"]))
+
+    explanations = await asyncio.gather(*[explain(state, names, query, semaphore) for _, names, query, _, _ in jobs])
+    for (entry_id, names, query, centroid, support), explanation in zip(jobs, explanations):
+        if explanation is None:
+            counts["failed"] += 1
+            continue
+        store.put(names, query, centroid, current_digest(state, names), explanation, support, entry_id)
+        counts["regenerated" if entry_id is not None else "added"] += 1
+    return counts
+
+
+def run_once(store: ExplanationStore, args) -> None:
+    state = main.catalog_state
+    if os.stat(state.path).st_mtime_ns != state.mtime:
+        state = main.reload_catalog()
+        print(f"Reloaded catalog {state.version}")
+    started = time.perf_counter()
+    since = time.time() - args.since_hours * 3600.0 if args.since_hours > 0 else 0.0
+    records = read_log(args.log, since) if os.path.exists(args.log) else iter(())
+    candidates = mine_frequent_sets(
+        records, main.encode_queries, args.min_support, store.threshold, args.max_sets
+    )
+    counts = asyncio.run(refresh(store, candidates, args.concurrency))
+    print(
+        f"{len(candidates)} frequent sets; "
+        + ", ".join(f"{name} {count}" for name, count in sorted(counts.items()))
+        + f" in {time.perf_counter() - started:.1f}s ({len(store.rows())} entries for catalog {state.version})"
+    )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=main.EXPLANATION_LOG, help="request log (EXPLANATION_LOG)")
+    parser.add_argument("--store", default=main.EXPLANATION_STORE, help="explanation store (EXPLANATION_STORE)")
+    parser.add_argument("--min-support", type=int, default=5, help="requests a (query cluster, set) pair needs")
+    parser.add_argument("--max-sets", type=int, default=500, help="most frequent pairs to keep explanations for")
+    parser.add_argument("--since-hours", type=float, default=168.0, help="only mine this much recent log (0: all)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent Gemini calls")
+    parser.add_argument("--interval", type=float, default=0.0, help="repeat every N seconds (0: run once)")
+    args = parser.parse_args()
+    if not args.log or not args.store:
+        parser.error("set --log/--store or EXPLANATION_LOG/EXPLANATION_STORE")
+
+    main.warm_up()
+    store = ExplanationStore(args.store, main.embedding_store.model_name, threshold=main.EXPLANATION_STORE_THRESHOLD)
+    while True:
+        run_once(store, args)
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main_cli()
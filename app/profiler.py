@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+# Frames in these files mean the thread is idle (waiting on a queue, lock or socket)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread from a background thread.
+
+    Meant to be switched on for a single request: it wakes every `interval`
+    seconds, so the cost stays flat however hot the request path is. Idle
+    threads are skipped. Everything running in the process is sampled,
+    including other requests served at the same time. `collapsed()` returns
+    folded stacks ("thread;outer;...;inner count"), the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, max_seconds: float = 60.0):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        max_samples = self.max_seconds / self.interval
+        while not self._stopped.wait(self.interval) and self.samples < max_samples:
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 20) -> dict:
+        # Leaf functions by share of samples, for a quick look without a flame graph viewer
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "samples": self.samples,
+            "top_functions": [
+                {"function": name, "samples": count, "share": round(count / max(1, self.samples), 3)}
+                for name, count in leaves.most_common(top)
+            ],
+        }
@@ -0,0 +1,253 @@
+import json
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from chunking import pool_scores
+
+# Query words that ask for a test type, keyed by lowercased catalog test type;
+# types missing from the catalog are ignored
+TEST_TYPE_KEYWORDS = {
+    "cognitive": ("cognitive", "reasoning", "numerical", "verbal", "logical", "analytical", "aptitude"),
+    "ability": ("ability", "abilities", "aptitude", "reasoning", "problem solving", "problem-solving"),
+    "personality": ("personality", "traits", "culture fit", "motivation"),
+    "behavioral": (
+        "behavioral", "behavioural", "behavior", "behaviour", "teamwork", "collaboration", "collaborate",
+        "communication", "interpersonal", "leadership",
+    ),
+    "situational judgment": ("situational", "judgment", "judgement", "scenarios"),
+    "knowledge": ("knowledge", "skills test", "programming", "coding", "developer", "technical"),
+    "technical": ("technical", "coding", "programming", "developer", "engineer"),
+    "emotional intelligence": ("emotional", "empathy"),
+    "developmental": ("development", "developmental", "coaching"),
+}
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*(minutes?|mins?|hours?|hrs?)\b")
+_AN_HOUR = re.compile(r"\b(?:an|one)\s+hour\b")
+
+FEATURES = ("cosine", "bm25", "first_stage", "test_type_match", "duration_fit")
+
+# Used until weights are trained on labeled queries (benchmarks/train_reranker.py):
+# the cosine score leads, the other signals break near-ties
+DEFAULT_WEIGHTS = {"cosine": 1.0, "bm25": 0.35, "first_stage": 0.25, "test_type_match": 0.1, "duration_fit": 0.15}
+
+
+def query_test_type_mask(text: str, attributes) -> int:
+    # Bitmask (see CatalogColumns.type_mask) of the test types the query asks for
+    text = text.lower()
+    known = {name.lower() for name in attributes.test_type_names}
+    names = [
+        name for name, keywords in TEST_TYPE_KEYWORDS.items()
+        if name in known and any(keyword in text for keyword in keywords)
+    ]
+    return attributes.type_mask(names)
+
+
+def query_duration_limit(text: str) -> Optional[float]:
+    # Longest duration mentioned in the query, in minutes ("within 40 minutes", "about an hour")
+    text = text.lower()
+    limits = [
+        float(value) * (60 if unit.startswith(("hour", "hr")) else 1) for value, unit in _DURATION.findall(text)
+    ]
+    if _AN_HOUR.search(text):
+        limits.append(60.0)
+    return max(limits) if limits else None
+
+
+class FeatureReranker:
+    """Re-scores first-stage candidates with a linear model over cheap features.
+
+    Features per (query, candidate): pooled cosine similarity (weighted over
+    fields when the request ranks with field weights), BM25 score
+    relative to the query's best match, reciprocal first-stage rank, whether
+    the candidate has a test type the query asks for, and whether its
+    duration fits a limit stated in the query (+1 fits, -1 too long, 0 when
+    either is unknown). Everything is computed with array operations over
+    all of a query's candidates at once, so it is cheap enough to run inline.
+    """
+
+    blocking = False
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, bias: float = 0.0, pooling: str = "max"):
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.weights = np.array([weights[name] for name in FEATURES], dtype=np.float32)
+        self.bias = bias
+        self.pooling = pooling
+
+    @classmethod
+    def load(cls, path: str, pooling: str = "max") -> "FeatureReranker":
+        # JSON written by benchmarks/train_reranker.py: {"weights": {feature: weight}, "bias": float}
+        with open(path, "r", encoding="utf-8") as f:
+            model = json.load(f)
+        unknown = set(model["weights"]) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown reranker features {sorted(unknown)}; expected {FEATURES}")
+        return cls(model["weights"], model.get("bias", 0.0), pooling)
+
+    def features(
+        self,
+        state,
+        text: str,
+        window_embeddings: np.ndarray,
+        candidates: np.ndarray,
+        weights: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # (candidates x FEATURES) for one query; `window_embeddings` are the query's windows and
+        # `weights` the field weights the first stage ranked with (None for the combined text)
+        attributes = state.catalog.attributes
+        features = np.zeros((len(candidates), len(FEATURES)), dtype=np.float32)
+        if weights is None:
+            similarities = np.dot(window_embeddings, state.embeddings[candidates].T)
+        else:
+            similarities = state.field_embeddings.similarities(window_embeddings, weights, candidates)
+        features[:, 0] = pool_scores(similarities, np.zeros(1, dtype=np.int64), self.pooling)[0]
+        lexical = state.lexical.score(text)
+        if lexical.max() > 0:
+            features[:, 1] = lexical[candidates] / lexical.max()
+        features[:, 2] = 1.0 / (1.0 + np.arange(len(candidates)))
+        mask = query_test_type_mask(text, attributes)
+        if mask:
+            features[:, 3] = (attributes.test_type_bits[candidates] & np.uint64(mask)) != 0
+        limit = query_duration_limit(text)
+        if limit is not None:
+            durations = attributes.duration_minutes[candidates]
+            features[:, 4] = np.where(durations < 0, 0.0, np.where(durations <= limit, 1.0, -1.0))
+        return features
+
+    def candidate_features(
+        self,
+        state,
+        texts: List[str],
+        window_embeddings: np.ndarray,
+        offsets: np.ndarray,
+        candidates: List[np.ndarray],
+        weights: Optional[np.ndarray] = None
+    ) -> List[np.ndarray]:
+        ends = np.append(offsets[1:], len(window_embeddings))
+        return [
+            self.features(state, text, window_embeddings[start:end], rows, weights)
+            for text, start, end, rows in zip(texts, offsets, ends, candidates)
+        ]
+
+    def rerank(
+        self,
+        state,
+        texts: List[str],
+        window_embeddings: np.ndarray,
+        offsets: np.ndarray,
+        candidates: List[np.ndarray],
+        max_results: int,
+        weights: Optional[np.ndarray] = None,
+    ) -> List[np.ndarray]:
+        """Re-order each query's candidate rows (first-stage order) and keep the best `max_results`."""
+        ranked = []
+        features_per_query = self.candidate_features(state, texts, window_embeddings, offsets, candidates, weights)
+        for rows, features in zip(candidates, features_per_query):
+            scores = features @ self.weights + self.bias
+            ranked.append(rows[np.argsort(-scores, kind="stable")[:max_results]])
+        return ranked
+
+
+class CrossEncoderReranker:
+    """Re-scores candidates with a sentence-transformers cross-encoder.
+
+    Every (query, catalog text) pair of a request goes through the model in
+    one batched `predict`. Much slower than `FeatureReranker`, so it runs on
+    the encoder pool and is subject to the re-ranking budget.
+    """
+
+    blocking = True
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = 64):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name)
+        self.batch_size = batch_size
+
+    def rerank(
+        self,
+        state,
+        texts: List[str],
+        window_embeddings: np.ndarray,
+        offsets: np.ndarray,
+        candidates: List[np.ndarray],
+        max_results: int,
+        weights: Optional[np.ndarray] = None,
+    ) -> List[np.ndarray]:
+        # Field weights do not apply: the model reads the combined catalog text
+        pairs = [(text, state.texts[row]) for text, rows in zip(texts, candidates) for row in rows]
+        if not pairs:
+            return [rows[:max_results] for rows in candidates]
+        scores = np.asarray(self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float32)
+        ranked, start = [], 0
+        for rows in candidates:
+            query_scores = scores[start:start + len(rows)]
+            start += len(rows)
+            ranked.append(rows[np.argsort(-query_scores, kind="stable")[:max_results]])
+        return ranked
+
+
+class RerankBudget:
+    """Decides per request whether re-ranking is affordable right now.
+
+    Re-ranking is skipped while more than `max_in_flight` re-ranks are
+    running, or while their recent latency (an exponentially weighted
+    average) exceeds `budget_ms`. Each skipped request decays that average,
+    so re-ranking resumes once load drops. Callers also cap each re-rank at
+    `budget_ms` and fall back to the first-stage order.
+    """
+
+    def __init__(self, budget_ms: float = 50.0, max_in_flight: int = 4, smoothing: float = 0.2, decay: float = 0.9):
+        self.budget = budget_ms / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+        self.smoothing = smoothing
+        self.decay = decay
+        self.recent_seconds = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+        self.reranked = 0
+        self.skipped = 0
+        self.timeouts = 0
+
+    def admit(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight or self.recent_seconds > self.budget:
+                self.skipped += 1
+                self.recent_seconds *= self.decay
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.recent_seconds += self.smoothing * (seconds - self.recent_seconds)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.reranked += 1
+
+    def stats(self) -> dict:
+        return {
+            "budget_ms": self.budget * 1000.0,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "recent_ms": round(self.recent_seconds * 1000.0, 3),
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "timeouts": self.timeouts,
+        }
+
+
+def load_reranker(kind: str, weights_path: Optional[str] = None, model_name: Optional[str] = None, pooling: str = "max"):
+    """Reranker for RERANKER=off|features|cross-encoder; None when off."""
+    if kind == "off":
+        return None
+    if kind == "features":
+        return FeatureReranker.load(weights_path, pooling) if weights_path else FeatureReranker(pooling=pooling)
+    if kind == "cross-encoder":
+        return CrossEncoderReranker(model_name) if model_name else CrossEncoderReranker()
+    raise ValueError(f"Unknown reranker {kind!r}; expected off, features or cross-encoder")
@@ -0,0 +1,38 @@
+import json
+from typing import Any, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson is optional: several times faster than the standard library when installed
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, the same with either backend."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def recommendation_json(
+    fragments: Sequence[bytes],
+    explanation: str,
+    explanation_id: Optional[str] = None,
+    extra: Optional[dict] = None
+) -> bytes:
+    """A RecommendationResponse body built from pre-encoded assessment fragments.
+
+    Keys follow the model's field order, so the bytes match what FastAPI
+    would send for the same response; `extra` keys (e.g. a batch line's
+    "index") are appended after them. Only the explanation is encoded here.
+    """
+    body = (
+        b'{"recommendations":[' + b",".join(fragments) + b'],"explanation":' + dumps(explanation)
+        + b',"explanation_id":' + dumps(explanation_id)
+    )
+    for key, value in (extra or {}).items():
+        body += b"," + dumps(key) + b":" + dumps(value)
+    return body + b"}"
@@ -0,0 +1,252 @@
+"""Pre-fork server: load the encoder and catalog once, then fork uvicorn workers.
+
+`uvicorn --workers N` starts N fresh interpreters that each load their own
+SentenceTransformer and embedding matrix. Here the parent warms up once and
+forks; workers inherit the model weights and catalog arrays copy-on-write
+(the embedding matrix itself is a read-only mmap of the on-disk store), so
+each extra worker adds little resident memory.
+
+The socket is bound before anything is loaded, and a placeholder worker
+forked at that point answers / (and 503 on /ready and the recommend
+endpoints) while the parent warms up, so health checks pass during the model
+load as with STARTUP_MODE=lazy. It is retired once the real workers are up.
+
+The parent owns the catalog: it polls it every CATALOG_WATCH_INTERVAL
+seconds, or reloads on SIGHUP (sent by POST /api/admin/reload-catalog), and
+then replaces its workers with ones forked from the new state.
+
+    cd app && python serve.py --host 0.0.0.0 --port 10000 --workers 4
+
+Workers default to one per available core (WEB_CONCURRENCY overrides it).
+They take turns on one socket, so per-request state a later call looks up,
+deferred explanations (GET /api/explanation/{id}) and request profiles
+(/api/admin/profiles/{id}), is shared: through Redis when REDIS_URL is set,
+else through files in a temporary directory removed on exit.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+# Rust tokenizers disable their thread pool after a fork anyway; avoid the warning
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import uvicorn  # noqa: E402
+
+import main  # noqa: E402
+from encoders import load_encoder, set_torch_threads  # noqa: E402
+
+# Seconds a worker must stay up before a crash is restarted without a pause
+MIN_WORKER_LIFETIME = 1.0
+
+
+def available_cores() -> int:
+    # Cores this process may run on, which can be fewer than the machine has
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def uses_onnx() -> bool:
+    return main.ENCODER_BACKEND.startswith("onnx")
+
+
+def run_worker(config: uvicorn.Config, sock, threads: int, placeholder: bool = False) -> None:
+    main.prefork_parent = os.getppid()
+    main.CATALOG_WATCH_INTERVAL = 0
+    if placeholder:
+        main.external_warmup = True
+    elif uses_onnx():
+        # onnxruntime sessions own a thread pool that does not survive fork; load one per worker
+        main.encoder = load_encoder(main.ENCODER_MODEL, main.ENCODER_BACKEND, main.EMBEDDING_CACHE_DIR, threads)
+    else:
+        set_torch_threads(threads)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Keeps `workers` children forked from the warmed-up parent running.
+
+    Crashed workers are replaced. A reload builds the new catalog state in
+    the parent, forks a fresh set of workers, then asks the old ones to
+    finish their in-flight requests and exit.
+    """
+
+    def __init__(self, config: uvicorn.Config, sock, workers: int, threads: int, shutdown_timeout: float = 30.0):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.shutdown_timeout = shutdown_timeout
+        self.children = {}
+        self.retiring = set()
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self, placeholder: bool = False) -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.config, self.sock, self.threads, placeholder)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def prepare_fork(self) -> None:
+        # Objects alive now are never collected; keeping the collector off them
+        # keeps their pages clean, so workers go on sharing them with the parent
+        gc.collect()
+        gc.freeze()
+        if uses_onnx():
+            main.encoder = None
+
+    def reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if self.stopping or started is None:
+                continue
+            print(f"Worker {pid} exited with status {status}; restarting")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+
+    def reload(self) -> None:
+        self.reload_requested = False
+        if main.encoder is None:
+            main.encoder = load_encoder(main.ENCODER_MODEL, main.ENCODER_BACKEND, main.EMBEDDING_CACHE_DIR, 1)
+        try:
+            state = main.reload_catalog()
+        except Exception as e:
+            print(f"Catalog reload failed, keeping version {main.catalog_state.version}: {e}")
+            # Do not retry the same broken file on every tick
+            main.catalog_state.mtime = os.stat(main.catalog_state.path).st_mtime_ns
+            return
+        print(f"Reloaded catalog {state.version} ({state.catalog.size} assessments, {state.encoded} encoded)")
+        self.replace_workers()
+
+    def replace_workers(self) -> None:
+        # Fork a full set from the current state, then let the old ones finish and exit
+        old = set(self.children)
+        self.prepare_fork()
+        for _ in range(self.workers):
+            self.spawn()
+        self.retiring |= old
+        for pid in old:
+            os.kill(pid, signal.SIGTERM)
+
+    def catalog_changed(self) -> bool:
+        try:
+            return os.stat(main.catalog_state.path).st_mtime_ns != main.catalog_state.mtime
+        except OSError:
+            return False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+        # Replaces the placeholder, if one answered while warming up
+        self.replace_workers()
+        print(f"Serving with {self.workers} pre-forked workers, {self.threads} encoder thread(s) each")
+
+        watch_interval = main.CATALOG_WATCH_INTERVAL
+        last_check = time.monotonic()
+        while not self.stopping:
+            time.sleep(0.2)
+            self.reap()
+            if watch_interval > 0 and time.monotonic() - last_check >= watch_interval:
+                last_check = time.monotonic()
+                self.reload_requested = self.reload_requested or self.catalog_changed()
+            if self.reload_requested and not self.stopping:
+                self.reload()
+        self.shutdown()
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def request_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+
+    def shutdown(self) -> None:
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or available_cores(),
+        help="worker processes (default WEB_CONCURRENCY, else one per available core)"
+    )
+    parser.add_argument("--threads", type=int, help="encoder threads per worker (default: cores / workers)")
+    parser.add_argument("--limit-concurrency", type=int, help="per-worker cap on concurrent connections")
+    parser.add_argument(
+        "--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        help="proxy addresses trusted for X-Forwarded-For (comma-separated, * for any); "
+        "admission control keys clients on the resulting address"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    threads = args.threads or max(1, available_cores() // args.workers)
+
+    config = uvicorn.Config(
+        main.app, host=args.host, port=args.port, limit_concurrency=args.limit_concurrency, log_level=args.log_level,
+        proxy_headers=True, forwarded_allow_ips=args.forwarded_allow_ips
+    )
+    sock = config.bind_socket()
+    # Also used across a reload, when the retiring workers' explanations are looked up on new ones
+    shared_dir = tempfile.mkdtemp(prefix="shl-serve-")
+    main.share_request_state(shared_dir)
+    supervisor = Supervisor(config, sock, args.workers, threads)
+    # Forked before the model is loaded, so it stays small
+    supervisor.spawn(placeholder=True)
+
+    # GNU OpenMP (used by torch) cannot run parallel regions in a child forked after
+    # the parent used its thread pool, so the parent encodes on a single thread
+    main.ENCODER_THREADS = 1
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    started = time.perf_counter()
+    try:
+        try:
+            main.warm_up(gemini=False)
+        except BaseException:
+            supervisor.stopping = True
+            supervisor.shutdown()
+            raise
+        print(f"Warmed up in {time.perf_counter() - started:.1f}s: {main.catalog_state.stats()}")
+        supervisor.run()
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Dict, Iterator, Optional
+
+# Stage durations (seconds) of the request being handled in this context, if anyone is recording
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, float]]:
+    """Collect the durations of every `stage()` entered inside this block.
+
+    The dict is shared with tasks created inside the block (they copy the
+    context), but not with executor threads, so time stages around the await
+    rather than inside the function that runs on the pool.
+    """
+    timings: Dict[str, float] = {}
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+class _Stage:
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str, timings: Dict[str, float]):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        # Repeated stages (e.g. one encode per batch chunk) accumulate
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.started
+
+
+_NOT_RECORDING = nullcontext()
+
+
+def stage(name: str) -> ContextManager[None]:
+    # A plain class rather than @contextmanager: this sits on the hot path of every request
+    timings = _current.get()
+    if timings is None:
+        return _NOT_RECORDING
+    return _Stage(name, timings)
@@ -0,0 +1,402 @@
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def top_k_rows(similarities: np.ndarray, k: int) -> np.ndarray:
+    # Row-wise top-k indices of a (queries x catalog) matrix, sorted by descending score
+    k = min(k, similarities.shape[1])
+    top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(similarities, top_indices, axis=1), axis=1)
+    return np.take_along_axis(top_indices, order, axis=1)
+
+
+class VectorIndex:
+    """Inner-product search over L2-normalized vectors.
+
+    `search` returns `(scores, ids)`, both shaped (queries x k) and sorted by
+    descending score. Rows that have fewer than k candidates (possible with
+    approximate backends) are padded with score `-inf` and id `-1`.
+    """
+
+    kind = "base"
+    # Parameters that only affect queries and can change without a rebuild
+    search_param_names = ()
+    # Whether building is expensive enough to be worth saving to disk
+    persistent = True
+    # What produced the indexed vectors (encoder model and backend), checked when loading
+    source: Optional[str] = None
+
+    def build(self, embeddings: np.ndarray) -> "VectorIndex":
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def params(self) -> dict:
+        return {}
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self._save_data(directory)
+        # Written last so a partially saved index is never loaded
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind, "params": self.params(), "ntotal": self.ntotal, "source": self.source}, f)
+
+    def _save_data(self, directory: str) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def _load_data(cls, directory: str, params: dict) -> "VectorIndex":
+        raise NotImplementedError
+
+    def set_search_params(self, **params) -> None:
+        for name, value in params.items():
+            if not hasattr(self, name):
+                raise ValueError(f"{self.kind} index has no parameter {name!r}")
+            setattr(self, name, value)
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact search with one matrix multiply. Holds a reference, not a copy, of the matrix."""
+
+    kind = "bruteforce"
+    persistent = False
+
+    def __init__(self):
+        self.embeddings = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.embeddings is None else self.embeddings.shape[0]
+
+    def build(self, embeddings: np.ndarray) -> "BruteForceIndex":
+        self.embeddings = embeddings
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        similarities = np.dot(queries, self.embeddings.T)
+        ids = top_k_rows(similarities, k)
+        return np.take_along_axis(similarities, ids, axis=1), ids
+
+    def _save_data(self, directory: str) -> None:
+        np.save(os.path.join(directory, "embeddings.npy"), np.asarray(self.embeddings))
+
+    @classmethod
+    def _load_data(cls, directory: str, params: dict) -> "BruteForceIndex":
+        return cls().build(np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r"))
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index in pure NumPy.
+
+    Vectors are clustered with spherical k-means into `n_lists` lists and
+    stored contiguously by list. A query scores the centroids, then only the
+    vectors in its `n_probe` best lists. Raising `n_probe` trades latency for
+    recall; `n_probe == n_lists` is exact.
+    """
+
+    kind = "ivf"
+    search_param_names = ("n_probe",)
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, n_iter: int = 15, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None
+        self.ids = None
+        self.offsets = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.ids is None else len(self.ids)
+
+    def params(self) -> dict:
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe, "n_iter": self.n_iter, "seed": self.seed}
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+        # Nearest centroid per row, in blocks to bound the (rows x lists) temporary
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block):
+            labels[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+        return labels
+
+    def build(self, embeddings: np.ndarray) -> "IVFIndex":
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n = len(embeddings)
+        if self.n_lists is None:
+            self.n_lists = int(max(1, min(4 * np.sqrt(n), 4096)))
+        self.n_lists = min(self.n_lists, n)
+        rng = np.random.default_rng(self.seed)
+
+        # Train on a sample; 256 points per list is plenty for k-means to settle
+        sample_size = min(n, 256 * self.n_lists)
+        sample = embeddings[rng.choice(n, sample_size, replace=False)] if sample_size < n else embeddings
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = self._assign(sample, centroids)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            empty = counts == 0
+            # Sum each list's members with one reduceat over the label-sorted sample
+            order = np.argsort(labels, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+            # Re-seed empty lists with random points so every list stays in use
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        labels = self._assign(embeddings, centroids)
+        order = np.argsort(labels, kind="stable")
+        self.centroids = centroids.astype(np.float32)
+        self.vectors = embeddings[order]
+        self.ids = order.astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=self.n_lists))]).astype(np.int64)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, self.ntotal)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        probes = top_k_rows(queries @ self.centroids.T, min(self.n_probe, self.n_lists))
+        for row, lists in enumerate(probes):
+            candidates = np.concatenate([
+                np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists
+            ])
+            if not len(candidates):
+                continue
+            candidate_scores = self.vectors[candidates] @ queries[row]
+            top = top_k_rows(candidate_scores[np.newaxis], k)[0]
+            scores[row, :len(top)] = candidate_scores[top]
+            ids[row, :len(top)] = self.ids[candidates[top]]
+        return scores, ids
+
+    def _save_data(self, directory: str) -> None:
+        np.savez(
+            os.path.join(directory, "ivf.npz"),
+            centroids=self.centroids, vectors=self.vectors, ids=self.ids, offsets=self.offsets
+        )
+
+    @classmethod
+    def _load_data(cls, directory: str, params: dict) -> "IVFIndex":
+        index = cls(**params)
+        with np.load(os.path.join(directory, "ivf.npz")) as data:
+            index.centroids = data["centroids"]
+            index.vectors = data["vectors"]
+            index.ids = data["ids"]
+            index.offsets = data["offsets"]
+        return index
+
+
+class HNSWIndex(VectorIndex):
+    """Graph index backed by the optional `hnswlib` package.
+
+    `ef_search` is the recall/latency knob at query time; `m` and
+    `ef_construction` control graph quality at build time.
+    """
+
+    kind = "hnsw"
+    search_param_names = ("ef_search",)
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        import hnswlib  # noqa: F401  (fail early if the optional dependency is missing)
+
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.graph = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.graph is None else self.graph.get_current_count()
+
+    def params(self) -> dict:
+        return {"m": self.m, "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+
+    def build(self, embeddings: np.ndarray) -> "HNSWIndex":
+        import hnswlib
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.graph = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+        self.graph.init_index(max_elements=len(embeddings), ef_construction=self.ef_construction, M=self.m)
+        self.graph.add_items(embeddings, np.arange(len(embeddings)))
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.ntotal)
+        self.graph.set_ef(max(self.ef_search, k))
+        labels, distances = self.graph.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+        # hnswlib's "ip" distance is 1 - inner product
+        return (1.0 - distances).astype(np.float32), labels.astype(np.int64)
+
+    def _save_data(self, directory: str) -> None:
+        self.graph.save_index(os.path.join(directory, "hnsw.bin"))
+        with open(os.path.join(directory, "dim"), "w") as f:
+            f.write(str(self.graph.dim))
+
+    @classmethod
+    def _load_data(cls, directory: str, params: dict) -> "HNSWIndex":
+        import hnswlib
+
+        with open(os.path.join(directory, "dim"), "r") as f:
+            dim = int(f.read())
+        index = cls(**params)
+        index.graph = hnswlib.Index(space="ip", dim=dim)
+        index.graph.load_index(os.path.join(directory, "hnsw.bin"))
+        return index
+
+
+class QuantizedIndex(VectorIndex):
+    """Exact-scan index over a reduced-precision copy of the matrix.
+
+    `precision="int8"` stores one byte per value with a per-dimension scale
+    (4x smaller than float32); `"float16"` halves it. Scans run in row blocks
+    so the float32 temporaries stay small. The top `k * rescore` candidates
+    are then rescored against the full-precision matrix, which is only read
+    for those rows (with a memory-mapped matrix, only their pages are
+    touched). `rescore=0` returns the approximate scores as-is.
+    """
+
+    kind = "quantized"
+    search_param_names = ("rescore",)
+    persistent = False
+
+    def __init__(self, precision: str = "int8", rescore: int = 4, block_rows: int = 16384):
+        if precision not in ("int8", "float16"):
+            raise ValueError(f"Unsupported precision {precision!r}; expected 'int8' or 'float16'")
+        self.precision = precision
+        self.rescore = rescore
+        self.block_rows = block_rows
+        self.codes = None
+        self.scale = None
+        self.full = None
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.codes is None else self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.codes is None else self.codes.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def params(self) -> dict:
+        return {"precision": self.precision, "rescore": self.rescore}
+
+    def build(self, embeddings: np.ndarray) -> "QuantizedIndex":
+        n, dim = embeddings.shape
+        self.full = embeddings
+        blocks = range(0, n, self.block_rows)
+        if self.precision == "float16":
+            self.codes = np.empty((n, dim), dtype=np.float16)
+            for start in blocks:
+                self.codes[start:start + self.block_rows] = embeddings[start:start + self.block_rows]
+            return self
+
+        # Symmetric per-dimension scale, computed block by block to avoid a full float32 copy
+        max_abs = np.zeros(dim, dtype=np.float32)
+        for start in blocks:
+            np.maximum(max_abs, np.abs(embeddings[start:start + self.block_rows]).max(axis=0), out=max_abs)
+        max_abs[max_abs == 0] = 1.0
+        self.scale = (max_abs / 127.0).astype(np.float32)
+        self.codes = np.empty((n, dim), dtype=np.int8)
+        for start in blocks:
+            block = np.asarray(embeddings[start:start + self.block_rows], dtype=np.float32) / self.scale
+            self.codes[start:start + self.block_rows] = np.clip(np.rint(block), -127, 127)
+        return self
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32)
+        # Folding the scale into the query keeps the scan a plain matrix multiply
+        scaled = queries if self.scale is None else queries * self.scale
+        scores = np.empty((len(queries), self.ntotal), dtype=np.float32)
+        for start in range(0, self.ntotal, self.block_rows):
+            block = self.codes[start:start + self.block_rows].astype(np.float32)
+            scores[:, start:start + self.block_rows] = scaled @ block.T
+        return scores
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32)
+        approximate = self.approximate_scores(queries)
+        if not self.rescore or self.full is None:
+            ids = top_k_rows(approximate, k)
+            return np.take_along_axis(approximate, ids, axis=1), ids
+
+        candidates = top_k_rows(approximate, min(self.ntotal, k * self.rescore))
+        candidate_vectors = np.asarray(self.full[candidates], dtype=np.float32)
+        exact = np.einsum("bd,bcd->bc", queries, candidate_vectors)
+        order = top_k_rows(exact, k)
+        return np.take_along_axis(exact, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+
+
+INDEX_TYPES = {cls.kind: cls for cls in (BruteForceIndex, IVFIndex, HNSWIndex, QuantizedIndex)}
+
+
+def create_index(kind: str, **params) -> VectorIndex:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index {kind!r}; expected one of {sorted(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](**params)
+
+
+def load_index(directory: str) -> VectorIndex:
+    with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    index = INDEX_TYPES[meta["kind"]]._load_data(directory, meta["params"])
+    index.source = meta.get("source")
+    return index
+
+
+def load_or_build_index(
+    kind: str,
+    embeddings: np.ndarray,
+    directory: Optional[str] = None,
+    source: Optional[str] = None,
+    **params
+) -> VectorIndex:
+    """Load a saved index from `directory` if it matches `kind` and `source`, otherwise build (and save) one.
+
+    Callers should make `directory` unique to the embedding matrix, e.g. by
+    including the embedding store fingerprint in its name. That fingerprint
+    covers the texts only, so `source` names what encoded them (model and
+    backend): an index saved from another source is rebuilt, never reused.
+    """
+    index = create_index(kind, **params)
+    index.source = source
+    if not index.persistent or directory is None:
+        return index.build(embeddings)
+
+    try:
+        loaded = load_index(directory)
+        build_params = {
+            name: value for name, value in params.items()
+            if name not in index.search_param_names and value is not None
+        }
+        saved_params = loaded.params()
+        if (
+            loaded.kind == kind
+            and loaded.source == source
+            and loaded.ntotal == len(embeddings)
+            and all(saved_params.get(name) == value for name, value in build_params.items())
+        ):
+            # Query-time knobs may differ from the saved ones without a rebuild
+            loaded.set_search_params(**{
+                name: value for name, value in params.items() if name in index.search_param_names
+            })
+            return loaded
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index.build(embeddings)
+    try:
+        index.save(directory)
+    except OSError:
+        pass
+    return index
@@ -0,0 +1,129 @@
+"""Interactive latency under saturating batch load, with and without admission control.
+
+Simulates a service with `--slots` concurrent workers: `--batch-clients`
+closed-loop clients submit slow batch chunks back to back, while interactive
+requests arrive at `--interactive-rate` per second (Poisson) from
+`--interactive-clients` clients, one of which sends half of them. Work is a
+sleep of the given service time, so the numbers isolate queueing behaviour
+from the encoder. Compares a plain FIFO semaphore (everything waits in one
+line) with AdmissionController, and reports interactive latency percentiles,
+requests turned away, and batch throughput.
+Does not need the encoder or the catalog.
+
+    python benchmarks/bench_admission.py --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from admission import AdmissionController, AdmissionError, Caller  # noqa: E402
+
+
+class FifoGate:
+    # The baseline: a semaphore, one unbounded line for everyone
+    def __init__(self, slots: int):
+        self.semaphore = asyncio.Semaphore(slots)
+
+    @asynccontextmanager
+    async def admit(self, caller: Caller):
+        async with self.semaphore:
+            yield None
+
+
+async def run(gate, args) -> dict:
+    rng = random.Random(args.seed)
+    latencies, outcomes = [], {"ok": 0, "rejected": 0, "expired": 0}
+    batch_chunks = 0
+    stop = time.monotonic() + args.duration
+
+    async def interactive(client: str):
+        started = time.monotonic()
+        try:
+            async with gate.admit(Caller(client, "interactive", started + args.deadline)):
+                await asyncio.sleep(args.interactive_ms / 1000.0)
+        except AdmissionError as e:
+            outcomes["expired" if e.status_code == 504 else "rejected"] += 1
+            return
+        elapsed = time.monotonic() - started
+        if elapsed > args.deadline:
+            # Without deadlines the work still ran; the caller had given up long ago
+            outcomes["expired"] += 1
+        else:
+            outcomes["ok"] += 1
+        latencies.append(elapsed)
+
+    async def batch_client(client: str):
+        nonlocal batch_chunks
+        while time.monotonic() < stop:
+            try:
+                async with gate.admit(Caller(client, "batch")):
+                    await asyncio.sleep(args.batch_ms / 1000.0)
+                batch_chunks += 1
+            except AdmissionError as e:
+                await asyncio.sleep(e.retry_after or 1.0)
+
+    batches = [asyncio.ensure_future(batch_client(f"ats-{i}")) for i in range(args.batch_clients)]
+    requests = []
+    while time.monotonic() < stop:
+        await asyncio.sleep(rng.expovariate(args.interactive_rate))
+        # One noisy client sends half of the interactive traffic
+        client = "noisy" if rng.random() < 0.5 else f"user-{rng.randrange(args.interactive_clients)}"
+        requests.append(asyncio.ensure_future(interactive(client)))
+    await asyncio.gather(*requests)
+    await asyncio.gather(*batches)
+
+    latencies_ms = np.asarray(latencies) * 1000.0
+    p50, p99 = np.percentile(latencies_ms, [50, 99]) if latencies_ms.size else (0.0, 0.0)
+    return {
+        "interactive_p50_ms": float(p50),
+        "interactive_p99_ms": float(p99),
+        "interactive_ok": outcomes["ok"],
+        "interactive_rejected": outcomes["rejected"],
+        "interactive_past_deadline": outcomes["expired"],
+        "batch_chunks_per_s": batch_chunks / args.duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per configuration")
+    parser.add_argument("--slots", type=int, default=8, help="ADMISSION_MAX_ACTIVE")
+    parser.add_argument("--max-queue", type=int, default=64, help="ADMISSION_MAX_QUEUE")
+    parser.add_argument("--max-queue-per-client", type=int, default=16, help="ADMISSION_MAX_QUEUE_PER_CLIENT")
+    parser.add_argument("--batch-clients", type=int, default=16)
+    parser.add_argument("--batch-ms", type=float, default=250.0, help="service time of one batch chunk")
+    parser.add_argument("--interactive-rate", type=float, default=100.0, help="interactive requests per second")
+    parser.add_argument("--interactive-clients", type=int, default=20)
+    parser.add_argument("--interactive-ms", type=float, default=20.0, help="service time of one interactive request")
+    parser.add_argument("--deadline", type=float, default=2.0, help="seconds an interactive caller waits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "fifo": asyncio.run(run(FifoGate(args.slots), args)),
+        "admission": asyncio.run(run(AdmissionController(
+            max_active=args.slots, max_queue=args.max_queue, max_queue_per_client=args.max_queue_per_client
+        ), args)),
+    }
+    fields = list(results["fifo"])
+    print(f"{'':28}" + "".join(f"{name:>12}" for name in results))
+    for field in fields:
+        print(f"{field:28}" + "".join(f"{results[name][field]:12.1f}" for name in results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
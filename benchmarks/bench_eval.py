@@ -0,0 +1,155 @@
+"""Offline evaluation: retrieval quality and per-stage latency of get_recommendations.
+
+Runs every labeled query of a JSONL file ({"query": ..., "relevant": [names]})
+through the synchronous pipeline with Gemini replaced by the local fake, and
+reports Mean Recall@K and MAP@K plus throughput and p50/p90/p99 latency of
+each stage (encode, similarity, top_k, rerank, llm) and of the whole call. Results
+can be written as JSON and compared with an earlier run. Requires the
+sentence-transformers model.
+
+    python benchmarks/bench_eval.py --ks 3,5,10 --runs 3 --json results.json
+    python benchmarks/bench_eval.py --compare results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUERIES = os.path.join(BENCH_DIR, "data", "eval_queries.jsonl")
+STAGES = ("encode", "similarity", "top_k", "rerank", "llm", "total")
+
+
+def recall_at_k(ranked: list, relevant: set, k: int) -> float:
+    return len(set(ranked[:k]) & relevant) / len(relevant)
+
+
+def average_precision_at_k(ranked: list, relevant: set, k: int) -> float:
+    hits, precision_sum = 0, 0.0
+    for position, name in enumerate(ranked[:k], 1):
+        if name in relevant:
+            hits += 1
+            precision_sum += hits / position
+    return precision_sum / min(len(relevant), k)
+
+
+def percentiles(values: list) -> dict:
+    values = np.array(values) * 1000.0
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p90": round(float(np.percentile(values, 90)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def evaluate(main, record_stages, labeled: list, ks: list, runs: int, max_results: int) -> dict:
+    stage_samples = {name: [] for name in STAGES}
+    per_query = []
+    started = time.perf_counter()
+    for run in range(runs):
+        for item in labeled:
+            with record_stages() as timings:
+                call_started = time.perf_counter()
+                response = main.get_recommendations(item["query"], max_results=max_results)
+                timings["total"] = time.perf_counter() - call_started
+            for name in STAGES:
+                stage_samples[name].append(timings.get(name, 0.0))
+            if run == 0:
+                ranked = [rec.name for rec in response.recommendations]
+                relevant = set(item["relevant"])
+                per_query.append({
+                    "query": item["query"],
+                    "ranked": ranked,
+                    **{f"recall@{k}": recall_at_k(ranked, relevant, k) for k in ks},
+                    **{f"ap@{k}": average_precision_at_k(ranked, relevant, k) for k in ks},
+                })
+    elapsed = time.perf_counter() - started
+
+    quality = {}
+    for k in ks:
+        quality[f"mean_recall@{k}"] = round(float(np.mean([q[f"recall@{k}"] for q in per_query])), 4)
+        quality[f"map@{k}"] = round(float(np.mean([q[f"ap@{k}"] for q in per_query])), 4)
+    return {
+        "quality": quality,
+        "throughput_qps": round(runs * len(labeled) / elapsed, 2),
+        "latency_ms": {name: percentiles(samples) for name, samples in stage_samples.items()},
+        "per_query": per_query,
+    }
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print("\nChange vs baseline:")
+    for metric, value in current["quality"].items():
+        before = baseline["quality"].get(metric)
+        if before is not None:
+            print(f"  {metric:18} {before:8.4f} -> {value:8.4f} ({value - before:+.4f})")
+    before, after = baseline["throughput_qps"], current["throughput_qps"]
+    print(f"  {'throughput_qps':18} {before:8.2f} -> {after:8.2f} ({100 * (after / before - 1):+.1f}%)")
+    for name in STAGES:
+        before = baseline["latency_ms"].get(name, {}).get("p99")
+        if before:
+            after = current["latency_ms"][name]["p99"]
+            print(f"  {name + ' p99 ms':18} {before:8.3f} -> {after:8.3f} ({100 * (after / before - 1):+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="labeled JSONL query set")
+    parser.add_argument("--ks", default="3,5,10", help="comma-separated cutoffs for Recall@K and MAP@K")
+    parser.add_argument("--runs", type=int, default=3, help="passes over the query set for latency")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake Gemini takes per call")
+    parser.add_argument("--field-weights", help="rank with per-field embeddings, e.g. text=0.5,name=0.3,description=0.2")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    ks = [int(k) for k in args.ks.split(",")]
+
+    # Must be set before the app module reads its configuration
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    if args.field_weights:
+        os.environ["FIELD_EMBEDDINGS"] = "true"
+        os.environ["FIELD_WEIGHTS"] = args.field_weights
+    sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+    import main as app_main
+    from timing import record_stages
+
+    started = time.perf_counter()
+    app_main.warm_up()
+    warm_up_seconds = time.perf_counter() - started
+
+    with open(args.queries, encoding="utf-8") as f:
+        labeled = [json.loads(line) for line in f if line.strip()]
+    results = evaluate(app_main, record_stages, labeled, ks, args.runs, max(ks))
+    results["config"] = dict(
+        vars(args),
+        encoder_model=app_main.ENCODER_MODEL,
+        encoder_backend=app_main.ENCODER_BACKEND,
+        vector_index=app_main.VECTOR_INDEX,
+        hybrid_retrieval=app_main.HYBRID_RETRIEVAL,
+        catalog_version=app_main.catalog_state.version,
+        queries_evaluated=len(labeled),
+        warm_up_seconds=round(warm_up_seconds, 2),
+    )
+
+    for metric, value in results["quality"].items():
+        print(f"{metric:16} {value:.4f}")
+    print(f"{'throughput':16} {results['throughput_qps']:.2f} queries/s")
+    print(f"\n{'stage':12} {'mean ms':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for name, stats in results["latency_ms"].items():
+        print(f"{name:12} {stats['mean']:9.3f} {stats['p50']:9.3f} {stats['p90']:9.3f} {stats['p99']:9.3f}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
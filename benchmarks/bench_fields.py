@@ -0,0 +1,123 @@
+"""Cost of multi-vector (per-field) scoring against single-vector scoring by catalog size.
+
+Builds synthetic (assessments x fields x dim) catalogs and times, per batch of
+queries and each followed by the same top-k selection: the single-vector
+cosine scan of the exact path, FieldEmbeddings scoring with weights it has
+already folded (the steady state for FIELD_WEIGHTS and repeated request
+weights), and the first request with new weights, which also pays for the
+fold. Reports per-query latency and the overhead over single-vector, the
+one-off fold time, and checks the folded scores against scoring every field
+separately. Does not need the encoder or the catalog.
+
+    python benchmarks/bench_fields.py --sizes 1000,10000,100000 --batch 1 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_index import synthetic_catalog  # noqa: E402
+from multivector import EMBEDDED_FIELDS, FieldEmbeddings, weight_vector  # noqa: E402
+
+
+def synthetic_fields(n: int, dim: int, seed: int) -> np.ndarray:
+    # Each field a noisy copy of the assessment's text vector, so fields correlate as they do in practice
+    rng = np.random.default_rng(seed)
+    text = synthetic_catalog(n, dim, max(1, n // 50), seed)
+    stacked = text[:, np.newaxis, :] + 0.5 * rng.standard_normal((n, len(EMBEDDED_FIELDS), dim)).astype(np.float32)
+    stacked[:, 0] = text
+    stacked /= np.linalg.norm(stacked, axis=2, keepdims=True)
+    return stacked
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # argpartition then sort the k survivors, as select_rows does
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def per_query_us(fn, queries: int, repeats: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1e6 * (time.perf_counter() - started) / (repeats * queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension (all-MiniLM-L6-v2 is 384)")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8], help="queries scored per call")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--weights", default="text=0.4,name=0.3,description=0.2,test_type=0.1")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    weights = weight_vector(dict(
+        (name, float(value)) for name, value in (part.split("=") for part in args.weights.split(","))
+    ))
+    rng = np.random.default_rng(args.seed)
+    results = []
+    print(
+        f"{'docs':>8} {'batch':>6} {'single us':>10} {'folded us':>10} {'overhead':>9} "
+        f"{'new weights us':>15} {'fold ms':>8} {'MB':>7}"
+    )
+    for size in [int(s) for s in args.sizes.split(",")]:
+        stacked = synthetic_fields(size, args.dim, args.seed)
+        text = np.ascontiguousarray(stacked[:, 0])
+        fields = FieldEmbeddings(stacked)
+        # Folded scores must match the weighted sum of separately scored fields
+        probe = rng.standard_normal((4, args.dim)).astype(np.float32)
+        probe /= np.linalg.norm(probe, axis=1, keepdims=True)
+        per_field = sum(weight * (probe @ stacked[:, f].T) for f, weight in enumerate(weights))
+        assert np.allclose(fields.similarities(probe, weights), per_field, atol=1e-4)
+
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            FieldEmbeddings(stacked).folded(weights)
+        fold_ms = 1000 * (time.perf_counter() - started) / args.repeats
+
+        for batch in args.batch:
+            queries = rng.standard_normal((batch, args.dim)).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            single_us = per_query_us(lambda: top_k(np.dot(queries, text.T), args.k), batch, args.repeats)
+            folded_us = per_query_us(
+                lambda: top_k(fields.similarities(queries, weights), args.k), batch, args.repeats
+            )
+            # A fresh instance each call: the fold is paid by every batch, as for unseen weights
+            cold_us = per_query_us(
+                lambda: top_k(FieldEmbeddings(stacked).similarities(queries, weights), args.k), batch, args.repeats
+            )
+            result = {
+                "docs": size,
+                "batch": batch,
+                "single_us": round(single_us, 1),
+                "folded_us": round(folded_us, 1),
+                "overhead": round(folded_us / single_us, 2),
+                "new_weights_us": round(cold_us, 1),
+                "fold_ms": round(fold_ms, 2),
+                "fields_mb": round(stacked.nbytes / 2 ** 20, 1),
+            }
+            results.append(result)
+            print(
+                f"{size:8d} {batch:6d} {single_us:10.1f} {folded_us:10.1f} {result['overhead']:8.2f}x "
+                f"{cold_us:15.1f} {fold_ms:8.2f} {result['fields_mb']:7.1f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
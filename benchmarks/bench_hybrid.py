@@ -0,0 +1,118 @@
+"""Cost of the hybrid (BM25 + reciprocal rank fusion) stage by catalog size.
+
+Synthetic catalogs are built by recombining words of the real catalog
+entries; dense candidates come from exact search over synthetic embeddings.
+Reports BM25 build time and index size, and per-query latency of BM25
+scoring and of the fusion itself, next to the dense search they are added to.
+
+    python benchmarks/bench_hybrid.py --sizes 62,10000,100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_index import synthetic_catalog  # noqa: E402
+from catalog import load_catalog  # noqa: E402
+from lexical import BM25Index, reciprocal_rank_fusion  # noqa: E402
+from vector_index import BruteForceIndex  # noqa: E402
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data", "assessments.jsonl")
+
+QUERIES = [
+    "COBOL",
+    ".NET WPF",
+    "ADO.NET developer",
+    "Java developer with SQL and collaboration skills",
+    "customer service representative for a call center",
+    "numerical reasoning for a financial analyst",
+    "bank operations supervisor",
+    "entry level cashier",
+]
+
+
+def synthetic_documents(texts, n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    words = [text.split() for text in texts]
+    documents = list(texts[:n])
+    while len(documents) < n:
+        a, b = rng.integers(0, len(words), 2)
+        cut = int(rng.integers(1, len(words[a]) + 1))
+        documents.append(" ".join(words[a][:cut] + words[b][cut:]))
+    return documents
+
+
+def per_query_ms(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1000 * (time.perf_counter() - started) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG)
+    parser.add_argument("--sizes", default="62,10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    texts = load_catalog(args.catalog).embedding_texts()
+    rng = np.random.default_rng(args.seed)
+    results = []
+    print(f"{'docs':>8} {'build s':>8} {'index MB':>9} {'dense ms':>9} {'bm25 ms':>8} {'fusion ms':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        documents = synthetic_documents(texts, size, args.seed)
+        started = time.perf_counter()
+        lexical = BM25Index(documents)
+        build_seconds = time.perf_counter() - started
+
+        index = BruteForceIndex().build(synthetic_catalog(size, args.dim, max(1, size // 50), args.seed))
+        query_vectors = rng.standard_normal((len(QUERIES), args.dim)).astype(np.float32)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+        dense_ms, bm25_ms, fusion_ms = [], [], []
+        for text, vector in zip(QUERIES, query_vectors):
+            vector = vector[np.newaxis]
+            dense_ms.append(per_query_ms(lambda: index.search(vector, args.candidates), args.repeats))
+            bm25_ms.append(per_query_ms(lambda: lexical.score_batch([text]), args.repeats))
+            dense_scores, dense_ids = index.search(vector, args.candidates)
+            lexical_scores = lexical.score_batch([text])
+            fusion_ms.append(per_query_ms(
+                lambda: reciprocal_rank_fusion(
+                    dense_scores, dense_ids, lexical_scores, None, size, args.k, lexical_candidates=args.candidates
+                ),
+                args.repeats
+            ))
+
+        result = {
+            "docs": size,
+            "build_seconds": round(build_seconds, 3),
+            "index_mb": round(lexical.nbytes / 2 ** 20, 2),
+            "dense_ms": round(float(np.mean(dense_ms)), 3),
+            "bm25_ms": round(float(np.mean(bm25_ms)), 3),
+            "fusion_ms": round(float(np.mean(fusion_ms)), 3),
+        }
+        results.append(result)
+        print(
+            f"{size:8d} {result['build_seconds']:8.3f} {result['index_mb']:9.2f} {result['dense_ms']:9.3f} "
+            f"{result['bm25_ms']:8.3f} {result['fusion_ms']:10.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
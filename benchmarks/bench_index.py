@@ -0,0 +1,111 @@
+"""Recall and latency of the approximate vector indexes against exact search.
+
+Uses a synthetic clustered catalog so it runs without the sentence-transformers
+model. Example:
+
+    python benchmarks/bench_index.py --n 200000 --dim 384 --n-probe 4 8 16 32
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from vector_index import BruteForceIndex, create_index  # noqa: E402
+
+
+def synthetic_catalog(n: int, dim: int, n_clusters: int, seed: int):
+    # Clustered unit vectors, which is closer to real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n)
+    data = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx_ids, exact_ids))
+    return hits / exact_ids.size
+
+
+def measure(index, queries: np.ndarray, k: int) -> dict:
+    latencies = []
+    ids = []
+    for query in queries:
+        started = time.perf_counter()
+        _, row_ids = index.search(query[np.newaxis], k)
+        latencies.append(time.perf_counter() - started)
+        ids.append(row_ids[0])
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "ids": np.asarray(ids),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "qps": float(len(queries) / latencies_ms.sum() * 1000.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000, help="catalog size")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension (all-MiniLM-L6-v2 is 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None, help="IVF lists (default 4*sqrt(n))")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    data = synthetic_catalog(args.n + args.queries, args.dim, n_clusters=max(8, args.n // 500), seed=args.seed)
+    catalog, queries = data[:args.n], data[args.n:]
+
+    exact = BruteForceIndex().build(catalog)
+    baseline = measure(exact, queries, args.k)
+    results = [{"index": "bruteforce", "build_s": 0.0, "recall": 1.0, **{k: v for k, v in baseline.items() if k != "ids"}}]
+
+    started = time.perf_counter()
+    ivf = create_index("ivf", n_lists=args.n_lists).build(catalog)
+    build_s = time.perf_counter() - started
+    for n_probe in args.n_probe:
+        ivf.set_search_params(n_probe=n_probe)
+        run = measure(ivf, queries, args.k)
+        results.append({
+            "index": f"ivf(n_lists={ivf.n_lists}, n_probe={n_probe})", "build_s": build_s,
+            "recall": recall_at_k(run.pop("ids"), baseline["ids"]), **run
+        })
+
+    try:
+        started = time.perf_counter()
+        hnsw = create_index("hnsw").build(catalog)
+        build_s = time.perf_counter() - started
+        for ef_search in args.ef_search:
+            hnsw.set_search_params(ef_search=ef_search)
+            run = measure(hnsw, queries, args.k)
+            results.append({
+                "index": f"hnsw(ef_search={ef_search})", "build_s": build_s,
+                "recall": recall_at_k(run.pop("ids"), baseline["ids"]), **run
+            })
+    except ImportError:
+        print("hnswlib not installed; skipping HNSW")
+
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'index':<36} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'qps':>9}")
+    for row in results:
+        print(
+            f"{row['index']:<36} {row['build_s']:>8.2f} {row['recall']:>9.3f} "
+            f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['qps']:>9.0f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
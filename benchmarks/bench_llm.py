@@ -0,0 +1,131 @@
+"""Explanation latency and fallback rate under Gemini slowdowns and outages.
+
+Drives the LLM client against the local fake Gemini (no API key or network)
+through a few scenarios, and compares it with calling the model directly
+with no deadline, cap or retries, as the service used to. Each request
+counts as done when it has text: Gemini's, or the template fallback.
+
+    python benchmarks/bench_llm.py --requests 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from llm import CircuitBreaker, FakeGeminiModel, LLMClient, LLMError  # noqa: E402
+
+# name -> (latency seconds, failure rate)
+SCENARIOS = {
+    "healthy": (0.3, 0.0),
+    "flaky": (0.3, 0.3),
+    "slow": (8.0, 0.0),
+    "outage": (0.3, 1.0),
+}
+
+
+async def run_requests(explain, requests: int, concurrency: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+    latencies, fallbacks = [], 0
+
+    async def one(i: int):
+        nonlocal fallbacks
+        async with gate:
+            started = time.perf_counter()
+            if not await explain(f"prompt {i}"):
+                fallbacks += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies = np.array(latencies) * 1000.0
+    return {
+        "seconds": round(elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+        "max_ms": round(float(latencies.max()), 1),
+        "fallback_rate": round(fallbacks / requests, 3),
+    }
+
+
+async def scenario(name: str, args) -> list:
+    latency, failure_rate = SCENARIOS[name]
+    results = []
+
+    model = FakeGeminiModel(latency=latency, failure_rate=failure_rate, seed=args.seed)
+
+    async def direct(prompt: str) -> bool:
+        try:
+            await model.generate_content_async(prompt)
+            return True
+        except Exception:
+            return False
+
+    result = await run_requests(direct, args.requests, args.concurrency)
+    results.append(dict(result, scenario=name, client="direct", gemini_calls=model.calls))
+
+    model = FakeGeminiModel(latency=latency, failure_rate=failure_rate, seed=args.seed)
+    client = LLMClient(
+        lambda: model,
+        max_concurrency=args.max_concurrency,
+        timeout=args.timeout,
+        attempt_timeout=args.attempt_timeout,
+        max_retries=args.retries,
+        breaker=CircuitBreaker(args.breaker_failures, args.breaker_reset),
+    )
+
+    async def resilient(prompt: str) -> bool:
+        try:
+            await client.generate(prompt)
+            return True
+        except LLMError:
+            return False
+
+    result = await run_requests(resilient, args.requests, args.concurrency)
+    stats = client.stats()
+    results.append(dict(
+        result, scenario=name, client="resilient", gemini_calls=model.calls,
+        retries=stats["retries"], rejected_open_circuit=stats["rejected_open_circuit"],
+        times_opened=stats["circuit_breaker"]["times_opened"]
+    ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent requests")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="client cap on in-flight Gemini calls")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--attempt-timeout", type=float, default=5.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--breaker-failures", type=int, default=5)
+    parser.add_argument("--breaker-reset", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scenario':9} {'client':10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'fallback':>9} {'calls':>6} {'seconds':>8}")
+    for name in args.scenarios.split(","):
+        for result in asyncio.run(scenario(name.strip(), args)):
+            results.append(result)
+            print(
+                f"{result['scenario']:9} {result['client']:10} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} "
+                f"{result['max_ms']:9.1f} {result['fallback_rate']:9.3f} {result['gemini_calls']:6d} {result['seconds']:8.2f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Latency and recall of chunked vs single-pass encoding on long job descriptions.
+
+Builds synthetic long job descriptions by burying the descriptions of a few
+target assessments in company boilerplate, then checks how many targets each
+strategy ranks in the top k. Requires the sentence-transformers model.
+
+    python benchmarks/bench_long_text.py --docs 50 --filler-words 600
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from catalog import load_catalog  # noqa: E402
+from chunking import pool_scores, split_documents  # noqa: E402
+from embedding_store import normalize_rows  # noqa: E402
+from vector_index import top_k_rows  # noqa: E402
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "data", "assessments.jsonl")
+
+BOILERPLATE = [
+    "Our company was founded over twenty years ago and has grown into a global organisation.",
+    "We value diversity, inclusion and a healthy work-life balance for every member of the team.",
+    "Benefits include a competitive salary, pension contributions, private healthcare and gym membership.",
+    "The office is located in the city centre with excellent public transport links.",
+    "We offer flexible working arrangements including hybrid and fully remote options.",
+    "Applicants must have the right to work in the country where the role is based.",
+    "Please submit your CV and a short cover letter through our careers portal.",
+    "We are an equal opportunities employer and welcome applications from all backgrounds.",
+    "The successful candidate will join a friendly and collaborative team.",
+    "Annual leave starts at twenty-five days plus public holidays.",
+]
+
+
+def make_documents(catalog, n_docs: int, targets_per_doc: int, filler_words: int, seed: int):
+    rng = np.random.default_rng(seed)
+    documents, labels = [], []
+    for _ in range(n_docs):
+        targets = rng.choice(catalog.size, targets_per_doc, replace=False)
+        sections = []
+        for target in targets:
+            filler = []
+            while sum(len(s.split()) for s in filler) < filler_words // targets_per_doc:
+                filler.append(BOILERPLATE[rng.integers(len(BOILERPLATE))])
+            sections.append(" ".join(filler))
+            sections.append(f"{catalog.columns['name'][target]}: {catalog.columns['description'][target]}.")
+        documents.append(" ".join(sections))
+        labels.append(set(int(t) for t in targets))
+    return documents, labels
+
+
+def evaluate(encode, catalog_embeddings, documents, labels, k, windows_args=None, pooling="max"):
+    latencies, hits = [], 0
+    for document, targets in zip(documents, labels):
+        started = time.perf_counter()
+        if windows_args is None:
+            similarities = normalize_rows(encode([document])) @ catalog_embeddings.T
+        else:
+            windows, offsets = split_documents([document], *windows_args)
+            similarities = pool_scores(normalize_rows(encode(windows)) @ catalog_embeddings.T, offsets, pooling)
+        top = top_k_rows(similarities, k)[0]
+        latencies.append(time.perf_counter() - started)
+        hits += len(targets & set(int(i) for i in top))
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "recall": hits / sum(len(t) for t in labels),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG)
+    parser.add_argument("--model", default=os.getenv("ENCODER_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--targets", type=int, default=3, help="target assessments buried in each document")
+    parser.add_argument("--filler-words", type=int, default=600)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--window-words", type=int, default=128)
+    parser.add_argument("--overlap-words", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    encoder = SentenceTransformer(args.model, device="cpu")
+
+    def encode(texts):
+        return encoder.encode(texts, convert_to_numpy=True)
+
+    catalog = load_catalog(args.catalog)
+    catalog_embeddings = normalize_rows(encode(catalog.embedding_texts()))
+    documents, labels = make_documents(catalog, args.docs, args.targets, args.filler_words, args.seed)
+    encode(["warm up"])
+
+    windows_args = (args.window_words, args.overlap_words, 64)
+    results = {
+        "single-pass": evaluate(encode, catalog_embeddings, documents, labels, args.k),
+        "chunked (max)": evaluate(encode, catalog_embeddings, documents, labels, args.k, windows_args, "max"),
+        "chunked (mean)": evaluate(encode, catalog_embeddings, documents, labels, args.k, windows_args, "mean"),
+    }
+
+    mean_words = np.mean([len(d.split()) for d in documents])
+    print(f"docs={args.docs} mean words={mean_words:.0f} targets/doc={args.targets} k={args.k}")
+    print(f"{'strategy':<16} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, row in results.items():
+        print(f"{name:<16} {row['recall']:>9.3f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
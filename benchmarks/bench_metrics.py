@@ -0,0 +1,118 @@
+"""Overhead of the latency instrumentation: stage timers, histograms and the metrics middleware.
+
+Times a `stage()` block with and without an active recorder, a histogram
+observation, rendering /metrics, and whole requests through a small FastAPI
+app whose endpoint enters as many stages as the recommendation pipeline,
+with and without MetricsMiddleware (ASGI calls, no server or network). Request
+times are the best of `--rounds` rounds.
+Does not need the encoder or the catalog.
+
+    python benchmarks/bench_metrics.py --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from metrics import MetricsMiddleware, MetricsRegistry  # noqa: E402
+from timing import record_stages, stage  # noqa: E402
+
+STAGES = ("encode", "similarity", "top_k", "llm")
+
+
+def per_call_us(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1e6 * (time.perf_counter() - started) / repeats
+
+
+def enter_stage():
+    with stage("encode"):
+        pass
+
+
+def build_app(instrumented: bool):
+    app = FastAPI()
+
+    @app.get("/api/recommend")
+    async def recommend():
+        for name in STAGES:
+            with stage(name):
+                pass
+        return {"recommendations": [], "explanation": ""}
+
+    registry = MetricsRegistry(prefix="shl_")
+    if instrumented:
+        app.add_middleware(
+            MetricsMiddleware,
+            request_seconds=registry.histogram("request_duration_seconds", "", ["endpoint", "status"]),
+            stage_seconds=registry.histogram("stage_duration_seconds", "", ["stage"])
+        )
+    return app, registry
+
+
+SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+    "path": "/api/recommend", "raw_path": b"/api/recommend", "root_path": "", "query_string": b"",
+    "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+}
+
+
+async def request_us(app, requests: int, rounds: int) -> float:
+    # Calls the ASGI app directly; an HTTP client would add more noise than the middleware costs
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await app(dict(SCOPE), receive, send)
+        best = min(best, 1e6 * (time.perf_counter() - started) / requests)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=200000, help="iterations of each micro-benchmark")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    results["stage_off_us"] = per_call_us(enter_stage, args.repeats)
+    with record_stages():
+        results["stage_recording_us"] = per_call_us(enter_stage, args.repeats)
+
+    registry = MetricsRegistry(prefix="shl_")
+    histogram = registry.histogram("stage_duration_seconds", "", ["stage"])
+    results["histogram_observe_us"] = per_call_us(lambda: histogram.observe(0.0123, "encode"), args.repeats)
+    results["render_us"] = per_call_us(registry.render, 1000)
+
+    plain, _ = build_app(instrumented=False)
+    instrumented, _ = build_app(instrumented=True)
+    results["request_plain_us"] = asyncio.run(request_us(plain, args.requests, args.rounds))
+    results["request_instrumented_us"] = asyncio.run(request_us(instrumented, args.requests, args.rounds))
+    results["middleware_overhead_us"] = results["request_instrumented_us"] - results["request_plain_us"]
+
+    for name, value in results.items():
+        print(f"{name:26} {value:9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Accuracy vs latency vs memory of reduced-precision catalog storage and query encoders.
+
+Part 1 scans a synthetic catalog stored as float32, float16 and int8 (with and
+without full-precision rescoring) and reports recall@k against float32.
+Part 2, when sentence-transformers is installed, encodes sample queries with
+each available encoder backend and reports latency, cosine agreement with the
+float32 model, and top-k overlap on the real catalog.
+
+    python benchmarks/bench_precision.py --n 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_index import measure, recall_at_k, synthetic_catalog  # noqa: E402
+from catalog import load_catalog  # noqa: E402
+from embedding_store import normalize_rows  # noqa: E402
+from encoders import ENCODER_BACKENDS, load_encoder  # noqa: E402
+from vector_index import BruteForceIndex, top_k_rows  # noqa: E402
+from vector_index import create_index  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "Java developer with Spring experience",
+    "Sales manager for a regional team",
+    "Customer service representative for a call centre",
+    "Graduate trainee with strong numerical reasoning",
+    "Senior .NET engineer, WPF and ADO.NET",
+    "Bank cashier handling cash and customer queries",
+    "Data analyst with SQL and Excel skills",
+    "Team leader in a contact centre",
+    "Entry level administrative assistant",
+    "Cyber security analyst",
+]
+
+
+def storage_report(args) -> list:
+    data = synthetic_catalog(args.n + args.queries, args.dim, n_clusters=max(8, args.n // 500), seed=args.seed)
+    catalog, queries = data[:args.n], data[args.n:]
+    exact = BruteForceIndex().build(catalog)
+    baseline = measure(exact, queries, args.k)
+    rows = [{
+        "storage": "float32", "mb": catalog.nbytes / 2 ** 20, "recall": 1.0,
+        **{key: value for key, value in baseline.items() if key != "ids"}
+    }]
+    for precision in ("float16", "int8"):
+        for rescore in (0, 4):
+            index = create_index("quantized", precision=precision, rescore=rescore).build(catalog)
+            run = measure(index, queries, args.k)
+            rows.append({
+                "storage": f"{precision}" + (f" + rescore x{rescore}" if rescore else ""),
+                "mb": index.nbytes / 2 ** 20,
+                "recall": recall_at_k(run.pop("ids"), baseline["ids"]),
+                **run
+            })
+    print(f"\nCatalog storage: n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'storage':<24} {'MB':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        print(f"{row['storage']:<24} {row['mb']:>8.1f} {row['recall']:>9.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+    return rows
+
+
+def encoder_report(args) -> list:
+    catalog = load_catalog(args.catalog)
+    texts = catalog.embedding_texts()
+    reference = None
+    rows = []
+    for backend in args.backends:
+        try:
+            encoder = load_encoder(args.model, backend, args.cache_dir)
+        except ImportError as e:
+            print(f"Skipping encoder backend {backend}: {e}")
+            continue
+        catalog_embeddings = normalize_rows(encoder.encode(texts, convert_to_numpy=True))
+        encoder.encode(["warm up"], convert_to_numpy=True)
+        latencies = []
+        for query in SAMPLE_QUERIES * args.repeat:
+            started = time.perf_counter()
+            encoder.encode([query], convert_to_numpy=True)
+            latencies.append(time.perf_counter() - started)
+        query_embeddings = normalize_rows(encoder.encode(SAMPLE_QUERIES, convert_to_numpy=True))
+        top = top_k_rows(query_embeddings @ catalog_embeddings.T, args.k)
+        if reference is None:
+            reference = (query_embeddings, top)
+        latencies_ms = np.asarray(latencies) * 1000.0
+        rows.append({
+            "backend": backend,
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p99_ms": float(np.percentile(latencies_ms, 99)),
+            "cosine_vs_reference": float(np.mean(np.sum(query_embeddings * reference[0], axis=1))),
+            "topk_overlap_vs_reference": recall_at_k(top, reference[1]),
+        })
+    print(f"\nQuery encoder: model={args.model} k={args.k} (reference backend: {rows[0]['backend'] if rows else '-'})")
+    print(f"{'backend':<12} {'p50 ms':>8} {'p99 ms':>8} {'cosine':>8} {'top-k overlap':>14}")
+    for row in rows:
+        print(
+            f"{row['backend']:<12} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+            f"{row['cosine_vs_reference']:>8.4f} {row['topk_overlap_vs_reference']:>14.3f}"
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000, help="synthetic catalog size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog", default=os.path.join(BENCH_DIR, "..", "app", "data", "assessments.jsonl"))
+    parser.add_argument("--model", default=os.getenv("ENCODER_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS,
+                        help="the first backend is the reference")
+    parser.add_argument("--cache-dir", default=os.path.join(BENCH_DIR, "..", "app", ".embedding_cache"))
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-encoders", action="store_true")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {"storage": storage_report(args)}
+    if not args.skip_encoders:
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            print("\nsentence-transformers not installed; skipping the encoder comparison")
+        else:
+            results["encoders"] = encoder_report(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
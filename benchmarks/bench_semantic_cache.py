@@ -0,0 +1,111 @@
+"""Semantic query cache: lookup cost by cache size, and hit rate by similarity threshold.
+
+Lookup and insert latency are measured on random unit vectors and need no
+model. With `--paraphrases`, groups of paraphrased queries are embedded with
+the service's encoder. For each threshold the report shows how often a
+query would be answered from another member of its own group (a useful hit),
+and how often it would be answered from a different group (a wrong answer,
+e.g. Java vs JavaScript, or 30 vs 60 minutes).
+
+    python benchmarks/bench_semantic_cache.py --sizes 256,1024,4096,16384
+    python benchmarks/bench_semantic_cache.py --paraphrases --thresholds 0.85,0.9,0.92,0.95
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from cache import SemanticCache  # noqa: E402
+
+DEFAULT_PARAPHRASES = os.path.join(BENCH_DIR, "data", "paraphrases.jsonl")
+
+
+def unit_vectors(n: int, dim: int, rng) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def lookup_latency(size: int, dim: int, repeats: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    cache = SemanticCache(maxsize=size, threshold=0.92, ttl=3600)
+    entries = unit_vectors(size, dim, rng)
+    started = time.perf_counter()
+    for position, vector in enumerate(entries):
+        cache.set(vector, "10:", position)
+    set_us = 1e6 * (time.perf_counter() - started) / size
+    queries = unit_vectors(repeats, dim, rng)
+    started = time.perf_counter()
+    for vector in queries:
+        cache.get(vector, "10:")
+    get_us = 1e6 * (time.perf_counter() - started) / repeats
+    return {"size": size, "set_us": round(set_us, 2), "get_us": round(get_us, 2)}
+
+
+def threshold_sweep(path: str, thresholds: list) -> list:
+    from encoders import load_encoder
+
+    with open(path, encoding="utf-8") as f:
+        groups = [json.loads(line)["group"] for line in f if line.strip()]
+    texts = [text for group in groups for text in group]
+    labels = np.array([g for g, group in enumerate(groups) for _ in group])
+    model = load_encoder(os.getenv("ENCODER_MODEL", "all-MiniLM-L6-v2"), os.getenv("ENCODER_BACKEND", "torch"), APP_DIR)
+    embeddings = np.asarray(model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    similarities = embeddings @ embeddings.T
+    np.fill_diagonal(similarities, -np.inf)
+    nearest = similarities.argmax(axis=1)
+    best = similarities.max(axis=1)
+    results = []
+    for threshold in thresholds:
+        hit = best >= threshold
+        results.append({
+            "threshold": threshold,
+            "hit_rate": round(float(hit.mean()), 3),
+            "correct_hits": round(float((hit & (labels[nearest] == labels)).mean()), 3),
+            "wrong_hits": round(float((hit & (labels[nearest] != labels)).mean()), 3),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="256,1024,4096,16384")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--paraphrases", nargs="?", const=DEFAULT_PARAPHRASES, help="JSONL of {\"group\": [queries]}")
+    parser.add_argument("--thresholds", default="0.8,0.85,0.9,0.92,0.95")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {"latency": [], "thresholds": []}
+    print(f"{'entries':>8} {'set us':>8} {'get us':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        result = lookup_latency(size, args.dim, args.repeats, args.seed)
+        results["latency"].append(result)
+        print(f"{size:8d} {result['set_us']:8.2f} {result['get_us']:8.2f}")
+
+    if args.paraphrases:
+        results["thresholds"] = threshold_sweep(args.paraphrases, [float(t) for t in args.thresholds.split(",")])
+        print(f"\n{'threshold':>9} {'hit rate':>9} {'correct':>8} {'wrong':>7}")
+        for result in results["thresholds"]:
+            print(
+                f"{result['threshold']:9.2f} {result['hit_rate']:9.3f} "
+                f"{result['correct_hits']:8.3f} {result['wrong_hits']:7.3f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Cost of turning ranked catalog rows into a JSON response body.
+
+Times, per response of `--results` assessments with a Gemini-sized
+explanation, the ways the service has built its bodies:
+
+  rebuild    a new Assessment(**row) per hit, then FastAPI's response_model
+             validation and JSONResponse encoding (the original path)
+  validate   shared per-catalog Assessment models, still validated and
+             encoded by FastAPI on every response
+  fragments  the per-assessment JSON encoded at catalog load, joined into the
+             body (response_json), with each available JSON backend
+
+FastAPI's own serialize_response() is used, so the first two match what a
+route with response_model does. Every body is checked to decode to the same
+document. Does not need the encoder.
+
+    python benchmarks/bench_serialization.py --results 10 --repeats 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from fastapi.responses import JSONResponse, Response  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import main  # noqa: E402
+import serialization  # noqa: E402
+from catalog import load_catalog  # noqa: E402
+
+EXPLANATION = (
+    "These assessments cover the core technical skills in the job description, Java and SQL, "
+    "together with the collaboration and communication the role asks for. "
+) * 4
+
+
+def per_response_us(fn, repeats: int) -> float:
+    for _ in range(min(repeats, 1000)):
+        fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1e6 * (time.perf_counter() - started) / repeats
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", default=main.CATALOG_PATH)
+    parser.add_argument("--results", type=int, default=10, help="assessments per response")
+    parser.add_argument("--repeats", type=int, default=20000)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.catalog)
+    rows = [catalog.row(i) for i in range(catalog.size)]
+    # As CatalogState builds them: one model and one JSON fragment per catalog entry
+    assessments = [main.Assessment(**row) for row in rows]
+    state = SimpleNamespace()
+    hits = list(range(min(args.results, len(rows))))
+    field = create_response_field(name="Response_recommend", type_=main.RecommendationResponse)
+    loop = asyncio.new_event_loop()
+
+    def validated_body(response) -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+        return JSONResponse(content).body
+
+    def rebuild() -> bytes:
+        recommendations = [main.Assessment(**rows[i]) for i in hits]
+        return validated_body(main.RecommendationResponse(recommendations=recommendations, explanation=EXPLANATION))
+
+    def validate() -> bytes:
+        recommendations = [assessments[i] for i in hits]
+        return validated_body(main.RecommendationResponse(recommendations=recommendations, explanation=EXPLANATION))
+
+    def fragments() -> bytes:
+        recommendations = [assessments[i] for i in hits]
+        response = main.RecommendationResponse(recommendations=recommendations, explanation=EXPLANATION)
+        return Response(content=main.response_json(response, state=state), media_type="application/json").body
+
+    # (name, body builder, orjson module or None for the standard library)
+    cases = [("rebuild", rebuild, None), ("validate", validate, None), ("fragments (json)", fragments, None)]
+    if serialization.orjson is not None:
+        cases.append(("fragments (orjson)", fragments, serialization.orjson))
+    expected = json.loads(rebuild())
+    results = []
+    print(f"{'path':20} {'us/response':>12} {'responses/s':>12} {'speedup':>8} {'bytes':>7}")
+    for name, fn, backend in cases:
+        # Fragments are encoded with the backend under test, as at catalog load
+        serialization.orjson = backend
+        state.fragments = {id(assessment): serialization.dumps(assessment.model_dump()) for assessment in assessments}
+        body = fn()
+        assert json.loads(body) == expected, name
+        us = per_response_us(fn, args.repeats)
+        result = {"path": name, "us_per_response": round(us, 2), "bytes": len(body)}
+        results.append(result)
+        baseline = results[0]["us_per_response"]
+        print(f"{name:20} {us:12.2f} {1e6 / us:12.0f} {baseline / us:7.1f}x {len(body):7d}")
+    loop.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,110 @@
+"""Import time of the app module and time until the server answers / and /ready.
+
+Each run happens in a fresh interpreter so nothing is shared between runs.
+`--importtime` also prints the slowest modules imported by main using Python's
+`-X importtime` report, which shows what still sits on the import path.
+
+    python benchmarks/bench_startup.py --runs 5 --importtime
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def measure_import(runs: int) -> list:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def slowest_imports(limit: int) -> list:
+    # -X importtime writes "import time: self [us] | cumulative | name" lines to stderr
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=APP_DIR, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only modules imported directly by main; nested ones count toward their parent
+        if name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.02)
+    raise TimeoutError(f"{url} did not respond within {timeout}s")
+
+
+def measure_server(mode: str, timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode)
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health = wait_for(f"http://127.0.0.1:{port}/", started, timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", started, timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"mode": mode, "health_seconds": health, "ready_seconds": ready}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="lazy,eager", help="comma-separated STARTUP_MODE values to launch")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for a server to become ready")
+    parser.add_argument("--importtime", action="store_true", help="list the slowest modules imported by main")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    imports = measure_import(args.runs)
+    print(f"import main: median {statistics.median(imports):.3f}s  max {max(imports):.3f}s  ({args.runs} runs)")
+    if args.importtime:
+        for seconds, name in slowest_imports(15):
+            print(f"  {seconds:8.3f}s  {name}")
+
+    servers = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        result = measure_server(mode, args.timeout)
+        servers.append(result)
+        print(f"STARTUP_MODE={mode:5}  / after {result['health_seconds']:.3f}s  /ready after {result['ready_seconds']:.3f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "import_seconds": imports, "servers": servers}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Memory and throughput by worker count: pre-forked (serve.py) vs `uvicorn --workers`.
+
+For each worker count, starts the server, waits until it is ready, and
+records the resident (RSS) and proportional (PSS, shared pages split between
+the processes mapping them) memory of the whole process tree. It then runs a
+closed-loop load of unique queries with explain=none, so every request is
+encoded and scored, and records memory again, since copy-on-write pages get
+dirtied under load. Encoder threads are split evenly between workers in both
+modes. Requires the sentence-transformers model.
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --modes prefork,uvicorn --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+DEFAULT_CATALOG = os.path.join(APP_DIR, "data", "assessments.jsonl")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(root: int) -> list:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name can contain spaces; fields after it are fixed
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def tree_memory(root: int) -> dict:
+    # Sums /proc/<pid>/smaps_rollup (kB) over the server and its workers
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0, "processes": 0}
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        totals["rss_mb"] += int(fields["Rss"].split()[0]) / 1024
+        totals["pss_mb"] += int(fields["Pss"].split()[0]) / 1024
+        totals["processes"] += 1
+    return {key: round(value, 1) for key, value in totals.items()}
+
+
+def wait_ready(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    raise TimeoutError(f"server on port {port} not ready after {timeout}s")
+
+
+def wait_settled(root: int, timeout: float) -> None:
+    # With `uvicorn --workers` only one worker has to be ready to answer /ready;
+    # wait until the others have finished loading too
+    deadline = time.monotonic() + timeout
+    previous = tree_memory(root)["rss_mb"]
+    while time.monotonic() < deadline:
+        time.sleep(1.0)
+        current = tree_memory(root)["rss_mb"]
+        if abs(current - previous) <= 0.01 * previous:
+            return
+        previous = current
+
+
+async def load_test(port: int, queries: list, concurrency: int, duration: float) -> dict:
+    import aiohttp
+
+    latencies, errors = [], 0
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    async def client(session):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            # A unique suffix defeats the embedding and response caches
+            query = f"{random.choice(queries)} {next(counter)}"
+            started = time.perf_counter()
+            try:
+                async with session.get(
+                    f"http://127.0.0.1:{port}/api/recommend", params={"query": query, "explain": "none"}
+                ) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 1) if latencies else None,
+        "p99_ms": round(1000 * latencies[int(0.99 * (len(latencies) - 1))], 1) if latencies else None,
+    }
+
+
+def run(mode: str, workers: int, args, queries: list) -> dict:
+    port = free_port()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    env = dict(os.environ, STARTUP_MODE="eager", ENCODER_THREADS=str(threads), CATALOG_WATCH_INTERVAL="0")
+    if mode == "prefork":
+        command = [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers), "--threads", str(threads)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)]
+    server = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, args.timeout)
+        wait_settled(server.pid, args.timeout)
+        idle = tree_memory(server.pid)
+        throughput = asyncio.run(load_test(port, queries, args.concurrency, args.duration))
+        loaded = tree_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"mode": mode, "workers": workers, "threads": threads, "idle": idle, "loaded": loaded, **throughput}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="source of query text")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--modes", default="prefork,uvicorn", help="prefork and/or uvicorn")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per configuration")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for a server to start")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with open(args.catalog, encoding="utf-8") as f:
+        queries = [json.loads(line)["description"] for line in f if line.strip()]
+
+    results = []
+    print(f"{'mode':8} {'workers':>7} {'RSS MB':>8} {'PSS MB':>8} {'loaded PSS':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            result = run(mode, workers, args, queries)
+            results.append(result)
+            print(
+                f"{mode:8} {workers:7d} {result['idle']['rss_mb']:8.1f} {result['idle']['pss_mb']:8.1f} "
+                f"{result['loaded']['pss_mb']:10.1f} {result['rps']:8.1f} {result['p50_ms']:8} {result['p99_ms']:8}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
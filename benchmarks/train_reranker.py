@@ -0,0 +1,119 @@
+"""Fit the feature re-ranker's weights on labeled queries.
+
+Collects the first-stage candidates of every labeled query (same JSONL
+format as bench_eval.py), labels each candidate relevant or not, and fits a
+logistic regression over the re-ranker features. Part of the queries is held
+out, and MAP@K on them is reported for the first-stage order, the built-in
+default weights and the fitted weights, so weights are never judged on the
+queries they were fitted to. Requires the sentence-transformers model.
+
+    python benchmarks/train_reranker.py --out app/data/reranker.json
+    RERANKER=features RERANKER_WEIGHTS=app/data/reranker.json python benchmarks/bench_eval.py
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_eval import DEFAULT_QUERIES, average_precision_at_k  # noqa: E402
+
+
+def fit_logistic(features: np.ndarray, labels: np.ndarray, l2: float, epochs: int, learning_rate: float):
+    # Full-batch gradient descent; relevant pairs are up-weighted to balance the classes
+    weights = np.zeros(features.shape[1])
+    bias = 0.0
+    positive = max(1.0, labels.sum())
+    sample_weights = np.where(labels == 1, (len(labels) - positive) / positive, 1.0)
+    sample_weights /= sample_weights.sum()
+    for _ in range(epochs):
+        predictions = 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+        error = (predictions - labels) * sample_weights
+        weights -= learning_rate * (features.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum()
+    return weights, bias
+
+
+def mean_ap(examples: list, weights, bias: float, k: int) -> float:
+    # examples: (candidate names in first-stage order, features, relevant names)
+    scores = []
+    for names, features, relevant in examples:
+        order = np.arange(len(names)) if weights is None else np.argsort(-(features @ weights + bias), kind="stable")
+        scores.append(average_precision_at_k([names[i] for i in order], relevant, k))
+    return float(np.mean(scores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="labeled JSONL query set")
+    parser.add_argument("--candidates", type=int, default=30, help="first-stage depth (RERANK_CANDIDATES)")
+    parser.add_argument("--k", type=int, default=10, help="cutoff for the held-out MAP@K")
+    parser.add_argument("--holdout", type=float, default=0.3, help="fraction of queries kept out of training")
+    parser.add_argument("--l2", type=float, default=0.01)
+    parser.add_argument("--epochs", type=int, default=2000)
+    parser.add_argument("--learning-rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the fitted weights here (RERANKER_WEIGHTS)")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["RERANKER"] = "off"
+    sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+    import main as app_main
+    from rerank import DEFAULT_WEIGHTS, FEATURES, FeatureReranker
+
+    app_main.warm_up()
+    state = app_main.catalog_state
+    scorer = FeatureReranker(pooling=app_main.CHUNK_POOLING)
+    # Rank and score with the FIELD_WEIGHTS default, as the server does for requests without their own
+    weights = app_main.ranking_weights()
+
+    with open(args.queries, encoding="utf-8") as f:
+        labeled = [json.loads(line) for line in f if line.strip()]
+    examples = []
+    for item in labeled:
+        windows, offsets = app_main.split_texts([item["query"]])
+        embeddings = app_main.encode_queries(windows)
+        rows = app_main.rank_window_rows(
+            state, embeddings, offsets, args.candidates, app_main.NO_FILTERS, [item["query"]], weights
+        )[0]
+        features = scorer.features(state, item["query"], embeddings, rows, weights)
+        examples.append(([state.catalog.columns["name"][row] for row in rows], features, set(item["relevant"])))
+
+    order = np.random.default_rng(args.seed).permutation(len(examples))
+    n_holdout = int(round(args.holdout * len(examples)))
+    held_out = [examples[i] for i in order[:n_holdout]]
+    training = [examples[i] for i in order[n_holdout:]]
+
+    features = np.concatenate([example[1] for example in training]).astype(np.float64)
+    labels = np.concatenate([[name in example[2] for name in example[0]] for example in training]).astype(np.float64)
+    weights, bias = fit_logistic(features, labels, args.l2, args.epochs, args.learning_rate)
+
+    print(f"{len(training)} training queries ({int(labels.sum())} relevant of {len(labels)} candidates), "
+          f"{len(held_out)} held out")
+    for name, weight in zip(FEATURES, weights):
+        print(f"  {name:16} {weight:+.3f}")
+    print(f"  {'bias':16} {bias:+.3f}")
+    if held_out:
+        default = np.array([DEFAULT_WEIGHTS[name] for name in FEATURES])
+        print(f"\nHeld-out MAP@{args.k}")
+        print(f"  first stage      {mean_ap(held_out, None, 0.0, args.k):.4f}")
+        print(f"  default weights  {mean_ap(held_out, default, 0.0, args.k):.4f}")
+        print(f"  fitted weights   {mean_ap(held_out, weights, bias, args.k):.4f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "weights": {name: round(float(weight), 6) for name, weight in zip(FEATURES, weights)},
+                "bias": round(float(bias), 6),
+                "trained_on": os.path.basename(args.queries),
+                "encoder_model": app_main.ENCODER_MODEL,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,6 @@ import {
   CircularProgress,
   Alert,
 } from '@mui/material';
-import axios from 'axios';
 
 const API_URL = 'http://localhost:8000';
 
@@ -25,21 +24,34 @@ function App() {
   const [error, setError] = useState(null);
   const [results, setResults] = useState(null);
 
-  const handleSubmit = async (e) => {
+  const handleSubmit = (e) => {
     e.preventDefault();
     setLoading(true);
     setError(null);
+    setResults(null);
 
-    try {
-      const response = await axios.get(`${API_URL}/api/recommend`, {
-        params: { query }
-      });
-      setResults(response.data);
-    } catch (err) {
-      setError(err.response?.data?.detail || 'An error occurred');
-    } finally {
+    // Ranked assessments arrive first; the explanation streams in afterwards
+    const params = new URLSearchParams({ query });
+    const source = new EventSource(`${API_URL}/api/recommend/stream?${params}`);
+
+    source.addEventListener('recommendations', (event) => {
+      setResults(JSON.parse(event.data));
+      setLoading(false);
+    });
+    source.addEventListener('explanation', (event) => {
+      const { delta } = JSON.parse(event.data);
+      setResults((prev) => ({ ...prev, explanation: prev.explanation + delta }));
+    });
+    source.addEventListener('done', (event) => {
+      const { explanation } = JSON.parse(event.data);
+      setResults((prev) => (prev ? { ...prev, explanation } : prev));
+      source.close();
+    });
+    source.addEventListener('error', (event) => {
+      source.close();
       setLoading(false);
-    }
+      setError(event.data ? JSON.parse(event.data).detail : 'An error occurred');
+    });
   };
 
   return (
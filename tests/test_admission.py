@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionError, Caller
+
+
+async def settle():
+    # Let queued acquire() calls reach their wait
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def serve_in_order(gate: AdmissionController, held, callers) -> list:
+    """Queue `callers` behind the `held` ticket, then release one slot at a time.
+
+    Returns the callers' labels in the order they were admitted.
+    """
+    admitted = []
+
+    async def request(label, caller):
+        admitted.append((label, await gate.acquire(caller)))
+
+    tasks = []
+    for label, caller in callers:
+        tasks.append(asyncio.ensure_future(request(label, caller)))
+        await settle()
+    gate.release(held)
+    for position in range(len(callers)):
+        await settle()
+        assert len(admitted) == position + 1
+        gate.release(admitted[position][1])
+    await asyncio.gather(*tasks)
+    assert gate.active == {"interactive": 0, "batch": 0}
+    return [label for label, _ in admitted]
+
+
+def test_interactive_before_batch():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_batch_active=1)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        return await serve_in_order(gate, held, [
+            ("batch", Caller("10.0.0.1", "batch")),
+            ("interactive", Caller("10.0.0.2")),
+        ])
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_batch_slots_are_capped():
+    async def scenario():
+        gate = AdmissionController(max_active=2, max_batch_active=1)
+        await gate.acquire(Caller("10.0.0.1", "batch"))
+        waiting = asyncio.ensure_future(gate.acquire(Caller("10.0.0.1", "batch")))
+        await settle()
+        assert not waiting.done()
+        # The free slot is kept for interactive requests
+        ticket = await asyncio.wait_for(gate.acquire(Caller("10.0.0.2")), 1)
+        assert not ticket.waited
+        waiting.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_round_robin_across_client_addresses():
+    async def scenario():
+        gate = AdmissionController(max_active=1)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        return await serve_in_order(gate, held, [
+            ("a1", Caller("10.0.0.1")),
+            ("a2", Caller("10.0.0.1")),
+            ("a3", Caller("10.0.0.1")),
+            ("b1", Caller("10.0.0.2")),
+        ])
+
+    assert asyncio.run(scenario()) == ["a1", "b1", "a2", "a3"]
+
+
+def test_client_ids_only_order_requests_of_one_address():
+    async def scenario():
+        gate = AdmissionController(max_active=1)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        return await serve_in_order(gate, held, [
+            ("x1", Caller("10.0.0.1", client_id="x")),
+            ("x2", Caller("10.0.0.1", client_id="x")),
+            ("y1", Caller("10.0.0.1", client_id="y")),
+            ("z1", Caller("10.0.0.1", client_id="z")),
+            ("b1", Caller("10.0.0.2")),
+        ])
+
+    # Rotating ids does not earn the address more turns than 10.0.0.2
+    assert asyncio.run(scenario()) == ["x1", "b1", "y1", "z1", "x2"]
+
+
+def test_per_client_queue_cap():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_queue_per_client=2)
+        await gate.acquire(Caller("10.0.0.9"))
+        queued = [asyncio.ensure_future(gate.acquire(Caller("10.0.0.1", client_id=str(i)))) for i in range(2)]
+        await settle()
+        # A fresh client id does not get around the cap
+        with pytest.raises(AdmissionError) as error:
+            await gate.acquire(Caller("10.0.0.1", client_id="another"))
+        assert error.value.status_code == 429
+        assert error.value.retry_after
+        assert gate.rejected["client_limit"] == 1
+        # Other addresses still queue
+        other = asyncio.ensure_future(gate.acquire(Caller("10.0.0.2")))
+        await settle()
+        assert gate.queue_length() == 3
+        for task in queued + [other]:
+            task.cancel()
+        await settle()
+        assert gate.queue_length() == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_sheds_newest_batch_for_interactive():
+    async def scenario():
+        gate = AdmissionController(max_active=1, max_queue=2)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        older = asyncio.ensure_future(gate.acquire(Caller("10.0.0.1", "batch")))
+        await settle()
+        newer = asyncio.ensure_future(gate.acquire(Caller("10.0.0.2", "batch")))
+        await settle()
+
+        # Batch arrivals are turned away when the queue is full
+        with pytest.raises(AdmissionError) as error:
+            await gate.acquire(Caller("10.0.0.3", "batch"))
+        assert error.value.status_code == 503
+        assert gate.rejected["queue_full"] == 1
+
+        interactive = asyncio.ensure_future(gate.acquire(Caller("10.0.0.4")))
+        await settle()
+        with pytest.raises(AdmissionError, match="Shed"):
+            await newer
+        assert gate.shed == 1
+        assert not older.done()
+
+        gate.release(held)
+        ticket = await asyncio.wait_for(interactive, 1)
+        assert ticket.caller.client == "10.0.0.4"
+        gate.release(ticket)
+        gate.release(await asyncio.wait_for(older, 1))
+        assert gate.active == {"interactive": 0, "batch": 0}
+
+    asyncio.run(scenario())
+
+
+def test_deadline_expires_while_queued():
+    async def scenario():
+        gate = AdmissionController(max_active=1)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        started = time.monotonic()
+        with pytest.raises(AdmissionError) as error:
+            await gate.acquire(Caller("10.0.0.1", deadline=started + 0.05))
+        assert error.value.status_code == 504
+        assert time.monotonic() - started < 0.5
+        assert gate.expired == 1
+        assert gate.queue_length() == 0
+        # The slot goes to the next caller, not the one that gave up
+        gate.release(held)
+        assert gate.active == {"interactive": 0, "batch": 0}
+
+    asyncio.run(scenario())
+
+
+def test_deadline_already_passed():
+    async def scenario():
+        gate = AdmissionController(max_active=1)
+        with pytest.raises(AdmissionError) as error:
+            await gate.acquire(Caller("10.0.0.1", deadline=time.monotonic() - 1))
+        assert error.value.status_code == 504
+        assert gate.active == {"interactive": 0, "batch": 0}
+
+    asyncio.run(scenario())
+
+
+def test_tickets_degrade_under_queue_pressure():
+    async def scenario():
+        gate = AdmissionController(max_active=1, degrade_queue=2)
+        held = await gate.acquire(Caller("10.0.0.9"))
+        assert not held.degraded
+        tasks = [asyncio.ensure_future(gate.acquire(Caller(f"10.0.0.{i}"))) for i in range(3)]
+        await settle()
+        gate.release(held)
+        first = await asyncio.wait_for(tasks[0], 1)
+        # Two requests were still queued when it was admitted
+        assert first.degraded
+        assert gate.degraded == 1
+        for task in tasks[1:]:
+            task.cancel()
+
+    asyncio.run(scenario())
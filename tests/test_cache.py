@@ -0,0 +1,115 @@
+import os
+import time
+
+import numpy as np
+
+from cache import DirectoryCache, SemanticCache, TieredCache
+
+# Scopes as main.semantic_scope builds them: catalog version, result count, filters
+SCOPE = '0c9d4e9ca0f5:10:{"adaptive":null,"max_duration":null,"min_duration":null,"remote":null,"test_types":null}'
+
+
+def text_cache(name: str, ttl: float = 60.0) -> TieredCache:
+    return TieredCache(
+        name, maxsize=16, ttl=ttl, dumps=lambda value: value.encode("utf-8"), loads=lambda raw: raw.decode("utf-8")
+    )
+
+
+def test_shared_directory_reaches_other_processes_caches(tmp_path):
+    # Two TieredCaches sharing a directory stand in for two pre-forked workers
+    first, second = text_cache("explanation"), text_cache("explanation")
+    first.share_directory(str(tmp_path))
+    second.share_directory(str(tmp_path))
+    assert second.get("id") is None
+    first.set("id", "ready")
+    assert second.get("id") == "ready"
+
+
+def test_directory_cache_expires_entries(tmp_path):
+    cache = DirectoryCache(str(tmp_path), ttl=60.0)
+    cache.set("key", b"value")
+    assert cache.get("key") == b"value"
+    path = cache._file("key")
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    assert cache.get("key") is None
+    assert not os.path.exists(path)
+
+
+def test_directory_cache_sweeps_expired_files(tmp_path):
+    cache = DirectoryCache(str(tmp_path), ttl=60.0, sweep_every=2)
+    cache.set("old", b"1")
+    stale = time.time() - 120
+    os.utime(cache._file("old"), (stale, stale))
+    cache.set("new", b"2")
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(cache._file("new"))]
+
+
+def unit(*values) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def at_similarity(similarity: float) -> np.ndarray:
+    # Unit vector with cosine `similarity` to unit(1, 0, 0)
+    return unit(similarity, np.sqrt(1 - similarity ** 2), 0)
+
+
+def test_semantic_cache_threshold():
+    cache = SemanticCache(maxsize=4, threshold=0.9)
+    cache.set(unit(1, 0, 0), SCOPE, "java")
+    assert cache.get(at_similarity(0.95), SCOPE) == "java"
+    assert cache.get(at_similarity(0.85), SCOPE) is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_semantic_cache_threshold_override():
+    cache = SemanticCache(maxsize=4, threshold=0.9)
+    cache.set(unit(1, 0, 0), SCOPE, "java")
+    assert cache.get(at_similarity(0.85), SCOPE, threshold=0.8) == "java"
+    assert cache.get(at_similarity(0.95), SCOPE, threshold=0.99) is None
+
+
+def test_semantic_cache_returns_the_closest_entry():
+    cache = SemanticCache(maxsize=4, threshold=0.5)
+    cache.set(unit(1, 0, 0), SCOPE, "java")
+    cache.set(unit(0, 1, 0), SCOPE, "sales")
+    assert cache.get(unit(0.6, 0.8, 0), SCOPE) == "sales"
+
+
+def test_semantic_cache_scopes():
+    cache = SemanticCache(maxsize=8, threshold=0.9)
+    cache.set(unit(1, 0, 0), SCOPE, "all")
+    filtered = SCOPE.replace('"remote":null', '"remote":true')
+    other_count = SCOPE.replace(":10:", ":5:")
+    reloaded = SCOPE.replace("0c9d4e9ca0f5:", "7b1e20d4c3a9:")
+    for scope in (filtered, other_count, reloaded):
+        assert cache.get(unit(1, 0, 0), scope) is None
+    # The same embedding is stored once per scope
+    cache.set(unit(1, 0, 0), filtered, "remote")
+    assert cache.get(unit(1, 0, 0), SCOPE) == "all"
+    assert cache.get(unit(1, 0, 0), filtered) == "remote"
+    assert len(cache) == 2
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    cache = SemanticCache(maxsize=2, threshold=0.9)
+    cache.set(unit(1, 0, 0), SCOPE, "a")
+    cache.set(unit(0, 1, 0), SCOPE, "b")
+    assert cache.get(unit(1, 0, 0), SCOPE) == "a"
+    cache.set(unit(0, 0, 1), SCOPE, "c")
+    assert cache.get(unit(0, 1, 0), SCOPE) is None
+    assert cache.get(unit(1, 0, 0), SCOPE) == "a"
+    assert cache.evictions == 1
+
+
+def test_semantic_cache_expiry_and_clear():
+    cache = SemanticCache(maxsize=4, threshold=0.9, ttl=0.05)
+    cache.set(unit(1, 0, 0), SCOPE, "java")
+    time.sleep(0.1)
+    assert cache.get(unit(1, 0, 0), SCOPE) is None
+    assert len(cache) == 0
+    cache.set(unit(1, 0, 0), SCOPE, "java")
+    cache.clear()
+    assert cache.get(unit(1, 0, 0), SCOPE) is None
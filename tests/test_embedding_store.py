@@ -0,0 +1,49 @@
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+DIM = 4
+
+
+class CountingEncoder:
+    """Deterministic stand-in for the sentence encoder that counts the texts it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text) + 1.0, 1.0, float(i), 2.0] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def test_reencodes_only_new_rows(tmp_path):
+    encode = CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "model")
+    first = np.array(store.load(["java", "sql"], encode))
+    assert encode.encoded == ["java", "sql"]
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+
+    encode = CountingEncoder()
+    second = EmbeddingStore(str(tmp_path), "model").load(["sql", "python", "java"], encode)
+    assert encode.encoded == ["python"]
+    assert np.allclose(second[0], first[1])
+    assert np.allclose(second[2], first[0])
+
+
+def test_empty_catalog_without_a_store(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store"), "model")
+    matrix = store.load([], CountingEncoder())
+    assert matrix.shape == (0, DIM)
+    assert matrix.dtype == np.float32
+    assert store.last_encoded == 0
+
+
+def test_empty_catalog_keeps_the_stored_rows(tmp_path):
+    EmbeddingStore(str(tmp_path), "model").load(["java", "sql"], CountingEncoder())
+    encode = CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "model")
+    assert store.load([], encode).shape == (0, DIM)
+    assert encode.encoded == []
+    # The catalog filling up again reuses what was stored
+    store.load(["java", "sql"], encode)
+    assert encode.encoded == []
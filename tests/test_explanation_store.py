@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+
+from explanation_store import ExplanationStore, RequestLog, rows_digest
+
+ROWS = [{"name": "Java 8 (New)", "test_type": "Knowledge & Skills"}, {"name": "SQL Server (New)", "test_type": "K"}]
+
+
+def unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_load_opens_the_file_read_only(tmp_path):
+    # An empty file: a writable connection would create the schema in it
+    path = tmp_path / "explanations.db"
+    path.write_bytes(b"")
+    store = ExplanationStore(str(path), "model")
+    store.load()
+    assert len(store) == 0
+    assert path.read_bytes() == b""
+
+
+def test_lookup_reloads_in_the_background(tmp_path):
+    path = str(tmp_path / "explanations.db")
+    writer = ExplanationStore(path, "model")
+    query = unit([1.0, 0.0, 0.0])
+    writer.put([row["name"] for row in ROWS], "java sql", query, rows_digest(ROWS), "First.", 5)
+
+    store = ExplanationStore(path, "model", check_interval=0.0)
+    store.load()
+    assert store.lookup(ROWS, query) == "First."
+
+    (entry,) = writer.rows()
+    writer.put([row["name"] for row in ROWS], "java sql", query, rows_digest(ROWS), "Second.", 6, entry["id"])
+    os.utime(path, ns=(0, store._mtime + 1))
+    # The lookup that notices the change still answers from the loaded entries
+    assert store.lookup(ROWS, query) == "First."
+    store._reloading.result(timeout=5)
+    assert store.lookup(ROWS, query) == "Second."
+    assert store.loads == 2
+
+
+def test_lookup_misses_on_changed_rows_or_distant_query(tmp_path):
+    path = str(tmp_path / "explanations.db")
+    query = unit([1.0, 0.0, 0.0])
+    writer = ExplanationStore(path, "model")
+    writer.put([row["name"] for row in ROWS], "java sql", query, rows_digest(ROWS), "Cached.", 5)
+    store = ExplanationStore(path, "model", threshold=0.8)
+    store.load()
+    assert store.lookup(ROWS, unit([0.0, 1.0, 0.0])) is None
+    edited = [dict(ROWS[0], test_type="Personality"), ROWS[1]]
+    assert store.lookup(edited, query) is None
+    assert store.stale == 1
+    # Centroids written for another encoder are ignored
+    other = ExplanationStore(path, "another-model")
+    other.load()
+    assert other.lookup(ROWS, query) is None
+
+
+def test_request_log_writes_off_the_caller(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    log = RequestLog(str(path))
+    for i in range(20):
+        log.record(f"query {i}", ["Java 8 (New)"])
+    log.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["query"] for line in lines] == [f"query {i}" for i in range(20)]
+    # Records after close (during shutdown) are dropped rather than raising
+    log.record("late", ["Java 8 (New)"])
+    assert log.records == 20
@@ -0,0 +1,281 @@
+import asyncio
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+
+from aiohttp import web  # noqa: E402
+
+import fetcher as fetcher_module  # noqa: E402
+from fetcher import FetchError, JobPageFetcher  # noqa: E402
+
+PAGE = "<html><body><nav>Menu</nav><main><h1>Java Developer</h1><p>Java, SQL and teamwork.</p></main></body></html>"
+
+
+class JobBoard:
+    """Local job board: an aiohttp app that records the requests it receives."""
+
+    def __init__(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_get("/etag", self.etag)
+        app.router.add_get("/last-modified", self.last_modified)
+        app.router.add_get("/redirect/{n}", self.redirect)
+        app.router.add_get("/to", self.redirect_to)
+        app.router.add_get("/page", self.page)
+        app.router.add_get("/large", self.large)
+        app.router.add_get("/slow", self.slow)
+        self.runner = web.AppRunner(app)
+        self.port = None
+        self.url = None
+
+    async def start(self) -> None:
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+    def hits(self, path: str) -> list:
+        return [request for request in self.requests if request.path == path]
+
+    async def etag(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def last_modified(self, request):
+        self.requests.append(request)
+        stamp = "Wed, 01 Jan 2025 00:00:00 GMT"
+        if request.headers.get("If-Modified-Since") == stamp:
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"Last-Modified": stamp})
+
+    async def redirect(self, request):
+        self.requests.append(request)
+        n = int(request.match_info["n"])
+        raise web.HTTPFound(f"/redirect/{n - 1}" if n > 0 else "/page")
+
+    async def redirect_to(self, request):
+        self.requests.append(request)
+        raise web.HTTPFound(request.query["location"])
+
+    async def page(self, request):
+        self.requests.append(request)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def large(self, request):
+        self.requests.append(request)
+        body = "<html><body><main>" + "Java SQL " * 2000 + "END-OF-PAGE</main></body></html>"
+        return web.Response(text=body, content_type="text/html")
+
+    async def slow(self, request):
+        self.requests.append(request)
+        await asyncio.sleep(2)
+        return web.Response(text=PAGE, content_type="text/html")
+
+
+@pytest.fixture
+def parser_executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def run_with_board(scenario, executor, **fetcher_options):
+    # Runs scenario(board, fetcher) on a fresh loop with the board serving on 127.0.0.1
+    fetcher_options.setdefault("allow_private_hosts", True)
+
+    async def main():
+        board = JobBoard()
+        await board.start()
+        fetcher = JobPageFetcher(executor, **fetcher_options)
+        try:
+            return await scenario(board, fetcher)
+        finally:
+            await fetcher.close()
+            await board.stop()
+
+    return asyncio.run(main())
+
+
+def test_fetches_main_text(parser_executor):
+    async def scenario(board, fetcher):
+        return await fetcher.fetch_text(board.url + "/page")
+
+    assert run_with_board(scenario, parser_executor) == "Java Developer Java, SQL and teamwork."
+
+
+def test_fresh_entries_are_not_refetched(parser_executor):
+    async def scenario(board, fetcher):
+        first = await fetcher.fetch_text(board.url + "/etag")
+        assert await fetcher.fetch_text(board.url + "/etag") == first
+        assert len(board.hits("/etag")) == 1
+
+    run_with_board(scenario, parser_executor, fresh_for=300.0)
+
+
+def test_etag_revalidation_reuses_body(parser_executor):
+    async def scenario(board, fetcher):
+        first = await fetcher.fetch_text(board.url + "/etag")
+        second = await fetcher.fetch_text(board.url + "/etag")
+        assert second == first
+        requests = board.hits("/etag")
+        assert len(requests) == 2
+        assert requests[1].headers.get("If-None-Match") == '"v1"'
+        assert fetcher.not_modified == 1
+
+    run_with_board(scenario, parser_executor, fresh_for=0.0)
+
+
+def test_last_modified_revalidation_reuses_body(parser_executor):
+    async def scenario(board, fetcher):
+        first = await fetcher.fetch_text(board.url + "/last-modified")
+        second = await fetcher.fetch_text(board.url + "/last-modified")
+        assert second == first
+        requests = board.hits("/last-modified")
+        assert requests[1].headers.get("If-Modified-Since") == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert fetcher.not_modified == 1
+
+    run_with_board(scenario, parser_executor, fresh_for=0.0)
+
+
+def test_follows_redirects_within_limit(parser_executor):
+    async def scenario(board, fetcher):
+        return await fetcher.fetch_text(board.url + "/redirect/2")
+
+    assert run_with_board(scenario, parser_executor, max_redirects=3).startswith("Java Developer")
+
+
+def test_redirect_limit(parser_executor):
+    async def scenario(board, fetcher):
+        with pytest.raises(FetchError, match="Too many redirects"):
+            await fetcher.fetch_text(board.url + "/redirect/10")
+        # The first request and max_redirects more, then it gives up
+        assert len(board.requests) == 3
+        assert fetcher.errors == 1
+
+    run_with_board(scenario, parser_executor, max_redirects=2)
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/page",
+    "http://localhost/page",
+    "http://10.0.0.1/page",
+    "http://192.168.1.1/page",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/page",
+])
+def test_refuses_private_and_loopback_hosts(parser_executor, url):
+    async def scenario():
+        fetcher = JobPageFetcher(parser_executor)
+        try:
+            with pytest.raises(FetchError) as error:
+                await fetcher.fetch_text(url)
+        finally:
+            await fetcher.close()
+        assert error.value.status_code == 400
+
+    asyncio.run(scenario())
+
+
+def test_refuses_unsupported_scheme(parser_executor):
+    async def scenario():
+        fetcher = JobPageFetcher(parser_executor, allow_private_hosts=True)
+        try:
+            with pytest.raises(FetchError) as error:
+                await fetcher.fetch_text("file:///etc/passwd")
+        finally:
+            await fetcher.close()
+        assert error.value.status_code == 400
+
+    asyncio.run(scenario())
+
+
+def fake_dns(monkeypatch, records: dict, public: set) -> list:
+    """Answer lookups from `records` (name -> addresses, one per lookup, the last repeating).
+
+    Addresses in `public` pass the public-address check, standing in for a
+    job site's address while actually pointing at the local board. Returns
+    the list of names looked up.
+    """
+    lookups = []
+    is_public_address = fetcher_module.is_public_address
+
+    async def getaddrinfo(host, port, *args, **kwargs):
+        lookups.append(host)
+        answers = records[host]
+        address = answers.pop(0) if len(answers) > 1 else answers[0]
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(fetcher_module, "is_public_address", lambda host: host in public or is_public_address(host))
+    return lookups
+
+
+@pytest.mark.parametrize("location", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://metadata.example:{port}/page",
+])
+def test_refuses_redirect_to_private_address(parser_executor, monkeypatch, location):
+    async def scenario(board, fetcher):
+        fake_dns(monkeypatch, {"jobs.example": ["127.0.0.1"], "metadata.example": ["169.254.169.254"]}, {"127.0.0.1"})
+        target = location.format(port=board.port)
+        with pytest.raises(FetchError, match="non-public address") as error:
+            await fetcher.fetch_text(f"http://jobs.example:{board.port}/to?location={quote(target)}")
+        assert error.value.status_code == 400
+        assert len(board.hits("/to")) == 1
+
+    run_with_board(scenario, parser_executor, allow_private_hosts=False)
+
+
+def test_connects_to_the_address_it_checked(parser_executor, monkeypatch):
+    # DNS rebinding: the name first resolves to a public address, then to an internal one.
+    # A check made with its own lookup would pass and the connection go to the board.
+    async def scenario(board, fetcher):
+        # 127.0.0.2 plays the public address; nothing listens there, so the fetch fails
+        lookups = fake_dns(monkeypatch, {"rebind.example": ["127.0.0.2", "127.0.0.1"]}, {"127.0.0.2"})
+        with pytest.raises(FetchError):
+            await fetcher.fetch_text(f"http://rebind.example:{board.port}/page")
+        assert lookups == ["rebind.example"]
+        assert not board.requests
+
+    run_with_board(scenario, parser_executor, allow_private_hosts=False)
+
+
+def test_refuses_names_resolving_to_private_addresses(parser_executor, monkeypatch):
+    async def scenario(board, fetcher):
+        fake_dns(monkeypatch, {"intranet.example": ["10.1.2.3"]}, set())
+        with pytest.raises(FetchError, match="non-public address 10.1.2.3") as error:
+            await fetcher.fetch_text("http://intranet.example/jobs/1")
+        assert error.value.status_code == 400
+
+    run_with_board(scenario, parser_executor, allow_private_hosts=False)
+
+
+def test_truncates_pages_over_size_cap(parser_executor):
+    async def scenario(board, fetcher):
+        return await fetcher.fetch_text(board.url + "/large")
+
+    text = run_with_board(scenario, parser_executor, max_bytes=1024)
+    assert text.startswith("Java SQL")
+    assert len(text) <= 1024
+    assert "END-OF-PAGE" not in text
+
+
+def test_timeout(parser_executor):
+    async def scenario(board, fetcher):
+        with pytest.raises(FetchError) as error:
+            await fetcher.fetch_text(board.url + "/slow")
+        assert error.value.status_code == 504
+        assert fetcher.errors == 1
+
+    run_with_board(scenario, parser_executor, timeout=0.2)
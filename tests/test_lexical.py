@@ -0,0 +1,82 @@
+import numpy as np
+
+from lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def fuse(dense, lexical, size, k=10, rows=None, **options):
+    """Fuse one query: `dense` is [(id, cosine)] in rank order, `lexical` the BM25 score per document.
+
+    Returns the kept ids and scores, padding dropped.
+    """
+    dense_ids = np.array([[doc for doc, _ in dense]], dtype=np.int64)
+    dense_scores = np.array([[score for _, score in dense]], dtype=np.float32)
+    scores, ids = reciprocal_rank_fusion(
+        dense_scores, dense_ids, np.array([lexical], dtype=np.float32), rows, size, k, **options
+    )
+    kept = scores[0] > -np.inf
+    return ids[0][kept].tolist(), scores[0][kept]
+
+
+def rrf(*ranks, rrf_k=60.0):
+    return sum(np.float32(1.0) / (np.float32(rrf_k) + np.float32(rank)) for rank in ranks)
+
+
+def test_tokenize_keeps_technology_names():
+    assert tokenize("ADO.NET and C# with .NET") == ["ado.net", "ado", ".net", "c#", ".net"]
+
+
+def test_bm25_prefers_rarer_terms():
+    index = BM25Index(["java developer", "java tester", "cobol developer"])
+    scores = index.score("cobol java")
+    assert scores.argmax() == 2
+    assert index.score("unknown").tolist() == [0.0, 0.0, 0.0]
+
+
+def test_fusion_order():
+    # Dense: 0, 1, 2. Lexical: 1, 3, 4
+    ids, scores = fuse([(0, 0.9), (1, 0.8), (2, 0.7)], [0.0, 3.0, 0.0, 2.0, 1.6], size=5)
+    assert ids == [1, 0, 3, 2, 4]
+    assert np.allclose(scores, [rrf(2, 1), rrf(1), rrf(2), rrf(3), rrf(3)])
+
+
+def test_ties_go_to_the_better_dense_rank():
+    # 4 is first by cosine only and 0 first by BM25 only: both score 1/61
+    ids, scores = fuse([(4, 0.9), (3, 0.8)], [2.0, 0.0, 0.0, 0.0, 0.0], size=5)
+    assert scores[0] == scores[1]
+    assert ids == [4, 0, 3]
+
+    # 1 is first by cosine and third by BM25, 2 the other way round
+    ids, scores = fuse([(1, 0.9), (0, 0.8), (2, 0.7)], [2.5, 2.0, 3.0, 0.0], size=4)
+    assert scores[0] == scores[1]
+    assert ids == [1, 2, 0]
+
+
+def test_weak_candidates_are_dropped():
+    # 1 is below the cosine threshold with no BM25 match; 3 is a weak BM25 match only
+    ids, _ = fuse(
+        [(0, 0.9), (1, 0.2)], [0.0, 0.0, 4.0, 1.0], size=4, similarity_threshold=0.3, lexical_min_ratio=0.5
+    )
+    assert ids == [0, 2]
+    # A strong BM25 score keeps a candidate the cosine threshold would drop
+    ids, _ = fuse([(0, 0.9), (1, 0.2)], [0.0, 4.0, 0.0, 0.0], size=4, similarity_threshold=0.3)
+    assert ids == [1, 0]
+
+
+def test_padding():
+    dense_ids = np.array([[2, -1, -1]])
+    dense_scores = np.array([[0.9, -np.inf, -np.inf]], dtype=np.float32)
+    scores, ids = reciprocal_rank_fusion(dense_scores, dense_ids, np.zeros((1, 4), np.float32), None, 4, 3)
+    assert ids.tolist() == [[2, -1, -1]]
+    assert scores[0][0] == rrf(1)
+    assert np.isneginf(scores[0][1:]).all()
+
+
+def test_lexical_scores_over_rows_map_to_catalog_ids():
+    rows = np.array([1, 3, 5])
+    ids, _ = fuse([(5, 0.9)], [0.0, 2.0, 0.0], size=6, rows=rows)
+    assert ids == [5, 3]
+
+
+def test_keeps_the_top_k():
+    ids, _ = fuse([(doc, 0.9 - doc / 100) for doc in range(8)], [0.0] * 8, size=8, k=3)
+    assert ids == [0, 1, 2]
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm import (
+    CircuitBreaker, CircuitOpenError, FakeGeminiModel, FakeResponse, FakeServiceError, LLMClient, LLMError,
+    LLMTimeoutError
+)
+
+
+class BadRequestError(Exception):
+    # Mirrors google.api_core.exceptions.InvalidArgument
+    code = 400
+
+
+class ScriptedModel(FakeGeminiModel):
+    """FakeGeminiModel that raises the given errors, in order, before answering."""
+
+    def __init__(self, errors=(), **kwargs):
+        kwargs.setdefault("latency", 0.0)
+        super().__init__(**kwargs)
+        self.errors = list(errors)
+
+    def _answer(self, prompt: str) -> str:
+        answer = super()._answer(prompt)
+        if self.errors:
+            raise self.errors.pop(0)
+        return answer
+
+
+class BrokenStreamModel(FakeGeminiModel):
+    """Sends the first chunk of the answer, then fails with a 503."""
+
+    async def _stream(self, text: str):
+        yield FakeResponse(text[:10])
+        raise FakeServiceError("503 The model is overloaded. Please try again later.")
+
+
+def make_client(model, **kwargs) -> LLMClient:
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_max", 0.001)
+    return LLMClient(lambda: model, **kwargs)
+
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+
+def test_retries_503_then_succeeds():
+    model = ScriptedModel([FakeServiceError("503"), FakeServiceError("503")])
+    client = make_client(model, max_retries=2)
+    assert asyncio.run(client.generate("prompt")).startswith("These assessments")
+    assert model.calls == 3
+    assert client.retries == 2
+    assert client.breaker.state == "closed"
+
+
+def test_gives_up_after_max_retries():
+    model = ScriptedModel([FakeServiceError("503")] * 3)
+    client = make_client(model, max_retries=1)
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("prompt"))
+    assert model.calls == 2
+    assert client.stats()["fallbacks"] == 1
+
+
+def test_does_not_retry_4xx():
+    model = ScriptedModel([BadRequestError("400 Invalid argument")])
+    client = make_client(model, max_retries=2)
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("prompt"))
+    assert model.calls == 1
+    assert client.retries == 0
+    # A bad request says nothing about Gemini's health
+    assert client.breaker.consecutive_failures == 0
+
+
+def test_total_deadline_covers_every_attempt():
+    model = FakeGeminiModel(latency=1.0)
+    client = make_client(model, timeout=0.2, attempt_timeout=0.15, max_retries=5)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(client.generate("prompt"))
+    assert time.monotonic() - started < 0.5
+    assert client.timeouts >= 1
+
+
+def test_caller_timeout_shortens_the_budget():
+    client = make_client(FakeGeminiModel(latency=1.0), timeout=10.0, attempt_timeout=5.0)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(client.generate("prompt", timeout=0.1))
+    assert time.monotonic() - started < 0.5
+
+
+def test_breaker_opens_half_opens_and_closes():
+    model = FakeGeminiModel(latency=0.0, failure_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = make_client(model, max_retries=0, breaker=breaker)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(LLMError):
+                await client.generate("prompt")
+        assert breaker.state == "open"
+        # Open: rejected without calling the model
+        with pytest.raises(CircuitOpenError):
+            await client.generate("prompt")
+        assert model.calls == 2
+
+        await asyncio.sleep(0.06)
+        model.failure_rate = 0.0
+        assert await client.generate("prompt")
+        assert breaker.state == "closed"
+        assert breaker.consecutive_failures == 0
+
+    asyncio.run(scenario())
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_half_open_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_cancelled_trial_call_is_released():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    client = make_client(FakeGeminiModel(latency=1.0), breaker=breaker)
+
+    async def scenario():
+        task = asyncio.ensure_future(client.generate("prompt"))
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open"
+        assert not breaker.allow()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert client.in_flight == 0
+    # Cancellation is not a verdict on the dependency: the next call gets the trial
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_stream_retries_before_first_chunk():
+    model = ScriptedModel([FakeServiceError("503")], chunks=4)
+    client = make_client(model, max_retries=1)
+    chunks = asyncio.run(collect(client.stream("prompt")))
+    assert len(chunks) == 4
+    assert "".join(chunks).startswith("These assessments")
+    assert model.calls == 2
+    assert client.retries == 1
+
+
+def test_stream_does_not_retry_after_first_chunk():
+    model = BrokenStreamModel(latency=0.0)
+    client = make_client(model, max_retries=2)
+    received = []
+
+    async def consume():
+        async for chunk in client.stream("prompt"):
+            received.append(chunk)
+
+    with pytest.raises(LLMError):
+        asyncio.run(consume())
+    assert len(received) == 1
+    assert model.calls == 1
+    assert client.retries == 0
+
+
+def test_explanation_falls_back_to_template(monkeypatch):
+    main = pytest.importorskip("main")
+    recommendations = [
+        main.Assessment(
+            name=name, url="https://www.shl.com/", remote_testing=True, adaptive_irt=False,
+            duration="30 minutes", test_type="Knowledge & Skills", description=""
+        )
+        for name in ("Java 8 (New)", "SQL Server (New)")
+    ]
+    failing = make_client(FakeGeminiModel(latency=0.0, failure_rate=1.0), max_retries=0)
+    monkeypatch.setattr(main, "llm_client", failing)
+    monkeypatch.setattr(main, "request_log", None)
+    monkeypatch.setattr(main, "explanation_store", None)
+
+    explanation, cacheable = asyncio.run(main.generate_explanation_async("java developer", recommendations))
+    assert explanation == main.template_explanation(recommendations)
+    assert "Java 8 (New) and SQL Server (New)" in explanation
+    # Not cached, so Gemini's explanation replaces it once Gemini recovers
+    assert not cacheable
+
+
+def test_each_loop_releases_its_own_semaphore():
+    # e.g. the serving loop and main's loop for synchronous callers, used at the same time
+    client = make_client(FakeGeminiModel(latency=0.02), max_concurrency=1)
+    loops = [asyncio.new_event_loop() for _ in range(2)]
+    threads = [threading.Thread(target=loop.run_forever, daemon=True) for loop in loops]
+    for thread in threads:
+        thread.start()
+    try:
+        futures = [
+            asyncio.run_coroutine_threadsafe(client.generate("prompt"), loop) for _ in range(3) for loop in loops
+        ]
+        assert all(future.result(timeout=5) for future in futures)
+        for loop in loops:
+            assert client._semaphores[loop]._value == 1
+    finally:
+        for loop, thread in zip(loops, threads):
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+    assert client.in_flight == 0